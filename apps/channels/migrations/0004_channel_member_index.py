@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('channels', '0003_add_channel_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.BigIntegerField(verbose_name='Kanal ID')),
+                ('user_id', models.BigIntegerField(verbose_name='Telegram ID')),
+                ('status', models.CharField(max_length=20, verbose_name='Holat')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Yangilangan')),
+            ],
+            options={
+                'verbose_name': "Kanal a'zosi",
+                'verbose_name_plural': "Kanal a'zolari",
+                'indexes': [models.Index(fields=['channel_id'], name='channel_member_channel_idx')],
+                'unique_together': {('user_id', 'channel_id')},
+            },
+        ),
+    ]
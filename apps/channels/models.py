@@ -71,3 +71,24 @@ class ChannelSubscription(models.Model):
 
     def __str__(self):
         return f"{self.user} -> {self.channel}"
+
+
+class ChannelMember(models.Model):
+    """Kanal a'zoligi indeksi - chat_member updatelari va API natijalaridan yangilanadi"""
+
+    channel_id = models.BigIntegerField(verbose_name='Kanal ID')
+    user_id = models.BigIntegerField(verbose_name='Telegram ID')
+    status = models.CharField(max_length=20, verbose_name='Holat')
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name='Yangilangan')
+
+    class Meta:
+        verbose_name = "Kanal a'zosi"
+        verbose_name_plural = "Kanal a'zolari"
+        # user_id birinchi - middleware bitta user uchun barcha kanallarni o'qiydi
+        unique_together = ['user_id', 'channel_id']
+        indexes = [
+            models.Index(fields=['channel_id'], name='channel_member_channel_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.channel_id}: {self.status}"
@@ -37,7 +37,7 @@ class BotSettingsAdmin(admin.ModelAdmin):
 
 @admin.register(Broadcast)
 class BroadcastAdmin(admin.ModelAdmin):
-    list_display = ['target', 'content_type', 'is_advertisement', 'total_users', 'sent_count', 'failed_count', 'is_completed', 'started_at']
-    list_filter = ['target', 'content_type', 'is_advertisement', 'is_completed']
-    readonly_fields = ['total_users', 'sent_count', 'failed_count', 'is_completed', 'sent_by', 'started_at', 'completed_at']
+    list_display = ['target', 'content_type', 'is_advertisement', 'total_users', 'sent_count', 'failed_count', 'status', 'scheduled_at', 'started_at']
+    list_filter = ['target', 'content_type', 'is_advertisement', 'status']
+    readonly_fields = ['total_users', 'sent_count', 'failed_count', 'is_completed', 'status', 'last_user_pk', 'audience_ready_at', 'sent_by', 'started_at', 'completed_at']
     ordering = ['-started_at']
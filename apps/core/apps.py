@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Asosiy sozlamalar'
+
+    def ready(self):
+        # Cache invalidatsiya signallari
+        from apps.core import signals  # noqa: F401
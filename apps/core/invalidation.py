@@ -0,0 +1,85 @@
+"""
+Cache invalidatsiya xabarlarini yuborish.
+
+Django admin (gunicorn) va bot jarayonlari alohida cache ga ega. Model o'zgarganda
+shu yerdan xabar yuboriladi, bot jarayonlari uni qabul qilib o'z cache ini tozalaydi
+(bot/utils/invalidation.py).
+
+Transport: Redis pub/sub (BOT_STORAGE=redis) yoki CacheInvalidation jadvali.
+Redis backendda bot cache lari ham Redis da umumiy - ularni yuboruvchi o'zi bir marta
+tozalaydi, bot jarayonlari faqat o'z ichidagi cache larni tozalaydi.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Invalidatsiya turlari
+KIND_USER = 'user'
+KIND_ADMIN = 'admin'
+KIND_SETTINGS = 'settings'
+KIND_CHANNELS = 'channels'
+KIND_MOVIE = 'movie'
+KIND_MOVIE_DELETED = 'movie_deleted'
+KIND_TEMPLATE = 'template'
+
+_redis_client = None
+
+
+def get_channel_name() -> str:
+    """Redis pub/sub kanal nomi"""
+    return f"{settings.BOT_CACHE_PREFIX}:invalidate"
+
+
+def use_redis() -> bool:
+    return settings.BOT_STORAGE == 'redis'
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1
+        )
+    return _redis_client
+
+
+def encode(kind: str, key='') -> str:
+    return json.dumps({'kind': kind, 'key': str(key) if key is not None else ''})
+
+
+def decode(raw) -> tuple:
+    data = json.loads(raw)
+    return data['kind'], data.get('key', '')
+
+
+def send(kind: str, key=''):
+    """Xabarni darhol yuborish"""
+    if use_redis():
+        try:
+            from bot.utils.invalidation import evict_bot_caches
+            evict_bot_caches(kind, key)
+        except Exception as e:
+            logger.error(f"Umumiy cache ni tozalashda xato ({kind}:{key}): {e}")
+
+    try:
+        if use_redis():
+            _get_redis().publish(get_channel_name(), encode(kind, key))
+        else:
+            from apps.core.models import CacheInvalidation
+            CacheInvalidation.objects.create(kind=kind, key=str(key) if key is not None else '')
+    except Exception as e:
+        logger.error(f"Invalidatsiya xabarini yuborishda xato ({kind}:{key}): {e}")
+
+
+def publish(kind: str, key=''):
+    """
+    Invalidatsiya xabarini transaction commit bo'lgach yuborish.
+
+    Commitdan oldin yuborilsa, boshqa jarayon eski qiymatni qayta cache ga yozib qo'yishi mumkin.
+    """
+    transaction.on_commit(lambda: send(kind, key))
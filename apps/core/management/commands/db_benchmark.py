@@ -0,0 +1,106 @@
+"""
+DB ulanishlari benchmarki.
+
+Bot handleriga o'xshash so'rovlarni sync_to_async orqali bajaradi va har bir
+"update" dan keyin close_old_connections chaqiradi (webhook so'rov sikli kabi).
+
+    python manage.py db_benchmark --ops 2000 --concurrency 20
+
+before - CONN_MAX_AGE=0 (har updatedan keyin ulanish yopiladi)
+after  - joriy sozlamalar (DB_CONN_MAX_AGE / DB_POOL / DB_PGBOUNCER)
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = "DB ulanishlari benchmarki: ulanishlar/sek va handler p99 kechikishi (oldin/keyin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000, help="Updatelar soni")
+        parser.add_argument('--concurrency', type=int, default=20, help="Bir vaqtdagi handlerlar")
+        parser.add_argument('--mode', choices=['before', 'after', 'both'], default='both')
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help="'after' rejimi uchun CONN_MAX_AGE (default - settings.DB_CONN_MAX_AGE, pool bo'lsa 0)"
+        )
+
+    def handle(self, *args, **options):
+        modes = ['before', 'after'] if options['mode'] == 'both' else [options['mode']]
+        configured_max_age = connection.settings_dict.get('CONN_MAX_AGE', 0)
+        uses_pool = 'pool' in connection.settings_dict.get('OPTIONS', {})
+        after_max_age = options['max_age']
+        if after_max_age is None:
+            after_max_age = 0 if uses_pool else settings.DB_CONN_MAX_AGE
+
+        self.stdout.write(
+            f"DB: {connection.vendor}, after CONN_MAX_AGE={after_max_age}, pool={uses_pool}"
+        )
+        self.stdout.write(f"{'rejim':<8} {'update/s':>10} {'ulanish':>8} {'ulanish/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+        try:
+            for mode in modes:
+                max_age = 0 if mode == 'before' else after_max_age
+                result = asyncio.run(self._run(options['ops'], options['concurrency'], max_age))
+                self.stdout.write(
+                    f"{mode:<8} {result['ops_per_sec']:>10.1f} {result['connections']:>8} "
+                    f"{result['connections_per_sec']:>10.1f} {result['p50']:>8.2f} {result['p99']:>8.2f}"
+                )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured_max_age
+
+    def _handler_queries(self, index: int):
+        """Middleware + kod bo'yicha kino handleriga o'xshash so'rovlar"""
+        from apps.movies.models import Movie
+        from apps.users.models import User, Admin
+
+        User.objects.filter(user_id=index).first()
+        Admin.objects.filter(user__user_id=index).exists()
+        Movie.objects.filter(code=str(index)).first()
+
+        # Update tugadi - Django so'rov oxiridagi kabi
+        close_old_connections()
+
+    async def _run(self, ops: int, concurrency: int, max_age: int) -> dict:
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        # connection - thread-local, shuning uchun sync thread ichida yopiladi
+        await sync_to_async(lambda: connection.close())()
+
+        created = 0
+
+        def on_created(sender, **kwargs):
+            nonlocal created
+            created += 1
+
+        connection_created.connect(on_created)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        run_queries = sync_to_async(self._handler_queries)
+
+        async def one(index: int):
+            async with semaphore:
+                start = time.perf_counter()
+                await run_queries(index)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(one(i) for i in range(ops)))
+        finally:
+            connection_created.disconnect(on_created)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'ops_per_sec': ops / elapsed,
+            'connections': created,
+            'connections_per_sec': created / elapsed,
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        }
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_message_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30, verbose_name='Turi')),
+                ('key', models.CharField(blank=True, default='', max_length=100, verbose_name='Kalit')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Yaratilgan')),
+            ],
+            options={
+                'verbose_name': 'Cache invalidatsiya',
+                'verbose_name_plural': 'Cache invalidatsiyalar',
+            },
+        ),
+    ]
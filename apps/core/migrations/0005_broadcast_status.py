@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+def set_existing_status(apps, schema_editor):
+    # Eski yozuvlarda checkpoint yo'q - tugallanmaganlari qayta ishga tushmasligi kerak
+    Broadcast = apps.get_model('core', 'Broadcast')
+    Broadcast.objects.filter(is_completed=True).update(status='completed')
+    Broadcast.objects.filter(is_completed=False).update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cache_invalidation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='last_user_pk',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Oxirgi foydalanuvchi ID'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='status',
+            field=models.CharField(choices=[('running', 'Yuborilmoqda'), ('paused', "To'xtatilgan"), ('cancelled', 'Bekor qilingan'), ('completed', 'Tugallangan')], db_index=True, default='running', max_length=20, verbose_name='Holat'),
+        ),
+        migrations.RunPython(set_existing_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_broadcast_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='source_chat_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Asl xabar chati'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='source_message_ids',
+            field=models.JSONField(blank=True, null=True, verbose_name='Asl xabar ID lari'),
+        ),
+        migrations.AlterField(
+            model_name='broadcast',
+            name='content_type',
+            field=models.CharField(choices=[('text', 'Matn'), ('photo', 'Rasm'), ('video', 'Video'), ('document', 'Fayl'), ('copy', 'Xabar nusxasi'), ('album', 'Albom')], default='text', max_length=20, verbose_name='Kontent turi'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_broadcast_copy_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='audience_ready_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Auditoriya tayyorlangan'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Rejalashtirilgan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='segment',
+            field=models.JSONField(blank=True, null=True, verbose_name='Segment'),
+        ),
+        migrations.AlterField(
+            model_name='broadcast',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Rejalashtirilgan'), ('running', 'Yuborilmoqda'), ('paused', "To'xtatilgan"), ('cancelled', 'Bekor qilingan'), ('completed', 'Tugallangan')], db_index=True, default='running', max_length=20, verbose_name='Holat'),
+        ),
+        migrations.CreateModel(
+            name='BroadcastRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_pk', models.PositiveBigIntegerField(verbose_name='User ID (baza)')),
+                ('user_id', models.BigIntegerField(verbose_name='Telegram ID')),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='core.broadcast', verbose_name='Xabar yuborish')),
+            ],
+            options={
+                'verbose_name': 'Broadcast qabul qiluvchisi',
+                'verbose_name_plural': 'Broadcast qabul qiluvchilari',
+                'constraints': [models.UniqueConstraint(fields=('broadcast', 'user_pk'), name='unique_broadcast_recipient')],
+            },
+        ),
+    ]
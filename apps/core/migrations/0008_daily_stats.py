@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_broadcast_schedule_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Sana')),
+                ('new_users', models.PositiveIntegerField(default=0, verbose_name='Yangi foydalanuvchilar')),
+                ('approved_payments', models.PositiveIntegerField(default=0, verbose_name="Tasdiqlangan to'lovlar")),
+                ('income', models.PositiveBigIntegerField(default=0, verbose_name="Tushum (so'm)")),
+                ('views', models.PositiveBigIntegerField(default=0, verbose_name="Ko'rishlar")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan')),
+            ],
+            options={
+                'verbose_name': 'Kunlik statistika',
+                'verbose_name_plural': 'Kunlik statistika',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
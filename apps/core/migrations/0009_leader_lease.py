@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Nomi')),
+                ('holder', models.CharField(max_length=100, verbose_name='Egasi')),
+                ('expires_at', models.DateTimeField(verbose_name='Tugash vaqti')),
+            ],
+            options={
+                'verbose_name': 'Yetakchi lease',
+                'verbose_name_plural': 'Yetakchi leaselar',
+            },
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Band (gacha)'),
+        ),
+    ]
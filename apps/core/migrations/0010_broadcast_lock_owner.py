@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_leader_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='lock_owner',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Band qilgan jarayon'),
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from apps.core.templating import CompiledTemplate, find_placeholders
+
+# message_type -> CompiledTemplate (jarayon ichida, saqlanganda tozalanadi)
+_compiled_templates = None
+_compiled_defaults = {}
 
 
 class BotSettings(models.Model):
@@ -103,43 +110,92 @@ class MessageTemplate(models.Model):
     def __str__(self):
         return f"{self.get_message_type_display()}"
 
+    # Har bir xabar turida ishlatish mumkin bo'lgan placeholderlar
+    ALLOWED_PLACEHOLDERS = {
+        'welcome': {'full_name'},
+        'premium_success': {'days'},
+        'payment_instructions': {'card_number', 'card_holder', 'amount'},
+        'payment_approved': {'days'},
+        'payment_rejected': {'reason'},
+        'movie_not_found': {'code'},
+        'profile_info': {'full_name', 'user_id', 'premium_status', 'joined_date', 'movies_watched'},
+        'referral_info': {'referral_link', 'referrals_count', 'bonus_days'},
+        'ban_message': {'reason'},
+    }
+
+    DEFAULT_MESSAGES = {
+        'welcome': '👋 Assalomu alaykum, {full_name}!\n\nBotimizga xush kelibsiz!',
+        'subscription_required': '📢 Botdan foydalanish uchun quyidagi kanallarga obuna bo\'ling:',
+        'subscription_success': '✅ Obuna tasdiqlandi! Endi botdan foydalanishingiz mumkin.',
+        'premium_required': '💎 Bu kino faqat Premium foydalanuvchilar uchun.',
+        'premium_info': '💎 Premium afzalliklari:\n\n✅ Barcha kinolarni ko\'rish\n✅ Reklama yo\'q\n✅ Tezkor yuklash',
+        'premium_success': '🎉 Tabriklaymiz! Premium muvaffaqiyatli aktivlashtirildi.\n\n⏰ Amal qilish muddati: {days} kun',
+        'payment_instructions': '💳 To\'lov qilish uchun:\n\nKarta: {card_number}\nEgasi: {card_holder}\n\nTo\'lov summasini o\'tkazing va chekni yuboring.',
+        'payment_pending': '⏳ To\'lovingiz tekshirilmoqda. Iltimos kuting...',
+        'payment_approved': '✅ To\'lovingiz tasdiqlandi! Premium aktivlashtirildi.',
+        'payment_rejected': '❌ To\'lovingiz rad etildi.\n\nSabab: {reason}',
+        'movie_not_found': '😔 Afsuski, bu kod bo\'yicha kino topilmadi.',
+        'search_prompt': '🔍 Kino kodini yoki nomini kiriting:',
+        'profile_info': '👤 Sizning profilingiz:\n\n📛 Ism: {full_name}\n💎 Premium: {premium_status}\n🎬 Ko\'rilgan: {movies_watched} ta',
+        'referral_info': '👥 Sizning referal havolangiz:\n\n{referral_link}\n\n✅ Taklif qilganlar: {referrals_count} ta',
+        'ban_message': '🚫 Siz bloklangansiz.\n\nSabab: {reason}',
+        'maintenance': '🔧 Bot texnik ishlar sababli vaqtincha to\'xtatilgan.',
+    }
+
+    def clean(self):
+        super().clean()
+        self.validate_placeholders()
+
+    def validate_placeholders(self):
+        """Faqat ruxsat etilgan placeholderlar ishlatilganini tekshirish"""
+        allowed = self.ALLOWED_PLACEHOLDERS.get(self.message_type, set())
+        unknown = find_placeholders(self.content) - allowed
+        if unknown:
+            names = ', '.join(f'{{{name}}}' for name in sorted(unknown))
+            allowed_text = ', '.join(f'{{{name}}}' for name in sorted(allowed)) or "yo'q"
+            raise ValidationError({
+                'content': f"Noma'lum placeholder: {names}. Ruxsat etilganlar: {allowed_text}"
+            })
+
+    def save(self, *args, **kwargs):
+        self.validate_placeholders()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def clear_cache(cls):
+        """Kompilyatsiya qilingan shablonlar cache ini tozalash"""
+        global _compiled_templates
+        _compiled_templates = None
+
+    @classmethod
+    def get_compiled(cls) -> dict:
+        """Barcha shablonlar (bir marta yuklanadi)"""
+        global _compiled_templates
+        templates = _compiled_templates
+        if templates is None:
+            templates = {
+                message_type: CompiledTemplate(content)
+                for message_type, content in cls.objects.values_list('message_type', 'content')
+            }
+            _compiled_templates = templates
+        return templates
+
     @classmethod
     def get_message(cls, message_type: str, **kwargs) -> str:
         """Xabarni olish va formatlash"""
-        try:
-            template = cls.objects.get(message_type=message_type)
-            content = template.content
-            for key, value in kwargs.items():
-                content = content.replace(f'{{{key}}}', str(value))
-            return content
-        except cls.DoesNotExist:
+        template = cls.get_compiled().get(message_type)
+        if template is None:
             return cls._get_default_message(message_type, **kwargs)
+        return template.render(**kwargs)
 
     @classmethod
     def _get_default_message(cls, message_type: str, **kwargs) -> str:
         """Default xabarlar"""
-        defaults = {
-            'welcome': '👋 Assalomu alaykum, {full_name}!\n\nBotimizga xush kelibsiz!',
-            'subscription_required': '📢 Botdan foydalanish uchun quyidagi kanallarga obuna bo\'ling:',
-            'subscription_success': '✅ Obuna tasdiqlandi! Endi botdan foydalanishingiz mumkin.',
-            'premium_required': '💎 Bu kino faqat Premium foydalanuvchilar uchun.',
-            'premium_info': '💎 Premium afzalliklari:\n\n✅ Barcha kinolarni ko\'rish\n✅ Reklama yo\'q\n✅ Tezkor yuklash',
-            'premium_success': '🎉 Tabriklaymiz! Premium muvaffaqiyatli aktivlashtirildi.\n\n⏰ Amal qilish muddati: {days} kun',
-            'payment_instructions': '💳 To\'lov qilish uchun:\n\nKarta: {card_number}\nEgasi: {card_holder}\n\nTo\'lov summasini o\'tkazing va chekni yuboring.',
-            'payment_pending': '⏳ To\'lovingiz tekshirilmoqda. Iltimos kuting...',
-            'payment_approved': '✅ To\'lovingiz tasdiqlandi! Premium aktivlashtirildi.',
-            'payment_rejected': '❌ To\'lovingiz rad etildi.\n\nSabab: {reason}',
-            'movie_not_found': '😔 Afsuski, bu kod bo\'yicha kino topilmadi.',
-            'search_prompt': '🔍 Kino kodini yoki nomini kiriting:',
-            'profile_info': '👤 Sizning profilingiz:\n\n📛 Ism: {full_name}\n💎 Premium: {premium_status}\n🎬 Ko\'rilgan: {movies_watched} ta',
-            'referral_info': '👥 Sizning referal havolangiz:\n\n{referral_link}\n\n✅ Taklif qilganlar: {referrals_count} ta',
-            'ban_message': '🚫 Siz bloklangansiz.\n\nSabab: {reason}',
-            'maintenance': '🔧 Bot texnik ishlar sababli vaqtincha to\'xtatilgan.',
-        }
-        content = defaults.get(message_type, 'Xabar topilmadi')
-        for key, value in kwargs.items():
-            content = content.replace(f'{{{key}}}', str(value))
-        return content
+        template = _compiled_defaults.get(message_type)
+        if template is None:
+            template = CompiledTemplate(cls.DEFAULT_MESSAGES.get(message_type, 'Xabar topilmadi'))
+            _compiled_defaults[message_type] = template
+        return template.render(**kwargs)
 
     @classmethod
     def init_defaults(cls):
@@ -188,6 +244,22 @@ class Broadcast(models.Model):
         ('photo', 'Rasm'),
         ('video', 'Video'),
         ('document', 'Fayl'),
+        ('copy', 'Xabar nusxasi'),
+        ('album', 'Albom'),
+    ]
+
+    STATUS_SCHEDULED = 'scheduled'
+    STATUS_RUNNING = 'running'
+    STATUS_PAUSED = 'paused'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_COMPLETED = 'completed'
+
+    STATUS_CHOICES = [
+        (STATUS_SCHEDULED, 'Rejalashtirilgan'),
+        (STATUS_RUNNING, 'Yuborilmoqda'),
+        (STATUS_PAUSED, "To'xtatilgan"),
+        (STATUS_CANCELLED, 'Bekor qilingan'),
+        (STATUS_COMPLETED, 'Tugallangan'),
     ]
 
     target = models.CharField(max_length=20, choices=TARGET_CHOICES, default='all', verbose_name='Kimga')
@@ -196,8 +268,18 @@ class Broadcast(models.Model):
     text = models.TextField(blank=True, default='', verbose_name='Xabar matni')
     file_id = models.CharField(max_length=255, blank=True, default='', verbose_name='File ID')
 
+    # copy/album - admin yuborgan asl xabar(lar) copy_message(s) bilan nusxalanadi
+    source_chat_id = models.BigIntegerField(blank=True, null=True, verbose_name='Asl xabar chati')
+    source_message_ids = models.JSONField(blank=True, null=True, verbose_name='Asl xabar ID lari')
+
     is_advertisement = models.BooleanField(default=False, verbose_name='Reklama (premium ga bormaydi)')
 
+    # Qo'shimcha auditoriya filtrlari: {"channel_id": 1, "trial": true, "inactive_days": 30, "language": "uzbek"}
+    segment = models.JSONField(blank=True, null=True, verbose_name='Segment')
+    scheduled_at = models.DateTimeField(blank=True, null=True, db_index=True, verbose_name='Rejalashtirilgan vaqt')
+    # BroadcastRecipient jadvali to'ldirilgan vaqt (None - auditoriya yuborishda hisoblanadi)
+    audience_ready_at = models.DateTimeField(blank=True, null=True, verbose_name='Auditoriya tayyorlangan')
+
     buttons = models.JSONField(blank=True, null=True, verbose_name='Inline tugmalar')
 
     # Statistika
@@ -207,6 +289,16 @@ class Broadcast(models.Model):
 
     is_completed = models.BooleanField(default=False, verbose_name='Tugallandi')
 
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING, db_index=True, verbose_name='Holat'
+    )
+    # Checkpoint: shu User.id gacha bo'lganlar navbatdan o'tgan (qayta yuborilmaydi)
+    last_user_pk = models.PositiveBigIntegerField(default=0, verbose_name='Oxirgi foydalanuvchi ID')
+    # Yuborayotgan jarayon har chunk oldidan uzaytiradi; o'tib ketgan bo'lsa job egasiz - yetakchi davom ettiradi
+    locked_until = models.DateTimeField(blank=True, null=True, verbose_name='Band (gacha)')
+    # Lock egasi (jarayon tokeni) - job ni yo'qotgan task keyingi chunk ni yubormaydi
+    lock_owner = models.CharField(max_length=100, blank=True, default='', verbose_name='Band qilgan jarayon')
+
     sent_by = models.ForeignKey(
         'users.User',
         on_delete=models.SET_NULL,
@@ -226,3 +318,76 @@ class Broadcast(models.Model):
 
     def __str__(self):
         return f"{self.get_target_display()} - {self.started_at.strftime('%d.%m.%Y %H:%M')}"
+
+
+class BroadcastRecipient(models.Model):
+    """Broadcast auditoriyasi - yuborishdan oldin hisoblab qo'yilgan user ID lar"""
+
+    broadcast = models.ForeignKey(
+        Broadcast,
+        on_delete=models.CASCADE,
+        related_name='recipients',
+        verbose_name='Xabar yuborish'
+    )
+    user_pk = models.PositiveBigIntegerField(verbose_name='User ID (baza)')
+    user_id = models.BigIntegerField(verbose_name='Telegram ID')
+
+    class Meta:
+        verbose_name = 'Broadcast qabul qiluvchisi'
+        verbose_name_plural = 'Broadcast qabul qiluvchilari'
+        constraints = [
+            # Keyset so'rovi (broadcast_id, user_pk > cursor) shu index bo'yicha
+            models.UniqueConstraint(fields=['broadcast', 'user_pk'], name='unique_broadcast_recipient'),
+        ]
+
+    def __str__(self):
+        return f"{self.broadcast_id} -> {self.user_id}"
+
+
+class DailyStats(models.Model):
+    """Kunlik statistika rollup - statistika ekranlari faqat shu jadvalni o'qiydi"""
+
+    date = models.DateField(unique=True, verbose_name='Sana')
+    new_users = models.PositiveIntegerField(default=0, verbose_name='Yangi foydalanuvchilar')
+    approved_payments = models.PositiveIntegerField(default=0, verbose_name="Tasdiqlangan to'lovlar")
+    income = models.PositiveBigIntegerField(default=0, verbose_name="Tushum (so'm)")
+    views = models.PositiveBigIntegerField(default=0, verbose_name="Ko'rishlar")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Yangilangan')
+
+    class Meta:
+        verbose_name = 'Kunlik statistika'
+        verbose_name_plural = 'Kunlik statistika'
+        ordering = ['-date']
+
+    def __str__(self):
+        return self.date.strftime('%d.%m.%Y')
+
+
+class LeaderLease(models.Model):
+    """Background job lar yetakchisi (Redis bo'lmaganda) - job larni faqat lease egasi bajaradi"""
+
+    name = models.CharField(max_length=50, unique=True, verbose_name='Nomi')
+    holder = models.CharField(max_length=100, verbose_name='Egasi')
+    expires_at = models.DateTimeField(verbose_name='Tugash vaqti')
+
+    class Meta:
+        verbose_name = 'Yetakchi lease'
+        verbose_name_plural = 'Yetakchi leaselar'
+
+    def __str__(self):
+        return f"{self.name}: {self.holder}"
+
+
+class CacheInvalidation(models.Model):
+    """Cache invalidatsiya jurnali - Redis bo'lmaganda jarayonlar shu jadvalni so'rab turadi"""
+
+    kind = models.CharField(max_length=30, verbose_name='Turi')
+    key = models.CharField(max_length=100, blank=True, default='', verbose_name='Kalit')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Yaratilgan')
+
+    class Meta:
+        verbose_name = 'Cache invalidatsiya'
+        verbose_name_plural = 'Cache invalidatsiyalar'
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
@@ -0,0 +1,123 @@
+"""
+Kunlik statistika rollup (DailyStats).
+
+Yangi foydalanuvchilar, tasdiqlangan to'lovlar va tushum har bir jadval uchun bitta
+GROUP BY (mahalliy sana bo'yicha) so'rov bilan hisoblanadi va DailyStats ga upsert
+qilinadi. Ko'rishlar MovieView voqealaridan xuddi shunday hisoblanadi - voqealar
+VIEW_RETENTION_DAYS kun saqlanadi, undan eski kunlarning ko'rishlari o'zgartirilmaydi.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.core.models import DailyStats
+
+# Ko'rish voqealari (MovieView) shuncha kun saqlanadi - oylik statistika va trend uchun yetarli
+VIEW_RETENTION_DAYS = 35
+
+
+def local_today() -> date:
+    return timezone.localdate()
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def views_since() -> date:
+    """Ko'rish voqealari to'liq saqlangan birinchi kun"""
+    return local_today() - timedelta(days=VIEW_RETENTION_DAYS - 1)
+
+
+def rollup_days(start: date, end: date = None) -> int:
+    """start..end (ikkalasi ham kiradi) kunlarini qayta hisoblash"""
+    from apps.movies.models import MovieView
+    from apps.payments.models import Payment
+    from apps.users.models import User
+
+    end = end or start
+    tz = timezone.get_current_timezone()
+    since, until = _day_start(start), _day_start(end + timedelta(days=1))
+
+    users = dict(
+        User.objects.filter(created_at__gte=since, created_at__lt=until)
+        .annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    )
+    payments = {
+        row['day']: row
+        for row in Payment.objects.filter(status='approved', created_at__gte=since, created_at__lt=until)
+        .annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values('day')
+        .annotate(count=Count('id'), income=Sum('tariff__price'))
+    }
+
+    views_from = max(start, views_since())
+    views = dict(
+        MovieView.objects.filter(created_at__gte=_day_start(views_from), created_at__lt=until)
+        .annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    ) if views_from <= end else {}
+
+    # Voqealari o'chirilgan kunlarda ko'rishlar saqlanib qoladi
+    fields = ['new_users', 'approved_payments', 'income', 'updated_at']
+    old_rows, rows = [], []
+    day = start
+    while day <= end:
+        payment = payments.get(day, {})
+        row = DailyStats(
+            date=day,
+            new_users=users.get(day, 0),
+            approved_payments=payment.get('count', 0),
+            income=payment.get('income') or 0,
+            views=views.get(day, 0),
+        )
+        (rows if day >= views_from else old_rows).append(row)
+        day += timedelta(days=1)
+
+    for batch, update_fields in ((old_rows, fields), (rows, fields + ['views'])):
+        if batch:
+            DailyStats.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['date'],
+                update_fields=update_fields,
+            )
+    return len(old_rows) + len(rows)
+
+
+def rollup_recent(days: int) -> int:
+    """Oxirgi days kun (bugun ham) - kech tasdiqlangan to'lovlar uchun"""
+    today = local_today()
+    return rollup_days(today - timedelta(days=days - 1), today)
+
+
+def backfill() -> int:
+    """Rollup bo'sh bo'lsa - butun tarixni hisoblash"""
+    from apps.users.models import User
+
+    if DailyStats.objects.exists():
+        return 0
+    first = User.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return 0
+    return rollup_days(timezone.localdate(first), local_today())
+
+
+def prune_view_events(batch_size: int = 10000) -> int:
+    """Saqlash muddati o'tgan ko'rish voqealarini qismlab o'chirish"""
+    from apps.movies.models import MovieView
+
+    cutoff = _day_start(views_since())
+    deleted = 0
+    while True:
+        ids = list(MovieView.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += MovieView.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,81 @@
+"""
+Model o'zgarishlari - bot jarayonlari cache ini tozalash uchun invalidatsiya xabarlari
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.channels.models import Channel
+from apps.core.invalidation import (
+    publish, KIND_USER, KIND_ADMIN, KIND_SETTINGS, KIND_CHANNELS,
+    KIND_MOVIE, KIND_MOVIE_DELETED, KIND_TEMPLATE,
+)
+from apps.core.models import BotSettings, MessageTemplate
+from apps.movies.models import Movie
+from apps.payments.models import Payment
+from apps.users.models import User, Admin
+
+
+# Bot cache idagi nusxada eskirsa ham farqi yo'q (har /start da yangilanadi)
+USER_UNCACHED_FIELDS = {'last_active'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    changed = instance.get_changed_fields()
+    if changed is not None:
+        instance._loaded_values = {
+            field.attname: instance.__dict__[field.attname]
+            for field in sender._meta.concrete_fields if field.attname in instance.__dict__
+        }
+        if not changed - USER_UNCACHED_FIELDS:
+            return
+    publish(KIND_USER, instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    publish(KIND_USER, instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Admin)
+def admin_changed(sender, instance, **kwargs):
+    # O'chirilganda bog'langan user mavjud bo'lmasligi mumkin - butun admin cache tozalanadi
+    publish(KIND_ADMIN)
+
+
+@receiver([post_save, post_delete], sender=BotSettings)
+def settings_changed(sender, instance, **kwargs):
+    publish(KIND_SETTINGS)
+
+
+@receiver([post_save, post_delete], sender=Channel)
+def channel_changed(sender, instance, **kwargs):
+    publish(KIND_CHANNELS)
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    publish(KIND_MOVIE, instance.code)
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    publish(KIND_MOVIE_DELETED, instance.code)
+
+
+@receiver([post_save, post_delete], sender=MessageTemplate)
+def template_changed(sender, instance, **kwargs):
+    # Commitdan oldin tozalansa, parallel get_compiled() eski qatorni qayta cache lab qo'yadi
+    transaction.on_commit(MessageTemplate.clear_cache)
+    publish(KIND_TEMPLATE, instance.message_type)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    # Tasdiqlangan to'lov - o'sha kunning statistika rollup i qayta hisoblanadi
+    if instance.status == 'approved':
+        from apps.core.rollup import rollup_days
+        day = timezone.localdate(instance.created_at)
+        transaction.on_commit(lambda: rollup_days(day))
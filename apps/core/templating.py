@@ -0,0 +1,45 @@
+"""
+Xabar shablonlarini oldindan kompilyatsiya qilish.
+
+Shablon bir marta bo'laklarga ajratiladi (matn va placeholder nomlari), keyin
+har bir render faqat join - qayta qidirish/replace yo'q.
+Berilmagan placeholder matnda {nomi} ko'rinishida qoladi.
+"""
+import re
+from typing import FrozenSet, Tuple
+
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+
+class CompiledTemplate:
+    """Kompilyatsiya qilingan shablon"""
+
+    __slots__ = ('parts', 'placeholders')
+
+    def __init__(self, content: str):
+        parts = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(content):
+            if match.start() > pos:
+                parts.append((content[pos:match.start()], None))
+            parts.append((match.group(0), match.group(1)))
+            pos = match.end()
+        if pos < len(content):
+            parts.append((content[pos:], None))
+
+        # (literal, placeholder nomi yoki None)
+        self.parts: Tuple[Tuple[str, str], ...] = tuple(parts)
+        self.placeholders: FrozenSet[str] = frozenset(name for _, name in parts if name)
+
+    def render(self, **kwargs) -> str:
+        if not kwargs or not self.placeholders:
+            return ''.join(literal for literal, _ in self.parts)
+        return ''.join(
+            str(kwargs[name]) if name is not None and name in kwargs else literal
+            for literal, name in self.parts
+        )
+
+
+def find_placeholders(content: str) -> set:
+    """Matndagi placeholder nomlari"""
+    return set(PLACEHOLDER_RE.findall(content))
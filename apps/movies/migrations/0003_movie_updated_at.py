@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_movie_country_savedmovie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Yangilangan'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_movie_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(blank=True, null=True, verbose_name='Telegram ID')),
+                ('source', models.CharField(choices=[('code', 'Kod orqali'), ('button', 'Tugma orqali'), ('random', 'Tasodifiy'), ('saved', 'Saqlanganlar')], default='code', max_length=10, verbose_name='Manba')),
+                ('created_at', models.DateTimeField(verbose_name="Ko'rilgan vaqt")),
+                ('movie', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='view_events', to='movies.movie', verbose_name='Kino')),
+            ],
+            options={
+                'verbose_name': "Ko'rish",
+                'verbose_name_plural': "Ko'rishlar",
+                'indexes': [models.Index(fields=['created_at', 'movie'], name='movieview_created_movie')],
+            },
+        ),
+    ]
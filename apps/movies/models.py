@@ -90,6 +90,8 @@ class Movie(models.Model):
 
     # Vaqtlar
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Qo'shilgan vaqt")
+    # Bot katalogi shu maydon bo'yicha yangilanadi (update_fields ishlatilsa ham qo'shish kerak)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Yangilangan')
     added_by = models.ForeignKey(
         'users.User',
         on_delete=models.SET_NULL,
@@ -143,3 +145,42 @@ class SavedMovie(models.Model):
 
     def __str__(self):
         return f"{self.user.full_name} - {self.movie.title}"
+
+
+class MovieView(models.Model):
+    """Kino ko'rish voqeasi (faqat qo'shiladi) - kunlik ko'rishlar va trend shu jadvaldan"""
+
+    SOURCE_CODE = 'code'
+    SOURCE_BUTTON = 'button'
+    SOURCE_RANDOM = 'random'
+    SOURCE_SAVED = 'saved'
+
+    SOURCE_CHOICES = [
+        (SOURCE_CODE, 'Kod orqali'),
+        (SOURCE_BUTTON, 'Tugma orqali'),
+        (SOURCE_RANDOM, 'Tasodifiy'),
+        (SOURCE_SAVED, 'Saqlanganlar'),
+    ]
+
+    # Bot buferidan keyinroq yoziladi - kino o'chirilgan bo'lsa ham yozuv tushishi kerak
+    movie = models.ForeignKey(
+        Movie,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='view_events',
+        verbose_name='Kino'
+    )
+    user_id = models.BigIntegerField(blank=True, null=True, verbose_name='Telegram ID')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_CODE, verbose_name='Manba')
+    created_at = models.DateTimeField(verbose_name="Ko'rilgan vaqt")
+
+    class Meta:
+        verbose_name = "Ko'rish"
+        verbose_name_plural = "Ko'rishlar"
+        indexes = [
+            # Kunlik rollup, trend (oxirgi 24 soat) va eskilarini o'chirish - vaqt oralig'i bo'yicha
+            models.Index(fields=['created_at', 'movie'], name='movieview_created_movie'),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} @ {self.created_at:%d.%m.%Y %H:%M}"
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_admin_messages'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Yaratilgan'),
+        ),
+    ]
@@ -75,7 +75,7 @@ class Payment(models.Model):
     )
     approved_at = models.DateTimeField(blank=True, null=True, verbose_name='Tasdiqlangan vaqt')
 
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Yaratilgan')
 
     class Meta:
         verbose_name = "To'lov"
@@ -123,5 +123,6 @@ class PendingPaymentSession(models.Model):
 
     @classmethod
     def cleanup_expired(cls):
-        """Muddati tugagan sessiyalarni o'chirish"""
-        cls.objects.filter(expires_at__lt=timezone.now()).delete()
+        """Muddati tugagan sessiyalarni o'chirish (o'chirilganlar soni)"""
+        deleted, _ = cls.objects.filter(expires_at__lt=timezone.now()).delete()
+        return deleted
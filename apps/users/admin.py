@@ -1,15 +1,16 @@
 from django.contrib import admin
 from django.utils import timezone
 from django.utils.html import format_html
+from apps.core.invalidation import publish, KIND_USER
 from .models import User, Admin
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ['user_id', 'full_name', 'username', 'premium_badge', 'movies_watched', 'created_at']
-    list_filter = ['is_premium', 'is_banned', 'created_at']
+    list_filter = ['is_premium', 'is_banned', 'unreachable_reason', 'created_at']
     search_fields = ['user_id', 'username', 'full_name']
-    readonly_fields = ['user_id', 'referral_code', 'movies_watched', 'created_at', 'last_active']
+    readonly_fields = ['user_id', 'referral_code', 'movies_watched', 'unreachable_reason', 'unreachable_at', 'created_at', 'last_active']
     ordering = ['-created_at']
 
     fieldsets = (
@@ -26,7 +27,7 @@ class UserAdmin(admin.ModelAdmin):
             'fields': ('movies_watched',)
         }),
         ('Holat', {
-            'fields': ('is_banned', 'ban_reason')
+            'fields': ('is_banned', 'ban_reason', 'unreachable_reason', 'unreachable_at')
         }),
         ('Vaqtlar', {
             'fields': ('created_at', 'last_active')
@@ -56,13 +57,21 @@ class UserAdmin(admin.ModelAdmin):
 
     @admin.action(description='Bloklash')
     def ban_users(self, request, queryset):
-        queryset.update(is_banned=True)
-        self.message_user(request, f'{queryset.count()} foydalanuvchi bloklandi.')
+        # is_banned bo'yicha filtrlangan bo'lsa update dan keyin queryset bo'sh - id larni oldin olamiz
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        User.objects.filter(user_id__in=user_ids).update(is_banned=True)
+        # update() signal yubormaydi - bot cache ini qo'lda tozalaymiz
+        for user_id in user_ids:
+            publish(KIND_USER, user_id)
+        self.message_user(request, f'{len(user_ids)} foydalanuvchi bloklandi.')
 
     @admin.action(description='Blokdan chiqarish')
     def unban_users(self, request, queryset):
-        queryset.update(is_banned=False, ban_reason='')
-        self.message_user(request, f'{queryset.count()} foydalanuvchi blokdan chiqarildi.')
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        User.objects.filter(user_id__in=user_ids).update(is_banned=False, ban_reason='')
+        for user_id in user_ids:
+            publish(KIND_USER, user_id)
+        self.message_user(request, f'{len(user_ids)} foydalanuvchi blokdan chiqarildi.')
 
 
 @admin.register(Admin)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_premium_first_view'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unreachable_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Yetkazib bo'lmaydi (vaqt)"),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='unreachable_reason',
+            field=models.CharField(blank=True, choices=[('blocked', 'Botni bloklagan'), ('deactivated', "Akkaunt o'chirilgan"), ('not_found', 'Chat topilmadi')], default='', max_length=20, verbose_name="Yetkazib bo'lmaydi"),
+        ),
+    ]
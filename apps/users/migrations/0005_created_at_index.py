@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_unreachable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Ro'yxatdan o'tgan"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PremiumReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expires_at', models.DateTimeField(verbose_name='Premium tugash vaqti')),
+                ('kind', models.CharField(choices=[('expiring', 'Tugashiga oz qoldi')], default='expiring', max_length=20, verbose_name='Turi')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yuborilgan')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='premium_reminders', to='users.user', verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Premium eslatma',
+                'verbose_name_plural': 'Premium eslatmalar',
+                'constraints': [models.UniqueConstraint(fields=('user', 'expires_at', 'kind'), name='unique_premium_reminder')],
+            },
+        ),
+    ]
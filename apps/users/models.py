@@ -6,6 +6,16 @@ from django.utils import timezone
 class User(models.Model):
     """Telegram foydalanuvchi modeli"""
 
+    UNREACHABLE_BLOCKED = 'blocked'
+    UNREACHABLE_DEACTIVATED = 'deactivated'
+    UNREACHABLE_NOT_FOUND = 'not_found'
+
+    UNREACHABLE_CHOICES = [
+        (UNREACHABLE_BLOCKED, 'Botni bloklagan'),
+        (UNREACHABLE_DEACTIVATED, "Akkaunt o'chirilgan"),
+        (UNREACHABLE_NOT_FOUND, 'Chat topilmadi'),
+    ]
+
     user_id = models.BigIntegerField(unique=True, verbose_name='Telegram ID')
     username = models.CharField(max_length=255, blank=True, null=True, verbose_name='Username')
     full_name = models.CharField(max_length=255, verbose_name="To'liq ism")
@@ -48,8 +58,14 @@ class User(models.Model):
     is_banned = models.BooleanField(default=False, verbose_name='Bloklangan')
     ban_reason = models.TextField(blank=True, null=True, verbose_name='Bloklash sababi')
 
+    # Xabar yetkazib bo'lmaydi (botni bloklagan / akkaunt o'chirilgan) - yangi xabar yozsa tozalanadi
+    unreachable_reason = models.CharField(
+        max_length=20, choices=UNREACHABLE_CHOICES, blank=True, default='', verbose_name='Yetkazib bo\'lmaydi'
+    )
+    unreachable_at = models.DateTimeField(blank=True, null=True, verbose_name='Yetkazib bo\'lmaydi (vaqt)')
+
     # Vaqtlar
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ro'yxatdan o'tgan")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Ro'yxatdan o'tgan")
     last_active = models.DateTimeField(auto_now=True, verbose_name='Oxirgi faollik')
 
     class Meta:
@@ -72,6 +88,25 @@ class User(models.Model):
                 self.free_trial_expires = timezone.now() + timedelta(days=settings.free_trial_days)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saqlashda nima o'zgarganini bilish uchun (cache invalidatsiya - apps/core/signals.py)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_changed_fields(self):
+        """Bazadan o'qilgandan beri o'zgargan maydonlar (yangi obyekt uchun None)"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        # Yuklanmagan (deferred) maydonlarga tegmaymiz - ular __dict__ da bo'lmaydi
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (field.attname not in loaded or self.__dict__[field.attname] != loaded[field.attname])
+        }
+
     def _generate_referral_code(self):
         while True:
             code = secrets.token_hex(4).upper()
@@ -180,3 +215,30 @@ class Admin(models.Model):
             self.can_broadcast = True
             self.can_manage_users = True
         super().save(*args, **kwargs)
+
+
+class PremiumReminder(models.Model):
+    """Yuborilgan premium eslatmalari jurnali - bitta obuna muddati uchun eslatma bir marta"""
+
+    KIND_EXPIRING = 'expiring'
+
+    KIND_CHOICES = [
+        (KIND_EXPIRING, 'Tugashiga oz qoldi'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='premium_reminders', verbose_name='Foydalanuvchi')
+    # Uzaytirilsa premium_expires o'zgaradi - yangi muddat uchun eslatma yana yuboriladi
+    expires_at = models.DateTimeField(verbose_name='Premium tugash vaqti')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_EXPIRING, verbose_name='Turi')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yuborilgan')
+
+    class Meta:
+        verbose_name = 'Premium eslatma'
+        verbose_name_plural = 'Premium eslatmalar'
+        constraints = [
+            # Scheduler NOT EXISTS so'rovi shu index bo'yicha
+            models.UniqueConstraint(fields=['user', 'expires_at', 'kind'], name='unique_premium_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} ({self.expires_at:%d.%m.%Y %H:%M})"
@@ -4,19 +4,76 @@ Barcha hardcoded qiymatlar shu yerda saqlanadi.
 """
 
 # Cache TTL (Time To Live) - sekundlarda
-CACHE_TTL_USER = 60  # User cache - 1 daqiqa
-CACHE_TTL_SETTINGS = 300  # Settings cache - 5 daqiqa
-CACHE_TTL_ADMIN = 300  # Admin cache - 5 daqiqa
-CACHE_TTL_MOVIES = 120  # Movies cache - 2 daqiqa
+# User/settings/admin/kanallar o'zgarganda invalidatsiya orqali tozalanadi - TTL katta bo'lishi mumkin
+CACHE_TTL_USER = 600  # User cache - 10 daqiqa
+CACHE_TTL_SETTINGS = 3600  # Settings cache - 1 soat
+CACHE_TTL_ADMIN = 3600  # Admin cache - 1 soat
+CACHE_TTL_CHANNELS = 3600  # Majburiy kanallar ro'yxati - 1 soat
 CACHE_TTL_CATEGORIES = 300  # Categories cache - 5 daqiqa
 CACHE_TTL_BOT_INFO = 3600  # Bot info cache - 1 soat
 CACHE_TTL_SUBSCRIPTION = 600  # Subscription pending cache - 10 daqiqa
+CACHE_TTL_CAPTION = 300  # Kino caption - ko'rishlar soni shu oraliqda yangilanadi
+CACHE_TTL_ADMIN_STATS = 30  # Admin statistika natijalari (tugmani qayta bosish jadvallarni qayta skanerlamaydi)
 
 # Cache max size
 CACHE_MAX_USERS = 1000
-CACHE_MAX_MOVIES = 100
 CACHE_MAX_ADMINS = 100
 CACHE_MAX_PENDING_SUBS = 10000
+CACHE_MAX_CAPTIONS = 5000
+CACHE_MAX_PENDING_PAYMENTS = 10000
+
+# Obuna tekshirish
+SUBSCRIPTION_CHECK_TIMEOUT = 3.0  # Barcha kanallar uchun umumiy timeout (sekund)
+SUBSCRIPTION_CHECK_CONCURRENCY = 10  # Bir vaqtda nechta get_chat_member so'rovi
+CACHE_TTL_MEMBERSHIP = 86400  # ChannelMember indeksi yozuvi - 1 kun (keyin API orqali qayta tekshiriladi)
+
+# Ko'rishlar hisoblagichi (write-behind)
+COUNTER_FLUSH_INTERVAL = 5  # Bazaga yozish oralig'i (sekund) - crash bo'lsa shu oraliq yo'qoladi
+COUNTER_FLUSH_THRESHOLD = 1000  # Shuncha kalit yig'ilsa interval kutilmasdan yoziladi
+VIEW_EVENTS_MAX_PENDING = 50000  # Baza ishlamasa xotirada saqlanadigan ko'rish voqealari chegarasi
+
+# Trend (oxirgi soatlardagi ko'rishlar bo'yicha)
+TRENDING_WINDOW_HOURS = 24
+CACHE_TTL_TRENDING = 300  # Trend ro'yxati cache - 5 daqiqa
+
+# Kino katalogi (xotiradagi code -> kino)
+CATALOG_REFRESH_INTERVAL = 30  # O'zgargan kinolarni yuklash oralig'i (sekund)
+CATALOG_FULL_RELOAD_INTERVAL = 600  # To'liq qayta yuklash - ko'rishlar soni va o'tkazib yuborilgan o'chirishlar uchun
+
+# Premium scheduler
+PREMIUM_INVALIDATE_EACH_LIMIT = 200  # Bundan ko'p user o'chirilsa butun user cache tozalanadi
+PREMIUM_REMINDER_BEFORE = 86400  # "Tugashiga oz qoldi" eslatmasi - tugashdan 1 kun oldin
+
+# Muddatlar scheduleri (heap)
+DEADLINE_HORIZON = 7200  # Heap ga shuncha sekund ichidagi muddatlar yuklanadi
+DEADLINE_REFRESH_INTERVAL = 3600  # Bazadan qayta yuklash oralig'i (horizondan kichik bo'lishi kerak)
+
+# Statistika rollup (DailyStats)
+STATS_ROLLUP_INTERVAL = 300  # Oxirgi kunlarni qayta hisoblash oralig'i (sekund)
+STATS_ROLLUP_DAYS = 2  # Har safar qayta hisoblanadigan kunlar (bugun + kecha)
+
+# DB ulanishlari (eskirganlarini yopish oralig'i, sekund)
+DB_MAINTENANCE_INTERVAL = 60
+
+# Cache invalidatsiya (Redis bo'lmaganda DB jurnali so'raladi)
+INVALIDATION_POLL_INTERVAL = 2  # Jurnalni tekshirish oralig'i (sekund)
+INVALIDATION_RETENTION = 3600  # Jurnal yozuvlari saqlanadigan vaqt (sekund)
+
+# Broadcast (Telegram limiti ~30 xabar/sek)
+BROADCAST_RATE = 25  # Xabar/sek - barcha yuboruvchilar uchun umumiy
+BROADCAST_BURST = 5  # Token bucket sig'imi
+BROADCAST_CONCURRENCY = 10  # Bir vaqtda yuborilayotgan so'rovlar
+BROADCAST_MAX_RETRIES = 3  # RetryAfter dan keyin qayta urinishlar
+BROADCAST_PROGRESS_INTERVAL = 5  # Admin progress xabarini yangilash oralig'i (sekund)
+BROADCAST_ALBUM_WAIT = 1.0  # Albom qismlarini yig'ish uchun kutish (sekund)
+BROADCAST_CHUNK_SIZE = 100  # Checkpoint oralig'i - qayta ishga tushganda ko'pi bilan shuncha yo'qoladi
+BROADCAST_SCHEDULE_INTERVAL = 30  # Rejalashtirilganlarni tekshirish oralig'i (sekund)
+BROADCAST_MATERIALIZE_AHEAD = 600  # Auditoriya boshlanishdan shuncha sekund oldin tayyorlanadi
+BROADCAST_MATERIALIZE_BATCH = 5000  # Auditoriyani yozishda bitta INSERT hajmi
+BROADCAST_LOCK_TTL = 300  # Har chunk oldidan uzaytiriladi; o'tib ketsa job egasiz deb davom ettiriladi
+
+# Yetakchi (bir nechta replika - job larni faqat bittasi bajaradi)
+LEADER_LEASE_TTL = 30  # Lease muddati (sekund), har TTL/3 da yangilanadi
 
 # Pagination
 DEFAULT_PER_PAGE = 8
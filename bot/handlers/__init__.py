@@ -4,10 +4,12 @@ from .user import router as user_router
 from .admin import router as admin_router
 from .payment import router as payment_router
 from .inline import router as inline_router
+from .channel import router as channel_router
 
 router = Router()
 # Admin routeri birinchi - state handlerlar to'g'ri ishlashi uchun
 router.include_router(admin_router)
 router.include_router(payment_router)
 router.include_router(inline_router)
+router.include_router(channel_router)
 router.include_router(user_router)
@@ -1,10 +1,14 @@
+import asyncio
+from datetime import datetime, timedelta
+
 from aiogram import Router, F, Bot
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Count, Sum, Max
+from django.db.models import Count, Sum, Max, Q
 
 from apps.users.models import User, Admin
 from apps.movies.models import Movie, Category
@@ -14,15 +18,26 @@ from bot.filters import IsAdmin, CanAddMovies, CanBroadcast, CanManageUsers, Can
 from bot.states import AddMovieState, BroadcastState, AddChannelState, EditSettingsState, EditMessageState, UserSearchState, AddCategoryState, EditCategoryState
 from bot.keyboards import (
     admin_categories_kb, movie_quality_kb, movie_language_kb, movie_country_kb,
-    broadcast_target_kb, broadcast_ad_kb, confirm_broadcast_kb,
+    broadcast_target_kb, broadcast_ad_kb, broadcast_segment_kb, confirm_broadcast_kb, broadcast_control_kb,
     cancel_inline_kb, admin_main_kb, skip_inline_kb,
     main_menu_inline_kb, back_kb, admin_messages_kb
 )
 from apps.channels.models import Channel
 from bot.utils import format_number
+from bot.constants import BROADCAST_ALBUM_WAIT, BROADCAST_LOCK_TTL, CACHE_TTL_ADMIN_STATS
+from bot.utils.cache import get_cache
+from bot.utils.catalog import catalog
+from bot.utils.scheduler import schedule_premium
+from bot.utils.broadcast import (
+    BroadcastProgress, BroadcastSender, FAILURE_FLOOD, FAILURE_ERROR, LOCK_OWNER, parse_buttons,
+    start_broadcast, pause_broadcast, resume_broadcast, cancel_broadcast,
+)
 
 router = Router()
 
+# Statistika natijalari - umumiy cache, qisqa TTL
+_stats_cache = get_cache('admin_stats', ttl=CACHE_TTL_ADMIN_STATS, maxsize=16)
+
 
 # ==================== ADMIN PANEL ====================
 
@@ -257,6 +272,7 @@ async def admin_movie_toggle(callback: CallbackQuery):
     """Kino aktiv/deaktiv"""
     code = callback.data.split(":")[2]
     new_status = await toggle_movie_status(code)
+    catalog.invalidate(code)
     status_text = "aktiv" if new_status else "deaktiv"
     await callback.answer(f"✅ Kino {status_text} qilindi!", show_alert=True)
 
@@ -266,6 +282,7 @@ async def admin_movie_premium(callback: CallbackQuery):
     """Kino premium/oddiy"""
     code = callback.data.split(":")[2]
     new_status = await toggle_movie_premium(code)
+    catalog.invalidate(code)
     status_text = "Premium" if new_status else "Oddiy"
     await callback.answer(f"✅ Kino {status_text} qilindi!", show_alert=True)
 
@@ -295,6 +312,7 @@ async def admin_movie_delete_confirm(callback: CallbackQuery):
     """Kinoni o'chirish - tasdiqlangan"""
     code = callback.data.split(":")[2]
     result = await delete_movie(code)
+    catalog.invalidate(code, deleted=result)
 
     if result:
         await callback.answer("✅ Kino o'chirildi!", show_alert=True)
@@ -758,6 +776,7 @@ async def add_movie_confirm(callback: CallbackQuery, state: FSMContext, db_user:
         is_premium=data.get('is_premium', False),
         added_by_id=db_user.user_id if db_user else None
     )
+    catalog.invalidate(movie.code)
 
     # Kategoriya nomini olish
     category_name = "Yo'q"
@@ -1234,16 +1253,62 @@ async def broadcast_is_ad(callback: CallbackQuery, state: FSMContext):
     """Reklama tanash"""
     is_ad = callback.data.split(":")[1] == "yes"
     await state.update_data(is_ad=is_ad)
-    await state.set_state(BroadcastState.content)
+    await state.set_state(BroadcastState.segment)
 
+    channels = await get_channels()
     await callback.message.edit_text(
         "✅ Tanlandi.\n\n"
-        "📝 Endi xabarni yuboring (matn, rasm, video yoki fayl):\n\n"
+        "🎯 Auditoriya segmentini tanlang:",
+        reply_markup=broadcast_segment_kb(Movie.LANGUAGE_CHOICES, channels)
+    )
+    await callback.answer()
+
+
+@router.callback_query(BroadcastState.segment, F.data.startswith("broadcast_segment:"))
+async def broadcast_segment(callback: CallbackQuery, state: FSMContext):
+    """Segment tanlash"""
+    parts = callback.data.split(":")
+    kind = parts[1]
+
+    segment = None
+    if kind == "trial":
+        segment = {"trial": True}
+    elif kind == "inactive":
+        segment = {"inactive_days": int(parts[2])}
+    elif kind == "language":
+        segment = {"language": parts[2]}
+    elif kind == "channel":
+        segment = {"channel_id": int(parts[2])}
+
+    await state.update_data(segment=segment)
+    await state.set_state(BroadcastState.content)
+
+    await callback.message.edit_text(
+        f"✅ Segment: {await describe_segment(segment)}\n\n"
+        "📝 Endi xabarni yuboring (istalgan turdagi xabar yoki albom):\n\n"
         "<i>Bekor qilish uchun /cancel buyrug'ini yuboring</i>"
     )
     await callback.answer()
 
 
+async def describe_segment(segment: dict = None) -> str:
+    """Segment matni"""
+    if not segment:
+        return "Segmentsiz"
+
+    parts = []
+    if segment.get('trial'):
+        parts.append("Trial faol")
+    if segment.get('inactive_days'):
+        parts.append(f"{segment['inactive_days']} kun faol emas")
+    if segment.get('language'):
+        parts.append(f"Kino tili: {dict(Movie.LANGUAGE_CHOICES).get(segment['language'], segment['language'])}")
+    if segment.get('channel_id'):
+        channel = await get_channel_by_id(segment['channel_id'])
+        parts.append(f"Kanal: {channel.title if channel else segment['channel_id']}")
+    return ", ".join(parts)
+
+
 @router.message(Command("cancel"), IsAdmin())
 async def cancel_broadcast_cmd(message: Message, state: FSMContext):
     """Broadcast bekor qilish"""
@@ -1255,52 +1320,120 @@ async def cancel_broadcast_cmd(message: Message, state: FSMContext):
         await message.answer("Bekor qilinadigan amal yo'q.")
 
 
+BROADCAST_BUTTONS_HINT = (
+    "Har bir qatorga: <code>Matn - https://link</code>\n"
+    "Bir qatorda bir nechta tugma: <code>Kanal - https://t.me/kanal | Sayt - https://site.uz</code>"
+)
+
+# media_group_id -> albom xabarlari ID lari (qismlar alohida update bo'lib keladi)
+_album_parts = {}
+_album_tasks = set()
+
+
 @router.message(BroadcastState.content)
 async def broadcast_content(message: Message, state: FSMContext):
-    """Xabar kontenti"""
-    data = await state.get_data()
-
-    # Kontent turini aniqlash
-    content_type = "text"
-    file_id = ""
-    text = ""
-
-    if message.text:
-        content_type = "text"
-        text = message.text
-    elif message.photo:
-        content_type = "photo"
-        file_id = message.photo[-1].file_id
-        text = message.caption or ""
-    elif message.video:
-        content_type = "video"
-        file_id = message.video.file_id
-        text = message.caption or ""
-    elif message.document:
-        content_type = "document"
-        file_id = message.document.file_id
-        text = message.caption or ""
+    """Xabar kontenti - asl xabar copy_message bilan nusxalanadi"""
+    if message.media_group_id:
+        return await _collect_broadcast_album(message, state)
 
     await state.update_data(
-        content_type=content_type,
-        file_id=file_id,
-        text=text
+        content_type="copy",
+        source_chat_id=message.chat.id,
+        source_message_ids=[message.message_id],
+        text=message.text or message.caption or "",
+        file_id="",
+        buttons=None
     )
+    await state.set_state(BroadcastState.buttons)
+
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⏭ O'tkazib yuborish", callback_data="broadcast_buttons:skip")],
+        [InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel")]
+    ])
+    await message.answer(
+        "🔘 <b>Inline tugmalar qo'shasizmi?</b>\n\n" + BROADCAST_BUTTONS_HINT,
+        reply_markup=kb
+    )
+
+
+async def _collect_broadcast_album(message: Message, state: FSMContext):
+    """Albom qismlarini yig'ish - BROADCAST_ALBUM_WAIT dan keyin preview"""
+    parts = _album_parts.get(message.media_group_id)
+    if parts is not None:
+        parts.append(message.message_id)
+        return
+
+    _album_parts[message.media_group_id] = [message.message_id]
+
+    async def finish():
+        await asyncio.sleep(BROADCAST_ALBUM_WAIT)
+        message_ids = sorted(_album_parts.pop(message.media_group_id))
+        await state.update_data(
+            content_type="album",
+            source_chat_id=message.chat.id,
+            source_message_ids=message_ids,
+            text=message.caption or "",
+            file_id="",
+            buttons=None
+        )
+        # copy_messages inline tugmalarni qo'llab-quvvatlamaydi
+        await _broadcast_preview(message, state)
+
+    # Handler kutmaydi - qolgan qismlar shu vaqtda qabul qilinadi
+    task = asyncio.create_task(finish())
+    _album_tasks.add(task)
+    task.add_done_callback(_album_tasks.discard)
+
+
+@router.message(BroadcastState.buttons, F.text)
+async def broadcast_buttons(message: Message, state: FSMContext):
+    """Inline tugmalar"""
+    try:
+        buttons = parse_buttons(message.text)
+    except ValueError as e:
+        await message.answer(f"❌ {e}\n\n" + BROADCAST_BUTTONS_HINT)
+        return
+
+    await state.update_data(buttons=buttons)
+    await _broadcast_preview(message, state)
+
+
+@router.callback_query(BroadcastState.buttons, F.data == "broadcast_buttons:skip")
+async def broadcast_buttons_skip(callback: CallbackQuery, state: FSMContext):
+    """Tugmalarsiz"""
+    await callback.message.delete()
+    await _broadcast_preview(callback.message, state)
+    await callback.answer()
+
+
+async def _broadcast_preview(message: Message, state: FSMContext):
+    """Adminga aynan foydalanuvchilar ko'radigan xabarni yuborish va tasdiqlash"""
+    data = await state.get_data()
     await state.set_state(BroadcastState.confirm)
 
-    # Preview ko'rsatish
+    preview = BroadcastSender(
+        message.bot,
+        data['content_type'],
+        source_chat_id=data['source_chat_id'],
+        source_message_ids=data['source_message_ids'],
+        buttons=data.get('buttons'),
+    )
+    await preview.send_one(message.chat.id)
+
     target_text = {"all": "Hammaga", "premium": "Premium", "regular": "Oddiy"}
+    type_text = {"copy": "Xabar", "album": f"Albom ({len(data['source_message_ids'])} ta)"}
 
-    preview_text = (
-        "📨 <b>Xabar preview:</b>\n\n"
+    await message.answer(
+        "📨 <b>Xabar preview</b> (yuqorida)\n\n"
         f"📍 Kimga: {target_text[data['target']]}\n"
+        f"🎯 Segment: {await describe_segment(data.get('segment'))}\n"
         f"📢 Reklama: {'Ha' if data['is_ad'] else 'Yoq'}\n"
-        f"📝 Tur: {content_type}\n\n"
-        "Yuborishni tasdiqlaysizmi?"
+        f"📝 Tur: {type_text[data['content_type']]}\n"
+        f"🔘 Tugmalar: {sum(len(row) for row in data.get('buttons') or [])} ta\n\n"
+        "Yuborishni tasdiqlaysizmi?",
+        reply_markup=confirm_broadcast_kb()
     )
 
-    await message.answer(preview_text, reply_markup=confirm_broadcast_kb())
-
 
 @router.callback_query(BroadcastState.confirm, F.data == "confirm_broadcast")
 async def broadcast_confirm(callback: CallbackQuery, state: FSMContext, db_user: User = None, bot: Bot = None):
@@ -1308,8 +1441,6 @@ async def broadcast_confirm(callback: CallbackQuery, state: FSMContext, db_user:
     data = await state.get_data()
     await state.clear()
 
-    await callback.message.edit_text("📨 Xabar yuborilmoqda...")
-
     # Broadcast yaratish
     broadcast = await create_broadcast(
         target=data['target'],
@@ -1317,55 +1448,159 @@ async def broadcast_confirm(callback: CallbackQuery, state: FSMContext, db_user:
         text=data['text'],
         file_id=data['file_id'],
         is_ad=data['is_ad'],
-        sent_by_id=db_user.user_id if db_user else None
+        sent_by_id=db_user.user_id if db_user else None,
+        source_chat_id=data.get('source_chat_id'),
+        source_message_ids=data.get('source_message_ids'),
+        buttons=data.get('buttons'),
+        segment=data.get('segment')
     )
 
-    # Foydalanuvchilarni olish
-    users = await get_broadcast_users(data['target'], data['is_ad'])
+    # Yuborish background task da - handler darhol qaytadi
+    start_broadcast(bot, broadcast.id, **_broadcast_callbacks(callback.message, broadcast.id))
 
-    await update_broadcast_total(broadcast.id, len(users))
+    await callback.message.edit_text(
+        f"📨 Xabar yuborilmoqda... (#{broadcast.id})",
+        reply_markup=broadcast_control_kb(broadcast.id)
+    )
+    await callback.answer()
 
-    # Yuborish
-    sent = 0
-    failed = 0
 
-    for user in users:
-        try:
-            if data['content_type'] == 'text':
-                await bot.send_message(user.user_id, data['text'])
-            elif data['content_type'] == 'photo':
-                await bot.send_photo(user.user_id, data['file_id'], caption=data['text'])
-            elif data['content_type'] == 'video':
-                await bot.send_video(user.user_id, data['file_id'], caption=data['text'])
-            elif data['content_type'] == 'document':
-                await bot.send_document(user.user_id, data['file_id'], caption=data['text'])
-            sent += 1
-        except Exception:
-            failed += 1
-
-        # Har 20 ta xabardan keyin progress
-        if (sent + failed) % 20 == 0:
-            await callback.message.edit_text(
-                f"📨 Yuborilmoqda... {sent + failed}/{len(users)}"
-            )
+@router.callback_query(BroadcastState.confirm, F.data == "schedule_broadcast")
+async def broadcast_schedule_start(callback: CallbackQuery, state: FSMContext):
+    """Rejalashtirish vaqtini so'rash"""
+    await state.set_state(BroadcastState.schedule)
+    await callback.message.edit_text(
+        "🕒 <b>Qachon yuborilsin?</b>\n\n"
+        "Vaqtni kiriting: <code>KK.OO.YYYY SS:DD</code>\n"
+        f"<i>Masalan: {(timezone.localtime() + timedelta(hours=1)).strftime('%d.%m.%Y %H:%M')}</i>",
+        reply_markup=cancel_inline_kb()
+    )
+    await callback.answer()
 
-    # Yakunlash
-    await complete_broadcast(broadcast.id, sent, failed)
 
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬅️ Admin panel", callback_data="admin:panel")]
-    ])
+@router.message(BroadcastState.schedule, F.text)
+async def broadcast_schedule(message: Message, state: FSMContext, db_user: User = None):
+    """Rejalashtirilgan broadcast yaratish"""
+    try:
+        scheduled_at = timezone.make_aware(datetime.strptime(message.text.strip(), "%d.%m.%Y %H:%M"))
+    except ValueError:
+        await message.answer("❌ Noto'g'ri format! Masalan: <code>25.12.2025 18:30</code>")
+        return
 
-    await callback.message.edit_text(
-        f"✅ <b>Xabar yuborish yakunlandi!</b>\n\n"
-        f"📊 Jami: {len(users)}\n"
-        f"✅ Yuborildi: {sent}\n"
-        f"❌ Xato: {failed}",
-        reply_markup=kb
+    if scheduled_at <= timezone.now():
+        await message.answer("❌ Vaqt kelajakda bo'lishi kerak!")
+        return
+
+    data = await state.get_data()
+    await state.clear()
+
+    broadcast = await create_broadcast(
+        target=data['target'],
+        content_type=data['content_type'],
+        text=data['text'],
+        file_id=data['file_id'],
+        is_ad=data['is_ad'],
+        sent_by_id=db_user.user_id if db_user else None,
+        source_chat_id=data.get('source_chat_id'),
+        source_message_ids=data.get('source_message_ids'),
+        buttons=data.get('buttons'),
+        segment=data.get('segment'),
+        scheduled_at=scheduled_at
+    )
+
+    await message.answer(
+        f"✅ Broadcast #{broadcast.id} rejalashtirildi: "
+        f"<b>{timezone.localtime(scheduled_at).strftime('%d.%m.%Y %H:%M')}</b>\n\n"
+        "Yakunlangach sizga xabar beriladi.",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="⛔ Bekor qilish", callback_data=f"broadcast_ctl:cancel:{broadcast.id}")],
+            [InlineKeyboardButton(text="⬅️ Admin panel", callback_data="admin:panel")]
+        ])
     )
 
 
+BROADCAST_FAILURE_LABELS = {
+    **dict(User.UNREACHABLE_CHOICES),
+    FAILURE_FLOOD: 'Flood limit',
+    FAILURE_ERROR: 'Boshqa xato',
+}
+
+
+def _broadcast_failures_text(progress: BroadcastProgress) -> str:
+    return "".join(
+        f"   • {BROADCAST_FAILURE_LABELS.get(kind, kind)}: {format_number(count)}\n"
+        for kind, count in progress.failures.most_common()
+    )
+
+
+def _broadcast_callbacks(message: Message, broadcast_id: int) -> dict:
+    """Progress va yakuniy natijani admin xabarida ko'rsatish"""
+
+    async def on_progress(progress: BroadcastProgress):
+        eta = progress.eta
+        eta_text = f"{int(eta // 60)} daq {int(eta % 60)} sek" if eta is not None else "—"
+        percent = progress.done * 100 // progress.total if progress.total else 0
+
+        await message.edit_text(
+            f"📨 <b>Yuborilmoqda...</b> (#{broadcast_id})\n\n"
+            f"📊 {format_number(progress.done)}/{format_number(progress.total)} ({percent}%)\n"
+            f"✅ Yuborildi: {format_number(progress.sent)}\n"
+            f"❌ Xato: {format_number(progress.failed)}\n"
+            f"{_broadcast_failures_text(progress)}"
+            f"⚡️ Tezlik: {progress.rate:.1f} xabar/sek\n"
+            f"⏳ Qoldi: {eta_text}",
+            reply_markup=broadcast_control_kb(broadcast_id)
+        )
+
+    async def on_done(progress: BroadcastProgress):
+        kb = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="⬅️ Admin panel", callback_data="admin:panel")]
+        ])
+        await message.edit_text(
+            f"✅ <b>Xabar yuborish yakunlandi!</b>\n\n"
+            f"📊 Jami: {format_number(progress.total)}\n"
+            f"✅ Yuborildi: {format_number(progress.sent)}\n"
+            f"❌ Xato: {format_number(progress.failed)}\n"
+            f"{_broadcast_failures_text(progress)}",
+            reply_markup=kb
+        )
+
+    return {'on_progress': on_progress, 'on_done': on_done}
+
+
+@router.callback_query(F.data.startswith("broadcast_ctl:"), CanBroadcast())
+async def broadcast_control(callback: CallbackQuery, bot: Bot = None):
+    """Broadcast ni to'xtatish / davom ettirish / bekor qilish"""
+    _, action, broadcast_id = callback.data.split(":")
+    broadcast_id = int(broadcast_id)
+
+    if action == "pause":
+        if await pause_broadcast(broadcast_id):
+            await callback.message.edit_text(
+                f"⏸ Broadcast #{broadcast_id} to'xtatildi.",
+                reply_markup=broadcast_control_kb(broadcast_id, paused=True)
+            )
+            return await callback.answer("To'xtatildi")
+    elif action == "resume":
+        if await resume_broadcast(bot, broadcast_id, **_broadcast_callbacks(callback.message, broadcast_id)):
+            await callback.message.edit_text(
+                f"📨 Xabar yuborilmoqda... (#{broadcast_id})",
+                reply_markup=broadcast_control_kb(broadcast_id)
+            )
+            return await callback.answer("Davom ettirilmoqda")
+    elif action == "cancel":
+        if await cancel_broadcast(broadcast_id):
+            await callback.message.edit_text(
+                f"⛔ Broadcast #{broadcast_id} bekor qilindi.",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="⬅️ Admin panel", callback_data="admin:panel")]
+                ])
+            )
+            return await callback.answer("Bekor qilindi")
+
+    await callback.answer("Bu broadcast allaqachon tugagan", show_alert=True)
+
+
 # ==================== TO'LOVLAR ====================
 
 @router.callback_query(F.data == "admin:payments", CanManagePayments())
@@ -2553,52 +2788,99 @@ def get_category_by_id(category_id: int):
         return None
 
 
+def _cached_stats(key: str, compute):
+    """Statistika natijasini qisqa muddat cache lash (tugmani qayta-qayta bosish uchun)"""
+    value = _stats_cache.get(key)
+    if value is None:
+        value = compute()
+        _stats_cache.set(key, value)
+    return value
+
+
+def _user_counts(now) -> dict:
+    """User jadvali bo'yicha barcha hisoblar - bitta so'rov"""
+    today_start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+    return User.objects.aggregate(
+        total=Count('id'),
+        today=Count('id', filter=Q(created_at__gte=today_start)),
+        week=Count('id', filter=Q(created_at__gte=now - timedelta(days=7))),
+        month=Count('id', filter=Q(created_at__gte=now - timedelta(days=30))),
+        active_24h=Count('id', filter=Q(last_active__gte=now - timedelta(hours=24))),
+        premium=Count('id', filter=Q(is_premium=True, premium_expires__gt=now)),
+        trial=Count('id', filter=Q(free_trial_expires__gt=now, is_premium=False)),
+        banned=Count('id', filter=Q(is_banned=True)),
+    )
+
+
+def _movie_counts() -> dict:
+    """Movie jadvali bo'yicha hisoblar - bitta so'rov"""
+    counts = Movie.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        premium=Count('id', filter=Q(is_premium=True)),
+        views=Sum('views'),
+    )
+    counts['views'] = counts['views'] or 0
+    return counts
+
+
+def _payment_counts() -> dict:
+    """Payment jadvali bo'yicha hisoblar - bitta so'rov"""
+    return Payment.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+    )
+
+
 @sync_to_async
 def get_stats():
-    from django.utils import timezone
-    today = timezone.now().date()
+    def compute():
+        users = _user_counts(timezone.now())
+        return {
+            'total_users': users['total'],
+            'today_users': users['today'],
+            'premium_users': users['premium'],
+            'total_movies': Movie.objects.count(),
+            'pending_payments': _payment_counts()['pending'],
+        }
 
-    return {
-        'total_users': User.objects.count(),
-        'today_users': User.objects.filter(created_at__date=today).count(),
-        'premium_users': User.objects.filter(is_premium=True, premium_expires__gt=timezone.now()).count(),
-        'total_movies': Movie.objects.count(),
-        'pending_payments': Payment.objects.filter(status='pending').count(),
-    }
+    return _cached_stats('main', compute)
 
 
 @sync_to_async
 def get_detailed_stats():
-    from django.utils import timezone
-    from datetime import timedelta
+    def compute():
+        users = _user_counts(timezone.now())
+        movies = _movie_counts()
+        payments = _payment_counts()
+        return {
+            'total_users': users['total'],
+            'today_users': users['today'],
+            'week_users': users['week'],
+            'month_users': users['month'],
+            'premium_users': users['premium'],
+            'trial_users': users['trial'],
+            'total_movies': movies['total'],
+            'premium_movies': movies['premium'],
+            'total_views': movies['views'],
+            'pending_payments': payments['pending'],
+            'approved_payments': payments['approved'],
+        }
 
-    now = timezone.now()
-    today = now.date()
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-
-    return {
-        'total_users': User.objects.count(),
-        'today_users': User.objects.filter(created_at__date=today).count(),
-        'week_users': User.objects.filter(created_at__gte=week_ago).count(),
-        'month_users': User.objects.filter(created_at__gte=month_ago).count(),
-        'premium_users': User.objects.filter(is_premium=True, premium_expires__gt=now).count(),
-        'trial_users': User.objects.filter(free_trial_expires__gt=now, is_premium=False).count(),
-        'total_movies': Movie.objects.count(),
-        'premium_movies': Movie.objects.filter(is_premium=True).count(),
-        'total_views': Movie.objects.aggregate(total=Sum('views'))['total'] or 0,
-        'pending_payments': Payment.objects.filter(status='pending').count(),
-        'approved_payments': Payment.objects.filter(status='approved').count(),
-    }
+    return _cached_stats('detailed', compute)
 
 
 @sync_to_async
 def get_movie_stats():
-    return {
-        'total': Movie.objects.count(),
-        'active': Movie.objects.filter(is_active=True).count(),
-        'premium': Movie.objects.filter(is_premium=True).count(),
-    }
+    def compute():
+        movies = _movie_counts()
+        return {
+            'total': movies['total'],
+            'active': movies['active'],
+            'premium': movies['premium'],
+        }
+
+    return _cached_stats('movies', compute)
 
 
 @sync_to_async
@@ -2636,7 +2918,9 @@ def create_movie(code, title, file_id, category_id, year, country, quality, lang
 
 
 @sync_to_async
-def create_broadcast(target, content_type, text, file_id, is_ad, sent_by_id):
+def create_broadcast(target, content_type, text, file_id, is_ad, sent_by_id,
+                     source_chat_id=None, source_message_ids=None, buttons=None,
+                     segment=None, scheduled_at=None):
     sent_by = None
     if sent_by_id:
         try:
@@ -2650,40 +2934,16 @@ def create_broadcast(target, content_type, text, file_id, is_ad, sent_by_id):
         text=text,
         file_id=file_id,
         is_advertisement=is_ad,
-        sent_by=sent_by
-    )
-
-
-@sync_to_async
-def get_broadcast_users(target, is_ad):
-    from django.utils import timezone
-
-    qs = User.objects.filter(is_banned=False)
-
-    if target == 'premium':
-        qs = qs.filter(is_premium=True, premium_expires__gt=timezone.now())
-    elif target == 'regular':
-        qs = qs.exclude(is_premium=True, premium_expires__gt=timezone.now())
-
-    if is_ad:
-        # Reklama xabari premium ga bormaydi
-        qs = qs.exclude(is_premium=True, premium_expires__gt=timezone.now())
-
-    return list(qs)
-
-
-@sync_to_async
-def update_broadcast_total(broadcast_id, total):
-    Broadcast.objects.filter(id=broadcast_id).update(total_users=total)
-
-
-@sync_to_async
-def complete_broadcast(broadcast_id, sent, failed):
-    Broadcast.objects.filter(id=broadcast_id).update(
-        sent_count=sent,
-        failed_count=failed,
-        is_completed=True,
-        completed_at=timezone.now()
+        sent_by=sent_by,
+        source_chat_id=source_chat_id,
+        source_message_ids=source_message_ids,
+        buttons=buttons,
+        segment=segment,
+        scheduled_at=scheduled_at,
+        status=Broadcast.STATUS_SCHEDULED if scheduled_at else Broadcast.STATUS_RUNNING,
+        # Darhol shu jarayonda yuboriladi - yetakchi uni egasiz deb olmasin
+        locked_until=None if scheduled_at else timezone.now() + timedelta(seconds=BROADCAST_LOCK_TTL),
+        lock_owner='' if scheduled_at else LOCK_OWNER,
     )
 
 
@@ -2700,19 +2960,17 @@ def get_channels():
 
 @sync_to_async
 def get_user_stats():
-    from django.utils import timezone
-    from datetime import timedelta
+    def compute():
+        users = _user_counts(timezone.now())
+        return {
+            'total': users['total'],
+            'active_24h': users['active_24h'],
+            'premium': users['premium'],
+            'trial': users['trial'],
+            'banned': users['banned'],
+        }
 
-    now = timezone.now()
-    day_ago = now - timedelta(hours=24)
-
-    return {
-        'total': User.objects.count(),
-        'active_24h': User.objects.filter(last_active__gte=day_ago).count(),
-        'premium': User.objects.filter(is_premium=True, premium_expires__gt=now).count(),
-        'trial': User.objects.filter(free_trial_expires__gt=now, is_premium=False).count(),
-        'banned': User.objects.filter(is_banned=True).count(),
-    }
+    return _cached_stats('users', compute)
 
 
 @sync_to_async
@@ -2865,7 +3123,7 @@ def toggle_movie_status(code: str) -> bool:
     try:
         movie = Movie.objects.get(code=code)
         movie.is_active = not movie.is_active
-        movie.save(update_fields=['is_active'])
+        movie.save(update_fields=['is_active', 'updated_at'])
         return movie.is_active
     except Movie.DoesNotExist:
         return False
@@ -2877,7 +3135,7 @@ def toggle_movie_premium(code: str) -> bool:
     try:
         movie = Movie.objects.get(code=code)
         movie.is_premium = not movie.is_premium
-        movie.save(update_fields=['is_premium'])
+        movie.save(update_fields=['is_premium', 'updated_at'])
         return movie.is_premium
     except Movie.DoesNotExist:
         return False
@@ -3029,7 +3287,12 @@ async def edit_message_content(message: Message, state: FSMContext):
         template.save()
         return template.title
 
-    title = await update_message()
+    try:
+        title = await update_message()
+    except ValidationError as e:
+        # Noto'g'ri placeholder - state saqlanadi, qayta yuborish mumkin
+        await message.answer(f"❌ {' '.join(e.messages)}\n\n📨 Xabarni qayta yuboring:")
+        return
     await state.clear()
 
     text = f"✅ <b>{title}</b> xabari yangilandi!"
@@ -3093,7 +3356,8 @@ async def stats_week(callback: CallbackQuery):
         f"📅 {stats['start_date']} - {stats['end_date']}\n\n"
         f"👥 <b>Yangi obunchilar:</b> +{format_number(stats['new_users'])}\n"
         f"💎 <b>Yangi premium:</b> +{format_number(stats['new_premium'])}\n"
-        f"💰 <b>Tushumlar:</b> {format_number(stats['total_income'])} so'm\n\n"
+        f"💰 <b>Tushumlar:</b> {format_number(stats['total_income'])} so'm\n"
+        f"🎬 <b>Ko'rishlar:</b> {format_number(stats['total_views'])}\n\n"
         f"📈 <b>Kunlik o'rtacha:</b>\n"
         f"├ Obunchilar: +{format_number(stats['avg_users_per_day'])}\n"
         f"└ Premium: +{format_number(stats['avg_premium_per_day'])}\n\n"
@@ -3101,7 +3365,7 @@ async def stats_week(callback: CallbackQuery):
     )
 
     for day in stats['daily_stats']:
-        text += f"├ {day['date']} ({day['weekday']}): +{format_number(day['users'])} user, +{format_number(day['premium'])} premium\n"
+        text += f"├ {day['date']} ({day['weekday']}): +{format_number(day['users'])} user, +{format_number(day['premium'])} premium, {format_number(day['views'])} ko'rish\n"
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="⬅️ Orqaga", callback_data="admin:stats")]
@@ -3121,7 +3385,8 @@ async def stats_month(callback: CallbackQuery):
         f"📅 {stats['start_date']} - {stats['end_date']}\n\n"
         f"👥 <b>Yangi obunchilar:</b> +{format_number(stats['new_users'])}\n"
         f"💎 <b>Yangi premium:</b> +{format_number(stats['new_premium'])}\n"
-        f"💰 <b>Tushumlar:</b> {format_number(stats['total_income'])} so'm\n\n"
+        f"💰 <b>Tushumlar:</b> {format_number(stats['total_income'])} so'm\n"
+        f"🎬 <b>Ko'rishlar:</b> {format_number(stats['total_views'])}\n\n"
         f"📈 <b>Kunlik o'rtacha:</b>\n"
         f"├ Obunchilar: +{format_number(stats['avg_users_per_day'])}\n"
         f"└ Premium: +{format_number(stats['avg_premium_per_day'])}\n\n"
@@ -3200,31 +3465,34 @@ async def stats_year(callback: CallbackQuery):
 
 # ==================== STATISTIKA HELPER FUNCTIONS ====================
 
+def _daily_rows(start, end) -> dict:
+    """DailyStats: sana -> qator (bugungi kun avval yangilanadi)"""
+    from apps.core.models import DailyStats
+    from apps.core.rollup import rollup_days, local_today
+
+    if end >= local_today():
+        rollup_days(local_today())
+    return {row.date: row for row in DailyStats.objects.filter(date__gte=start, date__lte=end)}
+
+
+def _sum_rows(rows, field: str) -> int:
+    return sum(getattr(row, field) for row in rows)
+
+
 @sync_to_async
 def get_today_stats():
     """Bugungi statistika"""
-    from django.db.models import Count, Sum
+    from django.db.models import Count
     from django.db.models.functions import ExtractHour
-    from datetime import datetime, timedelta
+    from apps.core.rollup import local_today
 
-    today = timezone.now().date()
-    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    today = local_today()
+    row = _daily_rows(today, today).get(today)
 
-    new_users = User.objects.filter(created_at__gte=today_start).count()
-    new_premium = Payment.objects.filter(
-        status='approved',
-        created_at__gte=today_start
-    ).count()
-
-    total_income = Payment.objects.filter(
-        status='approved',
-        created_at__gte=today_start
-    ).aggregate(total=Sum('tariff__price'))['total'] or 0
-
-    # Jami ko'rishlar (bugungi ko'rishlarni alohida track qilish imkoni yo'q)
-    total_views = Movie.objects.aggregate(total=Sum('views'))['total'] or 0
+    new_users = row.new_users if row else 0
 
     # Eng faol soat
+    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
     hourly = User.objects.filter(
         created_at__gte=today_start
     ).annotate(
@@ -3236,9 +3504,9 @@ def get_today_stats():
 
     return {
         'new_users': new_users,
-        'new_premium': new_premium,
-        'total_income': total_income,
-        'total_views': total_views,
+        'new_premium': row.approved_payments if row else 0,
+        'total_income': row.income if row else 0,
+        'total_views': row.views if row else 0,
         'peak_hour': peak_hour,
         'avg_activity': avg_activity
     }
@@ -3246,26 +3514,23 @@ def get_today_stats():
 
 @sync_to_async
 def get_period_stats(days: int):
-    """Davr statistikasi"""
-    from django.db.models import Count, Sum
-    from datetime import datetime, timedelta
+    """Davr statistikasi (DailyStats dan)"""
+    from apps.core.rollup import local_today
 
     # Hafta kunlari nomlari
     weekdays = ['Du', 'Se', 'Chor', 'Pay', 'Ju', 'Sha', 'Yak']
 
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=days)
+    end_date = local_today()
+    start_date = end_date - timedelta(days=days - 1)
+    rows = _daily_rows(start_date, end_date)
 
-    new_users = User.objects.filter(created_at__gte=start_date).count()
-    new_premium = Payment.objects.filter(
-        status='approved',
-        created_at__gte=start_date
-    ).count()
+    def period(start, end):
+        selected = [row for day, row in rows.items() if start <= day <= end]
+        return _sum_rows(selected, 'new_users'), _sum_rows(selected, 'approved_payments')
 
-    total_income = Payment.objects.filter(
-        status='approved',
-        created_at__gte=start_date
-    ).aggregate(total=Sum('tariff__price'))['total'] or 0
+    new_users, new_premium = period(start_date, end_date)
+    total_income = _sum_rows(rows.values(), 'income')
+    total_views = _sum_rows(rows.values(), 'views')
 
     avg_users_per_day = new_users // max(1, days)
     avg_premium_per_day = new_premium // max(1, days)
@@ -3273,21 +3538,15 @@ def get_period_stats(days: int):
     # Kunlik statistika
     daily_stats = []
     for i in range(min(7, days)):
-        day_start = (end_date - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-
-        day_users = User.objects.filter(created_at__gte=day_start, created_at__lt=day_end).count()
-        day_premium = Payment.objects.filter(
-            status='approved',
-            created_at__gte=day_start,
-            created_at__lt=day_end
-        ).count()
+        day = end_date - timedelta(days=i)
+        day_users, day_premium = period(day, day)
 
         daily_stats.append({
-            'date': day_start.strftime('%d.%m'),
-            'weekday': weekdays[day_start.weekday()],
+            'date': day.strftime('%d.%m'),
+            'weekday': weekdays[day.weekday()],
             'users': day_users,
-            'premium': day_premium
+            'premium': day_premium,
+            'views': rows[day].views if day in rows else 0
         })
 
     # Haftalik statistika (faqat 30 kun uchun)
@@ -3295,14 +3554,8 @@ def get_period_stats(days: int):
     if days >= 7:
         for week in range(min(4, days // 7)):
             week_end = end_date - timedelta(days=week * 7)
-            week_start = end_date - timedelta(days=(week + 1) * 7)
-
-            week_users = User.objects.filter(created_at__gte=week_start, created_at__lt=week_end).count()
-            week_premium = Payment.objects.filter(
-                status='approved',
-                created_at__gte=week_start,
-                created_at__lt=week_end
-            ).count()
+            week_start = week_end - timedelta(days=6)
+            week_users, week_premium = period(week_start, week_end)
 
             weekly_stats.append({
                 'week': week + 1,
@@ -3316,6 +3569,7 @@ def get_period_stats(days: int):
         'new_users': new_users,
         'new_premium': new_premium,
         'total_income': total_income,
+        'total_views': total_views,
         'avg_users_per_day': avg_users_per_day,
         'avg_premium_per_day': avg_premium_per_day,
         'daily_stats': daily_stats,
@@ -3328,56 +3582,49 @@ def get_period_stats(days: int):
 @sync_to_async
 def get_premium_stats():
     """Premium statistikasi"""
-    from django.db.models import Count, Sum, Avg
-    from datetime import timedelta
-    from apps.payments.models import Tariff
-
-    now = timezone.now()
-    month_ago = now - timedelta(days=30)
+    from django.db.models import Avg
 
-    total_premium = User.objects.filter(is_premium=True).count()
-    active_premium = User.objects.filter(is_premium=True, premium_expires__gt=now).count()
-    expired_premium = total_premium - active_premium
+    def compute():
+        now = timezone.now()
+        month_ago = now - timedelta(days=30)
+        approved = Q(status='approved')
+        recent = Q(status='approved', created_at__gte=month_ago)
 
-    new_premium_30d = Payment.objects.filter(
-        status='approved',
-        created_at__gte=month_ago
-    ).count()
-
-    income_30d = Payment.objects.filter(
-        status='approved',
-        created_at__gte=month_ago
-    ).aggregate(total=Sum('tariff__price'))['total'] or 0
+        users = User.objects.aggregate(
+            total=Count('id', filter=Q(is_premium=True)),
+            active=Count('id', filter=Q(is_premium=True, premium_expires__gt=now)),
+        )
+        payments = Payment.objects.aggregate(
+            new_30d=Count('id', filter=recent),
+            income_30d=Sum('tariff__price', filter=recent),
+            avg_days=Avg('tariff__days', filter=approved),
+        )
 
-    # O'rtacha premium kunlari
-    avg_days = Payment.objects.filter(
-        status='approved'
-    ).aggregate(avg=Avg('tariff__days'))['avg'] or 0
+        # Top tariflar
+        top_tariffs = list(
+            Payment.objects.filter(approved)
+            .values('tariff__name')
+            .annotate(count=Count('id'))
+            .order_by('-count')[:5]
+        )
 
-    # Top tariflar
-    top_tariffs = list(
-        Payment.objects.filter(status='approved')
-        .values('tariff__name')
-        .annotate(count=Count('id'))
-        .order_by('-count')[:5]
-    )
+        return {
+            'total_premium': users['total'],
+            'active_premium': users['active'],
+            'expired_premium': users['total'] - users['active'],
+            'new_premium_30d': payments['new_30d'],
+            'income_30d': payments['income_30d'] or 0,
+            'avg_premium_days': int(payments['avg_days'] or 0),
+            'top_tariffs': [{'name': t['tariff__name'], 'count': t['count']} for t in top_tariffs]
+        }
 
-    return {
-        'total_premium': total_premium,
-        'active_premium': active_premium,
-        'expired_premium': expired_premium,
-        'new_premium_30d': new_premium_30d,
-        'income_30d': income_30d,
-        'avg_premium_days': int(avg_days),
-        'top_tariffs': [{'name': t['tariff__name'], 'count': t['count']} for t in top_tariffs]
-    }
+    return _cached_stats('premium', compute)
 
 
 @sync_to_async
 def get_yearly_stats():
-    """Yillik statistika - oyma-oy"""
-    from django.db.models import Count, Sum
-    from datetime import datetime
+    """Yillik statistika - oyma-oy (DailyStats dan)"""
+    from apps.core.rollup import local_today
 
     # Oy nomlari
     month_names = [
@@ -3385,67 +3632,28 @@ def get_yearly_stats():
         'Iyul', 'Avgust', 'Sentyabr', 'Oktyabr', 'Noyabr', 'Dekabr'
     ]
 
-    now = timezone.now()
-    current_year = now.year
-
-    # Yil boshidan hozirgi kungacha
-    year_start = timezone.make_aware(datetime(current_year, 1, 1, 0, 0, 0))
-
-    total_users = User.objects.filter(created_at__gte=year_start).count()
-    total_premium = Payment.objects.filter(
-        status='approved',
-        created_at__gte=year_start
-    ).count()
+    today = local_today()
+    current_year = today.year
+    months_passed = today.month
 
-    total_income = Payment.objects.filter(
-        status='approved',
-        created_at__gte=year_start
-    ).aggregate(total=Sum('tariff__price'))['total'] or 0
+    # Yil boshidan hozirgi kungacha - ko'pi bilan 366 qator
+    rows = _daily_rows(today.replace(month=1, day=1), today)
 
-    # Oyma-oy statistika
     monthly_stats = []
-    months_passed = now.month
-
     for month in range(1, 13):
-        month_start = timezone.make_aware(datetime(current_year, month, 1, 0, 0, 0))
-
-        # Keyingi oy boshi
-        if month == 12:
-            month_end = timezone.make_aware(datetime(current_year + 1, 1, 1, 0, 0, 0))
-        else:
-            month_end = timezone.make_aware(datetime(current_year, month + 1, 1, 0, 0, 0))
-
-        # Faqat o'tgan oylar uchun statistika
-        if month <= now.month:
-            month_users = User.objects.filter(
-                created_at__gte=month_start,
-                created_at__lt=month_end
-            ).count()
-
-            month_premium = Payment.objects.filter(
-                status='approved',
-                created_at__gte=month_start,
-                created_at__lt=month_end
-            ).count()
-
-            month_income = Payment.objects.filter(
-                status='approved',
-                created_at__gte=month_start,
-                created_at__lt=month_end
-            ).aggregate(total=Sum('tariff__price'))['total'] or 0
-        else:
-            month_users = 0
-            month_premium = 0
-            month_income = 0
-
+        selected = [row for day, row in rows.items() if day.month == month]
         monthly_stats.append({
             'month': month,
             'month_name': month_names[month - 1],
-            'users': month_users,
-            'premium': month_premium,
-            'income': month_income
+            'users': _sum_rows(selected, 'new_users'),
+            'premium': _sum_rows(selected, 'approved_payments'),
+            'income': _sum_rows(selected, 'income')
         })
 
+    total_users = sum(m['users'] for m in monthly_stats)
+    total_premium = sum(m['premium'] for m in monthly_stats)
+    total_income = sum(m['income'] for m in monthly_stats)
+
     avg_users_per_month = total_users // max(1, months_passed)
     avg_premium_per_month = total_premium // max(1, months_passed)
 
@@ -3505,6 +3713,7 @@ def give_user_premium(user_id: int, days: int) -> bool:
             user.premium_expires = timezone.now() + timedelta(days=days)
 
         user.save()
+        schedule_premium(user.user_id, user.premium_expires)
         return True
     except User.DoesNotExist:
         return False
@@ -0,0 +1,37 @@
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from bot.middlewares.subscription import clear_subscription_cache, aclear_subscription_cache
+from bot.utils.membership import save_member_status, clear_channel_index
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Bot shu statuslarda bo'lsagina kanal a'zolari haqida updatelar keladi
+BOT_ADMIN_STATUSES = {'administrator', 'creator'}
+
+
+@router.chat_member()
+async def on_chat_member(event: ChatMemberUpdated):
+    """Kanal a'zosi holati o'zgardi - indeksni yangilash"""
+    member = event.new_chat_member
+    if member.user.is_bot:
+        return
+
+    await save_member_status(event.chat.id, member.user.id, member.status)
+    await aclear_subscription_cache(member.user.id)
+
+
+@router.my_chat_member()
+async def on_my_chat_member(event: ChatMemberUpdated):
+    """Botning kanaldagi holati o'zgardi"""
+    if event.new_chat_member.status in BOT_ADMIN_STATUSES:
+        return
+
+    # Admin bo'lmagach updatelar kelmaydi - indeks eskiradi, API ga qaytamiz
+    deleted = await clear_channel_index(event.chat.id)
+    clear_subscription_cache()
+    logger.info(f"Bot kanalda admin emas: {event.chat.id}, indeks tozalandi ({deleted} ta)")
@@ -13,11 +13,11 @@ from apps.payments.models import Tariff, Payment, PendingPaymentSession
 from apps.core.models import BotSettings
 from bot.keyboards import tariffs_kb, main_menu_inline_kb, payment_confirm_kb, back_kb
 from bot.filters import CanManagePayments
+from bot.utils.pending_payments import save_pending_payment, get_pending_payment, delete_pending_payment
+from bot.utils.scheduler import schedule_premium
 
 logger = logging.getLogger(__name__)
 
-from bot.constants import PENDING_PAYMENT_TIMEOUT
-
 router = Router()
 
 
@@ -337,6 +337,7 @@ def approve_payment(payment_id: int, admin_user_id: int):
         user.premium_expires = timezone.now() + timedelta(days=payment.tariff.days)
 
     user.save()
+    schedule_premium(user.user_id, user.premium_expires)
 
 
 @sync_to_async
@@ -353,69 +354,7 @@ def get_user_by_pk(pk: int):
         return None
 
 
-@sync_to_async
-def save_pending_payment(user_id: int, tariff_id: int, amount: int, with_discount: bool):
-    """Pending to'lovni database ga saqlash"""
-    # Eski sessiyalarni tozalash
-    PendingPaymentSession.cleanup_expired()
-
-    # Eski sessiyani o'chirish (agar mavjud bo'lsa)
-    try:
-        user = User.objects.get(user_id=user_id)
-        PendingPaymentSession.objects.filter(user=user).delete()
-
-        # Yangi sessiya yaratish
-        expires_at = timezone.now() + timedelta(seconds=PENDING_PAYMENT_TIMEOUT)
-        PendingPaymentSession.objects.create(
-            user=user,
-            tariff_id=tariff_id,
-            amount=amount,
-            is_discounted=with_discount,
-            message_id=0,  # Keyinchalik yangilanadi
-            expires_at=expires_at
-        )
-    except User.DoesNotExist:
-        logger.warning(f"Pending payment saqlashda user topilmadi: {user_id}")
-
-
-@sync_to_async
-def get_pending_payment(user_id: int):
-    """Pending to'lovni database dan olish"""
-    # Eski sessiyalarni tozalash
-    PendingPaymentSession.cleanup_expired()
-
-    try:
-        user = User.objects.get(user_id=user_id)
-        session = PendingPaymentSession.objects.filter(user=user).first()
-
-        if session and not session.is_expired:
-            return {
-                'tariff_id': session.tariff_id,
-                'amount': session.amount,
-                'with_discount': session.is_discounted,
-                'timestamp': session.created_at
-            }
-        elif session:
-            # Muddati tugagan - o'chirish
-            session.delete()
-    except User.DoesNotExist:
-        pass
-
-    return None
-
-
-@sync_to_async
-def delete_pending_payment(user_id: int):
-    """Pending to'lovni database dan o'chirish"""
-    try:
-        user = User.objects.get(user_id=user_id)
-        PendingPaymentSession.objects.filter(user=user).delete()
-    except User.DoesNotExist:
-        pass
-
-
 @sync_to_async
 def get_pending_payments_count() -> int:
     """Pending to'lovlar sonini olish"""
-    PendingPaymentSession.cleanup_expired()
-    return PendingPaymentSession.objects.count()
+    return PendingPaymentSession.objects.filter(expires_at__gt=timezone.now()).count()
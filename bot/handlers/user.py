@@ -11,17 +11,24 @@ from cachetools import TTLCache
 from django.conf import settings
 
 from apps.users.models import User, Admin
-from apps.movies.models import Movie, Category
+from apps.movies.models import Movie, MovieView, Category
 from apps.channels.models import Channel
 from apps.payments.models import Tariff
 from bot.keyboards import (
     main_menu_inline_kb, channels_kb, categories_kb, movies_kb,
     tariffs_kb, back_kb, movie_action_kb, saved_movies_kb,
     search_filter_kb, filter_country_kb, filter_language_kb, filter_year_kb,
-    flash_sale_tariffs_kb
+    flash_sale_tariffs_kb, top_movies_kb
 )
 from bot.utils import get_or_create_user, format_number, format_date, update_user_joined_channel, record_channel_subscriptions
-from apps.payments.models import PendingPaymentSession
+from bot.utils.membership import check_channels_membership
+from bot.utils.cache import get_cache
+from bot.utils.counters import record_movie_view
+from bot.utils.catalog import catalog
+from bot.utils.pending_payments import save_pending_payment
+from bot.utils.captions import (
+    render_movie_caption, STYLE_FULL, STYLE_COMPACT, STYLE_SAVED, STYLE_RANDOM, STYLE_SHORT
+)
 from datetime import timedelta
 from django.utils import timezone as dj_timezone
 
@@ -30,10 +37,11 @@ logger = logging.getLogger(__name__)
 
 # Constants import
 from bot.constants import (
-    CACHE_TTL_MOVIES, CACHE_TTL_CATEGORIES, CACHE_TTL_BOT_INFO,
-    CACHE_TTL_SUBSCRIPTION, CACHE_MAX_MOVIES, CACHE_MAX_PENDING_SUBS,
+    CACHE_TTL_CATEGORIES, CACHE_TTL_BOT_INFO,
+    CACHE_TTL_SUBSCRIPTION, CACHE_MAX_PENDING_SUBS,
     DEFAULT_PER_PAGE, PREMIUM_MOVIES_PER_PAGE, TOP_MOVIES_LIMIT,
-    MAX_MOVIE_CODE_LENGTH, PENDING_PAYMENT_TIMEOUT
+    MAX_MOVIE_CODE_LENGTH,
+    CACHE_TTL_TRENDING, TRENDING_WINDOW_HOURS
 )
 
 
@@ -53,13 +61,13 @@ async def is_user_admin(user_id: int) -> bool:
 router = Router()
 
 # Cache - constants dan qiymatlar
-_movies_cache = TTLCache(maxsize=CACHE_MAX_MOVIES, ttl=CACHE_TTL_MOVIES)
 _categories_cache = TTLCache(maxsize=1, ttl=CACHE_TTL_CATEGORIES)
 _bot_info_cache = TTLCache(maxsize=1, ttl=CACHE_TTL_BOT_INFO)
+_trending_cache = TTLCache(maxsize=4, ttl=CACHE_TTL_TRENDING)
 
 # Obuna kutayotgan kanallar (user_id -> [channel_ids])
-# TTLCache ishlatamiz - avtomatik tozalanadi (memory leak oldini olish)
-_pending_subscriptions: TTLCache = TTLCache(maxsize=CACHE_MAX_PENDING_SUBS, ttl=CACHE_TTL_SUBSCRIPTION)
+# Umumiy cache - callback boshqa workerga tushsa ham topiladi, TTL bilan avtomatik tozalanadi
+_pending_subscriptions = get_cache('pending_subs', ttl=CACHE_TTL_SUBSCRIPTION, maxsize=CACHE_MAX_PENDING_SUBS)
 
 
 async def get_bot_link(bot: Bot) -> str:
@@ -87,7 +95,7 @@ async def check_user_subscription(bot: Bot, user_id: int, db_user: User = None)
     Foydalanuvchi obunasini tekshirish.
     Admin yoki premium bo'lsa, bo'sh list qaytaradi.
     """
-    from bot.middlewares.subscription import clear_subscription_cache
+    from bot.middlewares.subscription import aclear_subscription_cache
 
     # Admin tekshirish
     if user_id in settings.ADMINS:
@@ -98,7 +106,7 @@ async def check_user_subscription(bot: Bot, user_id: int, db_user: User = None)
         return []
 
     # Cache tozalash va tekshirish
-    clear_subscription_cache(user_id)
+    await aclear_subscription_cache(user_id)
     return await check_subscription(bot, user_id)
 
 
@@ -127,7 +135,7 @@ async def cmd_start(message: Message, bot: Bot):
 
     if not_subscribed and not is_admin:
         # Obuna bo'lmagan kanallarni eslab qolamiz (bot orqali obuna bo'lganlarni hisoblash uchun)
-        _pending_subscriptions[user.id] = [ch.id for ch in not_subscribed]
+        await _pending_subscriptions.aset(user.id, [ch.id for ch in not_subscribed])
 
         await message.answer(
             f"👋 Salom, <b>{user.full_name}</b>!\n\n"
@@ -156,18 +164,19 @@ async def cmd_start(message: Message, bot: Bot):
 @router.callback_query(F.data == "check_subscription")
 async def check_sub_callback(callback: CallbackQuery, bot: Bot):
     """Obunani tekshirish"""
-    from bot.middlewares.subscription import clear_subscription_cache
+    from bot.middlewares.subscription import aclear_subscription_cache
 
     user = callback.from_user
 
     # Cache ni tozalash - yangi tekshirish uchun
-    clear_subscription_cache(user.id)
+    await aclear_subscription_cache(user.id)
 
-    not_subscribed = await check_subscription(bot, user.id)
+    # Indeksdagi "obuna emas" yozuvlari API orqali qayta tekshiriladi
+    not_subscribed = await check_subscription(bot, user.id, recheck_negative=True)
 
     if not_subscribed:
         # Obuna bo'lmagan kanallarni eslab qolamiz
-        _pending_subscriptions[user.id] = [ch.id for ch in not_subscribed]
+        await _pending_subscriptions.aset(user.id, [ch.id for ch in not_subscribed])
 
         await callback.answer("❌ Barcha kanallarga obuna bo'ling!", show_alert=True)
         # Kanallar ro'yxatini yangilash
@@ -184,14 +193,13 @@ async def check_sub_callback(callback: CallbackQuery, bot: Bot):
     await callback.answer("✅ Tasdiqlandi!")
 
     # Faqat bot orqali obuna bo'lgan kanallarni yozamiz
-    if user.id in _pending_subscriptions:
-        pending_channel_ids = _pending_subscriptions.pop(user.id)
-        if pending_channel_ids:
-            # Faqat kutilgan kanallarni yozamiz
-            await record_channel_subscriptions(user.id, pending_channel_ids)
+    pending_channel_ids = await _pending_subscriptions.apop(user.id)
+    if pending_channel_ids:
+        # Faqat kutilgan kanallarni yozamiz
+        await record_channel_subscriptions(user.id, pending_channel_ids)
 
-            # Birinchi kanalni "kelgan kanal" sifatida saqlaymiz
-            await update_user_joined_channel(user.id, pending_channel_ids[0])
+        # Birinchi kanalni "kelgan kanal" sifatida saqlaymiz
+        await update_user_joined_channel(user.id, pending_channel_ids[0])
 
     is_admin = await is_user_admin(user.id)
 
@@ -255,7 +263,7 @@ async def get_movie_by_code(message: Message, db_user: User = None, bot: Bot = N
         )
         return
 
-    movie = await get_movie_by_code_db(code)
+    movie = await catalog.get(code)
 
     if not movie:
         await message.answer(
@@ -286,21 +294,7 @@ async def get_movie_by_code(message: Message, db_user: User = None, bot: Bot = N
     # Send movie
     try:
         bot_link = await get_bot_link(bot)
-
-        desc = f"\n\n📖 {movie.description}" if movie.description else ""
-        year_text = f"📅 Yil: {movie.year}\n" if movie.year else ""
-        country_text = f"🌍 Davlat: {movie.get_country_display()}\n" if hasattr(movie, 'get_country_display') else ""
-
-        caption = (
-            f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
-            f"📝 Kod: <code>{movie.code}</code>\n"
-            f"{year_text}"
-            f"{country_text}"
-            f"📺 Sifat: {movie.get_quality_display()}\n"
-            f"🌐 Til: {movie.get_language_display()}\n"
-            f"👁 Ko'rishlar: {format_number(movie.views)}\n\n"
-            f"🤖 <b>Bot:</b> {bot_link}"
-        )
+        caption = render_movie_caption(movie, STYLE_FULL, bot_link)
 
         # Saqlangan yoki yo'qligini tekshirish
         is_saved = await check_movie_saved(user_id, movie.code) if db_user else False
@@ -312,9 +306,7 @@ async def get_movie_by_code(message: Message, db_user: User = None, bot: Bot = N
         )
 
         # Update stats
-        await increment_movie_views(movie.id)
-        if db_user:
-            await increment_user_movies(db_user.user_id)
+        record_movie_view(movie.id, db_user.user_id if db_user else None, MovieView.SOURCE_CODE)
 
     except TelegramBadRequest as e:
         logger.error(f"Kino yuborishda xatolik (code={code}): {e}")
@@ -346,7 +338,7 @@ async def movie_view_callback(callback: CallbackQuery, db_user: User = None, bot
     """Kino ko'rish (qidiruv natijasidan)"""
     code = callback.data.split(":")[1]
 
-    movie = await get_movie_by_code_db(code)
+    movie = await catalog.get(code)
 
     if not movie:
         await callback.answer("❌ Kino topilmadi.", show_alert=True)
@@ -358,7 +350,7 @@ async def movie_view_callback(callback: CallbackQuery, db_user: User = None, bot
         return
 
     # Ko'rishlar sonini oshirish
-    await increment_movie_views(movie.id)
+    record_movie_view(movie.id, source=MovieView.SOURCE_BUTTON)
 
     # Saqlanganmi tekshirish
     is_saved = await check_movie_saved(callback.from_user.id, movie.code) if db_user else False
@@ -369,7 +361,7 @@ async def movie_view_callback(callback: CallbackQuery, db_user: User = None, bot
             await bot.send_video(
                 chat_id=callback.from_user.id,
                 video=movie.file_id,
-                caption=f"🎬 <b>{movie.display_title}</b>\n\n📝 Kod: <code>{movie.code}</code>",
+                caption=render_movie_caption(movie, STYLE_SHORT),
                 reply_markup=movie_action_kb(movie.code, is_saved)
             )
         else:
@@ -504,6 +496,22 @@ async def filter_year_result_callback(callback: CallbackQuery):
 
 # ==================== TOP KINOLAR ====================
 
+def _top_movies_text(movies) -> str:
+    text = "🔥 <b>Top 10 kinolar:</b>\n\n"
+    for i, movie in enumerate(movies, 1):
+        text += f"{i}. 🎬 <b>{movie.display_title}</b>\n"
+        text += f"    📝 Kod: <code>{movie.code}</code> • 👁 {format_number(movie.views)}\n\n"
+    return text + "📥 Kino olish uchun kodini yuboring."
+
+
+def _trending_text(ranked) -> str:
+    text = f"📈 <b>So'nggi {TRENDING_WINDOW_HOURS} soat trendi:</b>\n\n"
+    for i, (movie, count) in enumerate(ranked, 1):
+        text += f"{i}. 🎬 <b>{movie.display_title}</b>\n"
+        text += f"    📝 Kod: <code>{movie.code}</code> • 👁 +{format_number(count)}\n\n"
+    return text + "📥 Kino olish uchun kodini yuboring."
+
+
 @router.callback_query(F.data == "top_movies")
 async def top_movies_callback(callback: CallbackQuery):
     """Top kinolar"""
@@ -513,14 +521,7 @@ async def top_movies_callback(callback: CallbackQuery):
         await callback.answer("📭 Kinolar topilmadi.", show_alert=True)
         return
 
-    text = "🔥 <b>Top 10 kinolar:</b>\n\n"
-    for i, movie in enumerate(movies, 1):
-        text += f"{i}. 🎬 <b>{movie.display_title}</b>\n"
-        text += f"    📝 Kod: <code>{movie.code}</code> • 👁 {format_number(movie.views)}\n\n"
-
-    text += "📥 Kino olish uchun kodini yuboring."
-
-    await callback.message.edit_text(text, reply_markup=back_kb())
+    await callback.message.edit_text(_top_movies_text(movies), reply_markup=top_movies_kb())
     await callback.answer()
 
 
@@ -533,14 +534,20 @@ async def top_movies_handler(message: Message):
         await message.answer("📭 Kinolar topilmadi.")
         return
 
-    text = "🔥 <b>Top 10 kinolar:</b>\n\n"
-    for i, movie in enumerate(movies, 1):
-        text += f"{i}. 🎬 <b>{movie.display_title}</b>\n"
-        text += f"    📝 Kod: <code>{movie.code}</code> • 👁 {format_number(movie.views)}\n\n"
+    await message.answer(_top_movies_text(movies), reply_markup=top_movies_kb())
 
-    text += "📥 Kino olish uchun kodini yuboring."
 
-    await message.answer(text, reply_markup=back_kb())
+@router.callback_query(F.data == "trending_movies")
+async def trending_movies_callback(callback: CallbackQuery):
+    """Oxirgi 24 soatda eng ko'p ko'rilgan kinolar"""
+    ranked = await get_trending_movies(10)
+
+    if not ranked:
+        await callback.answer("📭 Oxirgi kunda ko'rishlar yo'q.", show_alert=True)
+        return
+
+    await callback.message.edit_text(_trending_text(ranked), reply_markup=top_movies_kb(trending=True))
+    await callback.answer()
 
 
 # ==================== PREMIUM KINOLAR ====================
@@ -675,21 +682,12 @@ async def random_movie_handler(message: Message, db_user: User = None, bot: Bot
     try:
         bot_link = await get_bot_link(bot)
 
-        desc = f"\n📖 {movie.description}" if movie.description else ""
-        year_text = f" • 📅 {movie.year}" if movie.year else ""
-
         await message.answer_video(
             video=movie.file_id,
-            caption=(
-                f"🎲 <b>Random kino:</b>\n\n"
-                f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
-                f"📝 Kod: <code>{movie.code}</code>\n"
-                f"📺 {movie.get_quality_display()} • 🌐 {movie.get_language_display()}{year_text}\n\n"
-                f"🤖 <b>Bot:</b> {bot_link}"
-            ),
+            caption=render_movie_caption(movie, STYLE_RANDOM, bot_link),
             reply_markup=back_kb()
         )
-        await increment_movie_views(movie.id)
+        record_movie_view(movie.id, source=MovieView.SOURCE_RANDOM)
     except TelegramBadRequest as e:
         logger.error(f"Random kino yuborishda xatolik: {e}")
         await message.answer("❌ Xatolik yuz berdi.", reply_markup=back_kb())
@@ -868,7 +866,7 @@ async def movie_callback(callback: CallbackQuery, db_user: User = None, bot: Bot
         await callback.answer("❌ Noto'g'ri kod!", show_alert=True)
         return
 
-    movie = await get_movie_by_code_db(code)
+    movie = await catalog.get(code)
 
     if not movie:
         await callback.answer("❌ Kino topilmadi.", show_alert=True)
@@ -883,23 +881,12 @@ async def movie_callback(callback: CallbackQuery, db_user: User = None, bot: Bot
     try:
         bot_link = await get_bot_link(bot)
 
-        desc = f"\n📖 {movie.description}" if movie.description else ""
-        year_text = f" • 📅 {movie.year}" if movie.year else ""
-
         await callback.message.answer_video(
             video=movie.file_id,
-            caption=(
-                f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
-                f"📝 Kod: <code>{movie.code}</code>\n"
-                f"📺 {movie.get_quality_display()} • 🌐 {movie.get_language_display()}{year_text}\n"
-                f"👁 {format_number(movie.views)}\n\n"
-                f"🤖 <b>Bot:</b> {bot_link}"
-            ),
+            caption=render_movie_caption(movie, STYLE_COMPACT, bot_link),
             reply_markup=back_kb()
         )
-        await increment_movie_views(movie.id)
-        if db_user:
-            await increment_user_movies(db_user.user_id)
+        record_movie_view(movie.id, db_user.user_id if db_user else None, MovieView.SOURCE_BUTTON)
     except TelegramBadRequest as e:
         logger.error(f"Kino callback yuborishda xatolik (code={code}): {e}")
         await callback.message.answer("❌ Xatolik.", reply_markup=back_kb())
@@ -1077,7 +1064,7 @@ async def flash_tariff_callback(callback: CallbackQuery, db_user: User = None):
     )
 
     # Pending payment saqlash (bu muhim!)
-    await _save_pending_payment_for_flash(
+    await save_pending_payment(
         callback.from_user.id,
         tariff_id,
         price,
@@ -1087,31 +1074,6 @@ async def flash_tariff_callback(callback: CallbackQuery, db_user: User = None):
     await callback.answer()
 
 
-@sync_to_async
-def _save_pending_payment_for_flash(user_id: int, tariff_id: int, amount: int, with_discount: bool):
-    """Flash sale uchun pending to'lovni saqlash"""
-    # Eski sessiyalarni tozalash
-    PendingPaymentSession.cleanup_expired()
-
-    try:
-        user = User.objects.get(user_id=user_id)
-        # Eski sessiyani o'chirish
-        PendingPaymentSession.objects.filter(user=user).delete()
-
-        # Yangi sessiya yaratish
-        expires_at = dj_timezone.now() + timedelta(seconds=PENDING_PAYMENT_TIMEOUT)
-        PendingPaymentSession.objects.create(
-            user=user,
-            tariff_id=tariff_id,
-            amount=amount,
-            is_discounted=with_discount,
-            message_id=0,
-            expires_at=expires_at
-        )
-    except User.DoesNotExist:
-        logger.warning(f"Flash sale pending payment: user topilmadi {user_id}")
-
-
 # ==================== PROFIL ====================
 
 @router.callback_query(F.data == "profile")
@@ -1297,7 +1259,7 @@ async def unsave_movie_callback(callback: CallbackQuery, db_user: User = None):
 async def saved_movie_callback(callback: CallbackQuery, db_user: User = None, bot: Bot = None):
     """Saqlangan kinoni ko'rish"""
     code = callback.data.split(":")[1]
-    movie = await get_movie_by_code_db(code)
+    movie = await catalog.get(code)
 
     if not movie:
         await callback.answer("❌ Kino topilmadi!", show_alert=True)
@@ -1311,25 +1273,14 @@ async def saved_movie_callback(callback: CallbackQuery, db_user: User = None, bo
     await callback.answer()
 
     try:
-        bot_info = await bot.me()
-        bot_link = f"https://t.me/{bot_info.username}"
-
-        desc = f"\n📖 {movie.description}" if movie.description else ""
-        year_text = f" • 📅 {movie.year}" if movie.year else ""
+        bot_link = await get_bot_link(bot)
 
         await callback.message.answer_video(
             video=movie.file_id,
-            caption=(
-                f"❤️ <b>Saqlangan kino:</b>\n\n"
-                f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
-                f"📝 Kod: <code>{movie.code}</code>\n"
-                f"📺 {movie.get_quality_display()} • 🌐 {movie.get_language_display()}{year_text}\n"
-                f"👁 {format_number(movie.views)}\n\n"
-                f"🤖 <b>Bot:</b> {bot_link}"
-            ),
+            caption=render_movie_caption(movie, STYLE_SAVED, bot_link),
             reply_markup=movie_action_kb(movie.code, is_saved=True)
         )
-        await increment_movie_views(movie.id)
+        record_movie_view(movie.id, source=MovieView.SOURCE_SAVED)
     except TelegramBadRequest:
         await callback.message.answer("❌ Xatolik.", reply_markup=back_kb())
 
@@ -1359,23 +1310,14 @@ async def random_movie_callback(callback: CallbackQuery, db_user: User = None, b
 
     try:
         bot_link = await get_bot_link(bot)
-
-        desc = f"\n📖 {movie.description}" if movie.description else ""
-        year_text = f" • 📅 {movie.year}" if movie.year else ""
         is_saved = await check_movie_saved(user_id, movie.code) if db_user else False
 
         await callback.message.answer_video(
             video=movie.file_id,
-            caption=(
-                f"🎲 <b>Random kino:</b>\n\n"
-                f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
-                f"📝 Kod: <code>{movie.code}</code>\n"
-                f"📺 {movie.get_quality_display()} • 🌐 {movie.get_language_display()}{year_text}\n\n"
-                f"🤖 <b>Bot:</b> {bot_link}"
-            ),
+            caption=render_movie_caption(movie, STYLE_RANDOM, bot_link),
             reply_markup=movie_action_kb(movie.code, is_saved)
         )
-        await increment_movie_views(movie.id)
+        record_movie_view(movie.id, source=MovieView.SOURCE_RANDOM)
     except TelegramBadRequest as e:
         logger.error(f"Random callback xatolik: {e}")
         await callback.message.answer("❌ Xatolik.", reply_markup=back_kb())
@@ -1403,25 +1345,13 @@ async def help_handler(message: Message):
 
 # ==================== DATABASE FUNCTIONS ====================
 
-async def check_subscription(bot: Bot, user_id: int) -> list:
-    """Kanalga obunani tekshirish"""
+async def check_subscription(bot: Bot, user_id: int, recheck_negative: bool = False) -> list:
+    """Kanalga obunani tekshirish (avval indeks, keyin API - parallel)"""
     channels = await get_active_channels()
-    not_subscribed = []
-
-    for channel in channels:
-        if not channel.is_checkable:
-            continue
-
-        try:
-            member = await bot.get_chat_member(channel.channel_id, user_id)
-            if member.status in ['left', 'kicked']:
-                not_subscribed.append(channel)
-        except TelegramBadRequest:
-            # Bot kanalda admin emas yoki kanal topilmadi
-            not_subscribed.append(channel)
-        except Exception:
-            not_subscribed.append(channel)
-
+    # strict - bot kanalda admin bo'lmasa ham obuna talab qilinadi
+    not_subscribed, _ = await check_channels_membership(
+        bot, user_id, channels, strict=True, recheck_negative=recheck_negative
+    )
     return not_subscribed
 
 
@@ -1438,14 +1368,6 @@ def get_user_db(user_id):
         return None
 
 
-@sync_to_async
-def get_movie_by_code_db(code):
-    try:
-        return Movie.objects.select_related('category').get(code=code)
-    except Movie.DoesNotExist:
-        return None
-
-
 @sync_to_async
 def search_movies_by_name(query: str, limit: int = 10):
     """Kino nomini qidirish - bosh harfdan boshlab"""
@@ -1465,6 +1387,32 @@ def get_top_movies(limit=10):
     return list(Movie.objects.filter(is_active=True).order_by('-views')[:limit])
 
 
+@sync_to_async
+def _get_trending_movies(limit: int) -> list:
+    from django.db.models import Count
+
+    since = dj_timezone.now() - timedelta(hours=TRENDING_WINDOW_HOURS)
+    ranked = list(
+        MovieView.objects.filter(created_at__gte=since)
+        .values('movie_id')
+        .annotate(count=Count('id'))
+        .order_by('-count')[:limit * 2]
+    )
+    # O'chirilgan yoki yashirilgan kinolar tashlab ketiladi
+    movies = Movie.objects.filter(is_active=True).in_bulk([row['movie_id'] for row in ranked])
+    return [(movies[row['movie_id']], row['count']) for row in ranked if row['movie_id'] in movies][:limit]
+
+
+async def get_trending_movies(limit=10) -> list:
+    """Trend kinolar [(movie, ko'rishlar)] - (cached)"""
+    if limit in _trending_cache:
+        return _trending_cache[limit]
+
+    ranked = await _get_trending_movies(limit)
+    _trending_cache[limit] = ranked
+    return ranked
+
+
 @sync_to_async
 def get_premium_movies(limit=10):
     """Premium kinolarni olish"""
@@ -1554,18 +1502,6 @@ def get_tariffs():
     return list(Tariff.objects.filter(is_active=True).order_by('order'))
 
 
-@sync_to_async
-def increment_movie_views(movie_id):
-    from django.db.models import F
-    Movie.objects.filter(id=movie_id).update(views=F('views') + 1)
-
-
-@sync_to_async
-def increment_user_movies(user_id):
-    from django.db.models import F
-    User.objects.filter(user_id=user_id).update(movies_watched=F('movies_watched') + 1)
-
-
 @sync_to_async
 def get_referrals_count(user_id):
     try:
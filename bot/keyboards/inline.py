@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -208,14 +210,52 @@ def broadcast_ad_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def broadcast_segment_kb(languages: list, channels: list) -> InlineKeyboardMarkup:
+    """Auditoriya segmenti (languages - [(kod, nom)], channels - Channel lar)"""
+    builder = InlineKeyboardBuilder()
+
+    builder.row(InlineKeyboardButton(text="👥 Segmentsiz", callback_data="broadcast_segment:none"))
+    builder.row(InlineKeyboardButton(text="🎁 Trial faol", callback_data="broadcast_segment:trial"))
+    builder.row(
+        InlineKeyboardButton(text="💤 7 kun faol emas", callback_data="broadcast_segment:inactive:7"),
+        InlineKeyboardButton(text="💤 30 kun faol emas", callback_data="broadcast_segment:inactive:30")
+    )
+    for i in range(0, len(languages), 2):
+        builder.row(*[
+            InlineKeyboardButton(text=f"🌐 {name}", callback_data=f"broadcast_segment:language:{code}")
+            for code, name in languages[i:i + 2]
+        ])
+    for channel in channels:
+        builder.row(InlineKeyboardButton(
+            text=f"📢 {channel.title} orqali kelganlar", callback_data=f"broadcast_segment:channel:{channel.id}"
+        ))
+    builder.row(InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel"))
+
+    return builder.as_markup()
+
+
 def confirm_broadcast_kb() -> InlineKeyboardMarkup:
     """Broadcast tasdiqlash"""
     builder = InlineKeyboardBuilder()
 
     builder.row(
         InlineKeyboardButton(text="✅ Yuborish", callback_data="confirm_broadcast"),
-        InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel")
+        InlineKeyboardButton(text="🕒 Rejalashtirish", callback_data="schedule_broadcast")
     )
+    builder.row(InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel"))
+
+    return builder.as_markup()
+
+
+def broadcast_control_kb(broadcast_id: int, paused: bool = False) -> InlineKeyboardMarkup:
+    """Yuborilayotgan broadcast boshqaruvi"""
+    builder = InlineKeyboardBuilder()
+
+    if paused:
+        builder.row(InlineKeyboardButton(text="▶️ Davom ettirish", callback_data=f"broadcast_ctl:resume:{broadcast_id}"))
+    else:
+        builder.row(InlineKeyboardButton(text="⏸ To'xtatish", callback_data=f"broadcast_ctl:pause:{broadcast_id}"))
+    builder.row(InlineKeyboardButton(text="⛔ Bekor qilish", callback_data=f"broadcast_ctl:cancel:{broadcast_id}"))
 
     return builder.as_markup()
 
@@ -297,8 +337,20 @@ def back_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def top_movies_kb(trending: bool = False) -> InlineKeyboardMarkup:
+    """Top kinolar - barcha vaqt / 24 soat trendi almashtirish"""
+    builder = InlineKeyboardBuilder()
+    if trending:
+        builder.row(InlineKeyboardButton(text="🏆 Barcha vaqt", callback_data="top_movies"))
+    else:
+        builder.row(InlineKeyboardButton(text="📈 24 soat trendi", callback_data="trending_movies"))
+    builder.row(InlineKeyboardButton(text="🏠 Bosh menyu", callback_data="back_to_menu"))
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=4096)
 def movie_action_kb(movie_code: str, is_saved: bool = False) -> InlineKeyboardMarkup:
-    """Kino ko'rganda action tugmalari"""
+    """Kino ko'rganda action tugmalari (cached - natijani o'zgartirmang)"""
     builder = InlineKeyboardBuilder()
 
     if is_saved:
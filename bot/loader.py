@@ -10,11 +10,12 @@ django.setup()
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from django.conf import settings
 
-# Storage (MemoryStorage - lokal uchun)
-storage = MemoryStorage()
+from bot.utils.cache import get_fsm_storage
+
+# Storage (MemoryStorage - lokal, RedisStorage - bir nechta worker uchun)
+storage = get_fsm_storage()
 
 # Bot va Dispatcher
 bot = Bot(
@@ -62,22 +62,70 @@ async def on_startup():
     """Bot ishga tushganda"""
     logger.info("Bot ishga tushdi!")
 
-    # Webhookni o'chirish
-    await bot.delete_webhook(drop_pending_updates=True)
+    if settings.BOT_WEBHOOK_URL:
+        # Webhook rejimi - navbatdagi updatelar saqlanib qoladi
+        await bot.set_webhook(
+            url=settings.BOT_WEBHOOK_URL,
+            secret_token=settings.BOT_WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False,
+        )
+        logger.info(f"Webhook o'rnatildi: {settings.BOT_WEBHOOK_URL}")
+    else:
+        # Polling rejimi - webhookni o'chirish (kutayotgan updatelarni tashlamasdan)
+        await bot.delete_webhook(drop_pending_updates=False)
 
     # Bot buyruqlarini o'rnatish
     await set_bot_commands()
     logger.info("Bot buyruqlari o'rnatildi!")
 
-    # Premium scheduler ni ishga tushirish (background task)
+    # Boshqa jarayonlardagi o'zgarishlar uchun cache invalidatsiya
+    from bot.utils.invalidation import start_invalidation_listener
+    asyncio.create_task(start_invalidation_listener())
+
+    # Kino katalogi (kod bo'yicha qidirish xotiradan)
+    from bot.utils.catalog import catalog
+    asyncio.create_task(catalog.maintain())
+
+    # DB ulanishlari (CONN_MAX_AGE / health check)
+    from bot.utils.db import start_db_maintenance
+    asyncio.create_task(start_db_maintenance())
+
+    # To'lov sessiyalari (memory backendda qayta ishga tushgandan keyin cache bo'sh)
+    from bot.utils.pending_payments import load_pending_payments
+    loaded = await load_pending_payments()
+    logger.info(f"To'lov sessiyalari yuklandi: {loaded}")
+
+    # Ko'rishlar hisoblagichi buferi
+    from bot.utils.counters import start_counter_flusher
+    asyncio.create_task(start_counter_flusher())
+
+    # Faqat yetakchi replikada: premium scheduler (muddatlar o'z vaqtida), statistika rollup,
+    # rejalashtirilgan va egasiz qolgan broadcastlar
+    from bot.utils.leader import leader
     from bot.utils.scheduler import start_scheduler
-    asyncio.create_task(start_scheduler(bot, check_interval=3600))  # Har 1 soatda tekshirish
-    logger.info("Premium scheduler ishga tushdi!")
+    from bot.utils.stats import start_stats_rollup
+    from bot.utils.broadcast import start_broadcast_scheduler
+    asyncio.create_task(leader.run([
+        lambda: start_scheduler(bot),
+        start_stats_rollup,
+        lambda: start_broadcast_scheduler(bot),
+    ]))
+    logger.info("Yetakchi tanlash ishga tushdi (scheduler, rollup, broadcast)")
 
 
 async def on_shutdown():
     """Bot to'xtaganda"""
     logger.info("Bot to'xtadi!")
+
+    # Buferdagi hisoblarni yo'qotmaslik
+    from bot.utils.counters import flush_counters
+    await flush_counters()
+
+    # Boshqa replika TTL kutmasdan yetakchi bo'lsin
+    from bot.utils.leader import leader
+    await leader.release()
+
     await bot.session.close()
 
 
@@ -125,8 +173,15 @@ async def error_handler(event: ErrorEvent):
     return True
 
 
-async def main():
-    """Asosiy funksiya"""
+_dispatcher_ready = False
+
+
+def setup_dispatcher():
+    """Middleware, router va startup/shutdown handlerlarni ulash (bir marta)"""
+    global _dispatcher_ready
+    if _dispatcher_ready:
+        return dp
+
     # Middlewarelar
     dp.message.middleware(ThrottlingMiddleware())
     dp.message.middleware(DatabaseMiddleware())
@@ -142,6 +197,19 @@ async def main():
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
+    _dispatcher_ready = True
+    return dp
+
+
+async def main():
+    """Asosiy funksiya"""
+    setup_dispatcher()
+
+    if settings.BOT_WEBHOOK_URL:
+        # Webhook rejimida updatelar Django/ASGI jarayoniga keladi (bot/webhook.py)
+        logger.error("WEBHOOK_URL o'rnatilgan - botni ASGI server orqali ishga tushiring")
+        return
+
     # Polling
     await dp.start_polling(bot)
 
@@ -6,8 +6,9 @@ from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.core.cache import cache
 from django.conf import settings as django_settings
-from cachetools import TTLCache
 
+from bot.utils.cache import get_cache
+from bot.utils.reachability import clear_unreachable
 from bot.constants import (
     CACHE_TTL_USER, CACHE_TTL_SETTINGS, CACHE_TTL_ADMIN,
     CACHE_MAX_USERS, CACHE_MAX_ADMINS
@@ -15,10 +16,10 @@ from bot.constants import (
 
 logger = logging.getLogger(__name__)
 
-# Local cache for faster access - constants dan qiymatlar
-_user_cache = TTLCache(maxsize=CACHE_MAX_USERS, ttl=CACHE_TTL_USER)
-_settings_cache = TTLCache(maxsize=1, ttl=CACHE_TTL_SETTINGS)
-_admin_cache = TTLCache(maxsize=CACHE_MAX_ADMINS, ttl=CACHE_TTL_ADMIN)
+# Cache (memory yoki redis - settings.BOT_STORAGE) - constants dan qiymatlar
+_user_cache = get_cache('user', ttl=CACHE_TTL_USER, maxsize=CACHE_MAX_USERS)
+_settings_cache = get_cache('settings', ttl=CACHE_TTL_SETTINGS, maxsize=1)
+_admin_cache = get_cache('admin', ttl=CACHE_TTL_ADMIN, maxsize=CACHE_MAX_ADMINS)
 
 
 class DatabaseMiddleware(BaseMiddleware):
@@ -78,6 +79,13 @@ class DatabaseMiddleware(BaseMiddleware):
                         await event.answer(ban_text, show_alert=True)
                     return
 
+                if db_user.unreachable_at:
+                    # User yana yozdi - endi xabar yetkaziladi
+                    await clear_unreachable(db_user.user_id)
+                    db_user.unreachable_reason = ''
+                    db_user.unreachable_at = None
+                    await _user_cache.aset(db_user.user_id, db_user)
+
                 data['db_user'] = db_user
 
             data['bot_settings'] = settings
@@ -86,21 +94,23 @@ class DatabaseMiddleware(BaseMiddleware):
 
     async def _get_user_cached(self, user_id: int):
         """Get user with local cache"""
-        if user_id in _user_cache:
-            return _user_cache[user_id]
+        user = await _user_cache.aget(user_id)
+        if user is not None:
+            return user
 
         user = await self._get_user_db(user_id)
         if user:
-            _user_cache[user_id] = user
+            await _user_cache.aset(user_id, user)
         return user
 
     async def _get_settings_cached(self):
         """Get settings with local cache"""
-        if 'settings' in _settings_cache:
-            return _settings_cache['settings']
+        settings = await _settings_cache.aget('settings')
+        if settings is not None:
+            return settings
 
         settings = await self._get_settings_db()
-        _settings_cache['settings'] = settings
+        await _settings_cache.aset('settings', settings)
         return settings
 
     async def _is_admin_cached(self, user_id: int) -> bool:
@@ -110,12 +120,13 @@ class DatabaseMiddleware(BaseMiddleware):
             return True
 
         # Cache tekshirish
-        if user_id in _admin_cache:
-            return _admin_cache[user_id]
+        is_admin = await _admin_cache.aget(user_id)
+        if is_admin is not None:
+            return is_admin
 
         # Database tekshirish
         is_admin = await self._check_admin_db(user_id)
-        _admin_cache[user_id] = is_admin
+        await _admin_cache.aset(user_id, is_admin)
         return is_admin
 
     @sync_to_async
@@ -141,11 +152,16 @@ class DatabaseMiddleware(BaseMiddleware):
 def clear_user_cache(user_id: int = None):
     """Clear user cache"""
     if user_id:
-        _user_cache.pop(user_id, None)
+        _user_cache.delete(user_id)
     else:
         _user_cache.clear()
 
 
+async def aclear_user_cache(user_id: int):
+    """Clear one cached user (async handlerlar uchun)"""
+    await _user_cache.adelete(user_id)
+
+
 def clear_settings_cache():
     """Clear settings cache"""
     _settings_cache.clear()
@@ -154,6 +170,6 @@ def clear_settings_cache():
 def clear_admin_cache(user_id: int = None):
     """Clear admin cache"""
     if user_id:
-        _admin_cache.pop(user_id, None)
+        _admin_cache.delete(user_id)
     else:
         _admin_cache.clear()
@@ -1,14 +1,16 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import TelegramObject, Message, CallbackQuery
-from aiogram.exceptions import TelegramBadRequest
 from asgiref.sync import sync_to_async
-from cachetools import TTLCache
 from django.conf import settings
 
-# Cache for channels and user subscriptions
-_channels_cache = TTLCache(maxsize=1, ttl=300)
-_subscription_cache = TTLCache(maxsize=5000, ttl=30)
+from bot.constants import CACHE_TTL_CHANNELS
+from bot.utils.cache import get_cache
+from bot.utils.membership import check_channels_membership
+
+# Cache for channels and user subscriptions (memory yoki redis - settings.BOT_STORAGE)
+_channels_cache = get_cache('channels', ttl=CACHE_TTL_CHANNELS, maxsize=1)
+_subscription_cache = get_cache('subscription', ttl=30, maxsize=5000)
 
 
 class SubscriptionMiddleware(BaseMiddleware):
@@ -54,12 +56,13 @@ class SubscriptionMiddleware(BaseMiddleware):
             # Check subscription with cache
             cache_key = f"sub_{user_id}"
 
-            if cache_key in _subscription_cache:
-                not_subscribed = _subscription_cache[cache_key]
-            else:
+            not_subscribed = await _subscription_cache.aget(cache_key)
+            if not_subscribed is None:
                 bot: Bot = data['bot']
-                not_subscribed = await self._check_subscription(bot, user_id)
-                _subscription_cache[cache_key] = not_subscribed
+                not_subscribed, complete = await self._check_subscription(bot, user_id)
+                # Qisman natija (sekin kanal) cache qilinmaydi
+                if complete:
+                    await _subscription_cache.aset(cache_key, not_subscribed)
 
             if not_subscribed:
                 from bot.keyboards import channels_kb
@@ -77,31 +80,19 @@ class SubscriptionMiddleware(BaseMiddleware):
 
         return await handler(event, data)
 
-    async def _check_subscription(self, bot: Bot, user_id: int) -> list:
-        """Check subscription - fast"""
+    async def _check_subscription(self, bot: Bot, user_id: int):
+        """Check subscription - barcha kanallar parallel"""
         channels = await self._get_channels_cached()
-        not_subscribed = []
-
-        for channel in channels:
-            if not channel.is_checkable:
-                continue
-
-            try:
-                member = await bot.get_chat_member(channel.channel_id, user_id)
-                if member.status in ['left', 'kicked']:
-                    not_subscribed.append(channel)
-            except TelegramBadRequest:
-                pass
-
-        return not_subscribed
+        return await check_channels_membership(bot, user_id, channels)
 
     async def _get_channels_cached(self):
         """Get channels with cache"""
-        if 'channels' in _channels_cache:
-            return _channels_cache['channels']
+        channels = await _channels_cache.aget('channels')
+        if channels is not None:
+            return channels
 
         channels = await self._get_channels_db()
-        _channels_cache['channels'] = channels
+        await _channels_cache.aset('channels', channels)
         return channels
 
     @sync_to_async
@@ -113,11 +104,16 @@ class SubscriptionMiddleware(BaseMiddleware):
 def clear_subscription_cache(user_id: int = None):
     """Clear subscription cache"""
     if user_id:
-        _subscription_cache.pop(f"sub_{user_id}", None)
+        _subscription_cache.delete(f"sub_{user_id}")
     else:
         _subscription_cache.clear()
 
 
+async def aclear_subscription_cache(user_id: int):
+    """Clear one user's subscription result (async handlerlar uchun)"""
+    await _subscription_cache.adelete(f"sub_{user_id}")
+
+
 def clear_channels_cache():
     """Clear channels cache"""
     _channels_cache.clear()
@@ -1,7 +1,8 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message
-from cachetools import TTLCache
+
+from bot.utils.cache import get_cache
 
 
 class ThrottlingMiddleware(BaseMiddleware):
@@ -9,7 +10,8 @@ class ThrottlingMiddleware(BaseMiddleware):
 
     def __init__(self, rate_limit: float = 0.5):
         self.rate_limit = rate_limit
-        self.cache = TTLCache(maxsize=10000, ttl=rate_limit)
+        # Umumiy cache - bir nechta workerda ham limit bitta
+        self.cache = get_cache('throttle', ttl=rate_limit, maxsize=10000)
 
     async def __call__(
         self,
@@ -17,13 +19,12 @@ class ThrottlingMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        if isinstance(event, Message):
+        # Albom qismlari alohida updatelar bo'lib millisekundlar ichida keladi - ular cheklanmaydi
+        if isinstance(event, Message) and not event.media_group_id:
             user_id = event.from_user.id
 
-            if user_id in self.cache:
+            if not await self.cache.aadd(user_id, True):
                 # Rate limit
                 return
 
-            self.cache[user_id] = True
-
         return await handler(event, data)
@@ -20,8 +20,11 @@ class BroadcastState(StatesGroup):
     """Xabar yuborish holatlari"""
     target = State()
     is_ad = State()
+    segment = State()
     content = State()
+    buttons = State()
     confirm = State()
+    schedule = State()
 
 
 class AddChannelState(StatesGroup):
@@ -0,0 +1,695 @@
+"""
+Broadcast (ommaviy xabar) yuborish engine.
+
+- global token bucket: barcha yuboruvchilar uchun umumiy tezlik (BROADCAST_RATE xabar/sek)
+- cheklangan worker pool: bir vaqtda BROADCAST_CONCURRENCY ta so'rov
+- TelegramRetryAfter kelsa butun pool retry_after sekundga to'xtaydi, xabar qayta yuboriladi
+- yuborish admin callback idan alohida background task sifatida ishlaydi
+- copy/album rejimi: admin xabari copy_message(s) bilan nusxalanadi - istalgan kontent turi,
+  media qayta yuklanmaydi
+
+Broadcast - bazadagi job: foydalanuvchilar (faqat user_id) User.id bo'yicha keyset
+pagination bilan BROADCAST_CHUNK_SIZE tadan oqim qilinadi - auditoriya hajmidan qat'i
+nazar xotira o'zgarmaydi va har bir chunk yuborilishidan OLDIN last_user_pk checkpoint yoziladi.
+Job ni yuborayotgan jarayon (lock_owner = LOCK_OWNER) har chunk oldidan locked_until ni
+uzaytiradi. Jarayon to'xtasa lock o'tib ketadi va yetakchi replika (bot/utils/leader.py)
+job ni shu joydan davom ettiradi (resume_broadcasts) - ishlab turgan job ni boshqa replika
+olmaydi. Checkpoint faqat egasi bo'lsa o'tadi: job boshqa jarayonga o'tgan bo'lsa (pauza
+qilinib boshqa replikada davom ettirilgan yoki lock o'tib ketib olib qo'yilgan), eski
+task keyingi chunk ni yubormasdan to'xtaydi.
+Chunk o'rtasida to'xtasa, qolgan qismi qayta yuborilmaydi - ikki marta yuborishdan
+ko'ra bir chunk yo'qotish afzal.
+
+Rejalashtirilgan broadcastlar auditoriyasi (target + segment) BROADCAST_MATERIALIZE_AHEAD
+sekund oldin BroadcastRecipient jadvaliga yoziladi - yuborish paytida og'ir filtrlar
+bajarilmaydi, faqat (broadcast_id, user_pk) index bo'yicha o'qiladi.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.core.models import Broadcast, BroadcastRecipient
+from apps.movies.models import SavedMovie
+from apps.users.models import User
+from bot.utils.leader import process_token
+from bot.utils.reachability import get_unreachable_reason, mark_unreachable
+from bot.constants import (
+    BROADCAST_RATE, BROADCAST_BURST, BROADCAST_CONCURRENCY, BROADCAST_MAX_RETRIES,
+    BROADCAST_PROGRESS_INTERVAL, BROADCAST_CHUNK_SIZE, BROADCAST_MATERIALIZE_BATCH,
+    BROADCAST_MATERIALIZE_AHEAD, BROADCAST_SCHEDULE_INTERVAL, BROADCAST_LOCK_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# broadcast_id -> ishlayotgan task (bitta job uchun bitta task)
+_running_tasks: Dict[int, asyncio.Task] = {}
+
+# Shu jarayon olgan job lar egasi (Broadcast.lock_owner)
+LOCK_OWNER = process_token()
+
+# Yuborilmagan xabar turlari (User.UNREACHABLE_* dan tashqari)
+FAILURE_FLOOD = 'flood'  # RetryAfter dan keyin ham yuborilmadi
+FAILURE_ERROR = 'error'
+
+ProgressCallback = Callable[['BroadcastProgress'], Awaitable]
+
+
+def parse_buttons(text: str) -> list:
+    """Admin matnidan tugmalar: har qator - bitta qator tugma, tugmalar | bilan ajratiladi.
+
+        Kanal - https://t.me/kanal | Sayt - https://example.com
+    """
+    rows = []
+    for line in text.strip().splitlines():
+        if not line.strip():
+            continue
+        row = []
+        for part in line.split('|'):
+            label, sep, url = part.rpartition(' - ')
+            label, url = label.strip(), url.strip()
+            if not sep or not label or not url.startswith(('http://', 'https://', 'tg://')):
+                raise ValueError(f"Noto'g'ri tugma: {part.strip()}")
+            row.append({'text': label, 'url': url})
+        rows.append(row)
+
+    if not rows:
+        raise ValueError("Tugmalar topilmadi")
+    return rows
+
+
+def build_buttons_markup(buttons: Optional[list]) -> Optional[InlineKeyboardMarkup]:
+    """Broadcast.buttons -> InlineKeyboardMarkup"""
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=button['text'], url=button['url']) for button in row]
+        for row in buttons
+    ])
+
+
+class TokenBucket:
+    """Asinxron token bucket (rate - token/sek, capacity - maksimal burst)"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float):
+        """Barcha acquire larni to'xtatish (flood control)"""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._tokens = 0
+            self._updated = until
+
+    async def acquire(self, tokens: float = 1):
+        # Sig'imdan katta so'rov (albom - har bir xabar hisoblanadi) sig'im bo'laklarida olinadi
+        remaining = tokens
+        async with self._lock:
+            while remaining > 0:
+                step = min(remaining, self.capacity)
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= step:
+                    self._tokens -= step
+                    remaining -= step
+                    continue
+                await asyncio.sleep((step - self._tokens) / self.rate)
+
+
+class BroadcastProgress:
+    """Yuborish holati - progress reporter shu yerdan o'qiydi"""
+
+    def __init__(self, total: int = 0, sent: int = 0, failed: int = 0):
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.failures = Counter()  # xato turi -> soni (shu ishga tushirishdan beri)
+        self._initial = sent + failed
+        self._started = time.monotonic()
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def rate(self) -> float:
+        """Xabar/sek (shu ishga tushirishdan beri)"""
+        elapsed = time.monotonic() - self._started
+        return (self.done - self._initial) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Qolgan vaqt (sekund), tezlik noma'lum bo'lsa None"""
+        rate = self.rate
+        if rate <= 0:
+            return None
+        return max(0, self.total - self.done) / rate
+
+    def record(self, failure: Optional[str] = None):
+        if failure is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+            self.failures[failure] += 1
+
+
+class BroadcastSender:
+    """Bitta xabarni ko'p foydalanuvchiga yuborish"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        content_type: str,
+        text: str = '',
+        file_id: str = '',
+        source_chat_id: Optional[int] = None,
+        source_message_ids: Optional[List[int]] = None,
+        buttons: Optional[list] = None,
+        rate: float = BROADCAST_RATE,
+        burst: float = BROADCAST_BURST,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ):
+        self.bot = bot
+        self.content_type = content_type
+        self.text = text
+        self.file_id = file_id
+        self.source_chat_id = source_chat_id
+        self.source_message_ids = source_message_ids or []
+        # Markup bir marta quriladi - har bir yuborishda qayta yaratilmaydi
+        self.reply_markup = reply_markup or build_buttons_markup(buttons)
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.progress: Optional[BroadcastProgress] = None
+
+    @property
+    def cost(self) -> int:
+        """Bitta userga yuborish nechta xabar (token) sarflaydi"""
+        return len(self.source_message_ids) if self.content_type == 'album' else 1
+
+    async def send_one(self, chat_id: int):
+        if self.content_type == 'copy':
+            # Istalgan turdagi xabar - media qayta yuklanmaydi
+            await self.bot.copy_message(
+                chat_id, self.source_chat_id, self.source_message_ids[0], reply_markup=self.reply_markup
+            )
+        elif self.content_type == 'album':
+            await self.bot.copy_messages(chat_id, self.source_chat_id, self.source_message_ids)
+        elif self.content_type == 'text':
+            await self.bot.send_message(chat_id, self.text, reply_markup=self.reply_markup)
+        elif self.content_type == 'photo':
+            await self.bot.send_photo(chat_id, self.file_id, caption=self.text, reply_markup=self.reply_markup)
+        elif self.content_type == 'video':
+            await self.bot.send_video(chat_id, self.file_id, caption=self.text, reply_markup=self.reply_markup)
+        elif self.content_type == 'document':
+            await self.bot.send_document(chat_id, self.file_id, caption=self.text, reply_markup=self.reply_markup)
+        else:
+            raise ValueError(f"Noma'lum kontent turi: {self.content_type}")
+
+    async def _deliver(self, chat_id: int) -> Optional[str]:
+        """Yuborish: muvaffaqiyatli bo'lsa None, aks holda xato turi"""
+        for _ in range(BROADCAST_MAX_RETRIES + 1):
+            await self.bucket.acquire(self.cost)
+            try:
+                await self.send_one(chat_id)
+                return None
+            except TelegramRetryAfter as e:
+                logger.warning(f"Broadcast: flood control, {e.retry_after} sek kutiladi")
+                self.bucket.pause(e.retry_after)
+            except Exception as e:
+                logger.debug(f"Broadcast: {chat_id} ga yuborilmadi: {e}")
+                return get_unreachable_reason(e) or FAILURE_ERROR
+        return FAILURE_FLOOD
+
+    async def send_batch(self, chat_ids: Iterable[int]) -> Tuple[int, int]:
+        """Worker pool orqali yuborish, (sent, failed) qaytaradi"""
+        queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+
+        sent = failed = 0
+        unreachable: Dict[int, str] = {}
+
+        async def worker():
+            nonlocal sent, failed
+            while True:
+                chat_id = await queue.get()
+                try:
+                    failure = await self._deliver(chat_id)
+                    if failure is None:
+                        sent += 1
+                    else:
+                        failed += 1
+                        if failure not in (FAILURE_ERROR, FAILURE_FLOOD):
+                            unreachable[chat_id] = failure
+                    if self.progress is not None:
+                        self.progress.record(failure)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, queue.qsize()))]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        # Keyingi broadcastlarda bu userlar o'tkazib yuboriladi
+        await mark_unreachable(unreachable)
+        return sent, failed
+
+
+# ==================== DB ====================
+
+@sync_to_async
+def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    return Broadcast.objects.filter(id=broadcast_id).select_related('sent_by').first()
+
+
+def _recipients_queryset(target: str, is_ad: bool, segment: Optional[dict] = None):
+    now = timezone.now()
+    qs = User.objects.filter(is_banned=False, unreachable_at__isnull=True)
+
+    if target == 'premium':
+        qs = qs.filter(is_premium=True, premium_expires__gt=now)
+    elif target == 'regular':
+        qs = qs.exclude(is_premium=True, premium_expires__gt=now)
+
+    if is_ad:
+        # Reklama xabari premium ga bormaydi
+        qs = qs.exclude(is_premium=True, premium_expires__gt=now)
+
+    segment = segment or {}
+    if segment.get('channel_id'):
+        qs = qs.filter(joined_from_channel_id=segment['channel_id'])
+    if segment.get('trial'):
+        qs = qs.filter(free_trial_expires__gt=now)
+    if segment.get('inactive_days'):
+        qs = qs.filter(last_active__lt=now - timedelta(days=segment['inactive_days']))
+    if segment.get('language'):
+        # Saqlagan kinolari shu tilda bo'lganlar
+        qs = qs.filter(
+            Exists(SavedMovie.objects.filter(user_id=OuterRef('pk'), movie__language=segment['language']))
+        )
+
+    return qs
+
+
+def _broadcast_recipients_queryset(broadcast: Broadcast):
+    return _recipients_queryset(broadcast.target, broadcast.is_advertisement, broadcast.segment)
+
+
+@sync_to_async
+def count_recipients(broadcast: Broadcast) -> int:
+    if broadcast.audience_ready_at:
+        return BroadcastRecipient.objects.filter(broadcast_id=broadcast.id).count()
+    return _broadcast_recipients_queryset(broadcast).count()
+
+
+@sync_to_async
+def get_recipient_chunk(broadcast: Broadcast, after_pk: int, limit: int) -> List[Tuple[int, int]]:
+    """Keyset sahifa: (User.id, user_id), after_pk dan keyingilar"""
+    if broadcast.audience_ready_at:
+        # Oldindan hisoblangan auditoriya - faqat index bo'yicha o'qish
+        qs = BroadcastRecipient.objects.filter(broadcast_id=broadcast.id, user_pk__gt=after_pk)
+        return list(qs.order_by('user_pk').values_list('user_pk', 'user_id')[:limit])
+
+    return list(
+        _broadcast_recipients_queryset(broadcast)
+        .filter(pk__gt=after_pk)
+        .order_by('pk')
+        .values_list('pk', 'user_id')[:limit]
+    )
+
+
+async def iter_recipients(
+    broadcast: Broadcast, after_pk: int = 0, chunk_size: int = BROADCAST_CHUNK_SIZE
+) -> AsyncIterator[List[Tuple[int, int]]]:
+    """Qabul qiluvchilarni chunk lab oqim qilish (xotirada ko'pi bilan 2 ta chunk).
+
+    Keyingi chunk joriy chunk yuborilayotganda oldindan olinadi.
+    """
+    next_chunk = asyncio.ensure_future(get_recipient_chunk(broadcast, after_pk, chunk_size))
+    try:
+        while True:
+            chunk = await next_chunk
+            if not chunk:
+                return
+            if len(chunk) < chunk_size:
+                next_chunk = None
+                yield chunk
+                return
+            next_chunk = asyncio.ensure_future(get_recipient_chunk(broadcast, chunk[-1][0], chunk_size))
+            yield chunk
+    finally:
+        if next_chunk is not None and not next_chunk.done():
+            next_chunk.cancel()
+
+
+@sync_to_async
+def materialize_audience(broadcast_id: int) -> int:
+    """Auditoriyani BroadcastRecipient jadvaliga yozish, soni qaytariladi"""
+    broadcast = Broadcast.objects.get(id=broadcast_id)
+    qs = _broadcast_recipients_queryset(broadcast).order_by('pk').values_list('pk', 'user_id')
+
+    total = 0
+    last_pk = 0
+    with transaction.atomic():
+        BroadcastRecipient.objects.filter(broadcast_id=broadcast_id).delete()
+        while True:
+            rows = list(qs.filter(pk__gt=last_pk)[:BROADCAST_MATERIALIZE_BATCH])
+            if not rows:
+                break
+            BroadcastRecipient.objects.bulk_create([
+                BroadcastRecipient(broadcast_id=broadcast_id, user_pk=pk, user_id=user_id)
+                for pk, user_id in rows
+            ])
+            total += len(rows)
+            last_pk = rows[-1][0]
+
+        Broadcast.objects.filter(id=broadcast_id).update(total_users=total, audience_ready_at=timezone.now())
+
+    logger.info(f"Broadcast #{broadcast_id} auditoriyasi tayyorlandi: {total} ta")
+    return total
+
+
+@sync_to_async
+def clear_audience(broadcast_id: int):
+    """Tugagan/bekor qilingan broadcast auditoriyasini o'chirish"""
+    BroadcastRecipient.objects.filter(broadcast_id=broadcast_id).delete()
+
+
+@sync_to_async
+def checkpoint_broadcast(broadcast_id: int, last_user_pk: int, sent: int, failed: int) -> bool:
+    """Chunk yuborishdan oldin cursor ni surish va lock ni uzaytirish (job hali running va bizniki bo'lsa)"""
+    return _owned(broadcast_id).filter(status=Broadcast.STATUS_RUNNING).update(
+        last_user_pk=last_user_pk,
+        sent_count=sent,
+        failed_count=failed,
+        locked_until=_lock_deadline(),
+    ) == 1
+
+
+@sync_to_async
+def save_broadcast_counts(broadcast_id: int, sent: int, failed: int):
+    # Job boshqa jarayonga o'tgan bo'lsa uning hisoblarini bosib ketmaslik
+    _owned(broadcast_id).update(sent_count=sent, failed_count=failed)
+
+
+@sync_to_async
+def update_broadcast_total(broadcast_id: int, total: int):
+    Broadcast.objects.filter(id=broadcast_id).update(total_users=total)
+
+
+@sync_to_async
+def complete_broadcast(broadcast_id: int, sent: int, failed: int) -> bool:
+    return _owned(broadcast_id).filter(status=Broadcast.STATUS_RUNNING).update(
+        sent_count=sent,
+        failed_count=failed,
+        status=Broadcast.STATUS_COMPLETED,
+        is_completed=True,
+        completed_at=timezone.now()
+    ) == 1
+
+
+@sync_to_async
+def set_broadcast_status(broadcast_id: int, status: str, from_statuses: Iterable[str]) -> bool:
+    """Holatni o'zgartirish (faqat from_statuses dan)"""
+    fields = {'status': status}
+    if status == Broadcast.STATUS_CANCELLED:
+        fields['completed_at'] = timezone.now()
+    elif status == Broadcast.STATUS_RUNNING:
+        # Shu jarayon yuboradi - yetakchi uni egasiz deb olmasligi uchun
+        fields['locked_until'] = _lock_deadline()
+        fields['lock_owner'] = LOCK_OWNER
+    return Broadcast.objects.filter(id=broadcast_id, status__in=list(from_statuses)).update(**fields) == 1
+
+
+def _lock_deadline():
+    return timezone.now() + timedelta(seconds=BROADCAST_LOCK_TTL)
+
+
+def _owned(broadcast_id: int):
+    return Broadcast.objects.filter(id=broadcast_id, lock_owner=LOCK_OWNER)
+
+
+def _orphaned(qs):
+    """Running, lekin hech bir jarayon yubormayapti (lock yo'q yoki o'tib ketgan)"""
+    return qs.filter(status=Broadcast.STATUS_RUNNING).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=timezone.now())
+    )
+
+
+@sync_to_async
+def get_orphaned_broadcast_ids() -> List[int]:
+    return list(_orphaned(Broadcast.objects.all()).order_by('id').values_list('id', flat=True))
+
+
+@sync_to_async
+def claim_broadcast(broadcast_id: int) -> bool:
+    """Egasiz job ni shu jarayonga olish (bir vaqtda faqat bittasi oladi)"""
+    return _orphaned(Broadcast.objects.filter(id=broadcast_id)).update(
+        locked_until=_lock_deadline(), lock_owner=LOCK_OWNER
+    ) == 1
+
+
+# ==================== JOB ====================
+
+async def report_progress(
+    progress: BroadcastProgress, on_progress: ProgressCallback, interval: float = BROADCAST_PROGRESS_INTERVAL
+):
+    """Yuborish siklidan tashqarida - ko'pi bilan har interval sekundda bitta edit"""
+    last_done = None
+    while True:
+        await asyncio.sleep(interval)
+        if progress.done == last_done:
+            continue
+        last_done = progress.done
+        try:
+            await on_progress(progress)
+        except TelegramBadRequest as e:
+            if 'message is not modified' not in str(e):
+                logger.debug(f"Broadcast progress xatosi: {e}")
+        except Exception as e:
+            # Edit ham flood limitga tushishi mumkin - keyingi intervalda qayta urinadi
+            logger.debug(f"Broadcast progress xatosi: {e}")
+
+
+async def run_broadcast(
+    bot: Bot,
+    broadcast_id: int,
+    on_progress: Optional[ProgressCallback] = None,
+    on_done: Optional[ProgressCallback] = None,
+    **sender_options,
+) -> Optional[Tuple[int, int]]:
+    """Job ni checkpoint dan davom ettirish. Tugasa (sent, failed), to'xtatilsa None"""
+    broadcast = await get_broadcast(broadcast_id)
+    if broadcast is None or broadcast.status != Broadcast.STATUS_RUNNING:
+        return None
+
+    sender = BroadcastSender(
+        bot,
+        broadcast.content_type,
+        text=broadcast.text,
+        file_id=broadcast.file_id,
+        source_chat_id=broadcast.source_chat_id,
+        source_message_ids=broadcast.source_message_ids,
+        buttons=broadcast.buttons,
+        **sender_options
+    )
+
+    total = broadcast.total_users
+    if not broadcast.last_user_pk and not broadcast.audience_ready_at:
+        total = await count_recipients(broadcast)
+        await update_broadcast_total(broadcast_id, total)
+
+    progress = sender.progress = BroadcastProgress(total, broadcast.sent_count, broadcast.failed_count)
+    reporter = asyncio.create_task(report_progress(progress, on_progress)) if on_progress else None
+
+    try:
+        recipients = iter_recipients(broadcast, broadcast.last_user_pk)
+        async for chunk in recipients:
+            if not await checkpoint_broadcast(broadcast_id, chunk[-1][0], progress.sent, progress.failed):
+                # To'xtatildi yoki bekor qilindi
+                await save_broadcast_counts(broadcast_id, progress.sent, progress.failed)
+                logger.info(f"Broadcast #{broadcast_id} to'xtadi: {progress.done}/{total}")
+                await recipients.aclose()
+                return None
+
+            await sender.send_batch(user_id for _, user_id in chunk)
+
+        if not await complete_broadcast(broadcast_id, progress.sent, progress.failed):
+            # Oxirgi chunk paytida to'xtatildi
+            await save_broadcast_counts(broadcast_id, progress.sent, progress.failed)
+            return None
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+
+    await clear_audience(broadcast_id)
+    logger.info(
+        f"Broadcast #{broadcast_id} yakunlandi: {progress.sent} yuborildi, {progress.failed} xato "
+        f"({dict(progress.failures)})"
+    )
+
+    if on_done:
+        try:
+            await on_done(progress)
+        except Exception as e:
+            logger.debug(f"Broadcast yakuniy xabari yuborilmadi: {e}")
+    return progress.sent, progress.failed
+
+
+def is_broadcast_running(broadcast_id: int) -> bool:
+    task = _running_tasks.get(broadcast_id)
+    return task is not None and not task.done()
+
+
+def start_broadcast(bot: Bot, broadcast_id: int, **kwargs) -> asyncio.Task:
+    """run_broadcast ni background task sifatida ishga tushirish.
+
+    Shu job uchun task hali tugamagan bo'lsa, yangisi u tugagandan keyin boshlanadi -
+    bir job ni ikki task parallel yubormaydi.
+    """
+    previous = _running_tasks.get(broadcast_id)
+
+    async def run():
+        if previous is not None and not previous.done():
+            await asyncio.gather(previous, return_exceptions=True)
+        return await run_broadcast(bot, broadcast_id, **kwargs)
+
+    task = asyncio.create_task(run())
+    _running_tasks[broadcast_id] = task
+    task.add_done_callback(lambda t: _on_task_done(broadcast_id, t))
+    return task
+
+
+def _on_task_done(broadcast_id: int, task: asyncio.Task):
+    if _running_tasks.get(broadcast_id) is task:
+        del _running_tasks[broadcast_id]
+    if not task.cancelled() and task.exception():
+        logger.error(f"Broadcast #{broadcast_id} xato bilan tugadi: {task.exception()}")
+
+
+async def pause_broadcast(broadcast_id: int) -> bool:
+    """Keyingi chunk oldidan to'xtaydi"""
+    return await set_broadcast_status(broadcast_id, Broadcast.STATUS_PAUSED, [Broadcast.STATUS_RUNNING])
+
+
+async def cancel_broadcast(broadcast_id: int) -> bool:
+    cancelled = await set_broadcast_status(
+        broadcast_id,
+        Broadcast.STATUS_CANCELLED,
+        [Broadcast.STATUS_SCHEDULED, Broadcast.STATUS_RUNNING, Broadcast.STATUS_PAUSED]
+    )
+    if cancelled:
+        await clear_audience(broadcast_id)
+    return cancelled
+
+
+async def resume_broadcast(bot: Bot, broadcast_id: int, **kwargs) -> bool:
+    """To'xtatilgan job ni checkpoint dan davom ettirish"""
+    if not await set_broadcast_status(broadcast_id, Broadcast.STATUS_RUNNING, [Broadcast.STATUS_PAUSED]):
+        return False
+    start_broadcast(bot, broadcast_id, **kwargs)
+    return True
+
+
+async def resume_broadcasts(bot: Bot) -> int:
+    """Egasiz qolgan (yuborayotgan jarayon to'xtagan) job larni davom ettirish"""
+    resumed = []
+    for broadcast_id in await get_orphaned_broadcast_ids():
+        if not is_broadcast_running(broadcast_id) and await claim_broadcast(broadcast_id):
+            start_broadcast(bot, broadcast_id, on_done=_owner_notifier(bot, broadcast_id))
+            resumed.append(broadcast_id)
+
+    if resumed:
+        logger.info(f"Tugallanmagan broadcastlar davom ettirildi: {resumed}")
+    return len(resumed)
+
+
+def _owner_notifier(bot: Bot, broadcast_id: int) -> ProgressCallback:
+    """Qayta ishga tushgan job uchun - natijani yuborgan adminga xabar qilish"""
+
+    async def notify(progress: BroadcastProgress):
+        broadcast = await get_broadcast(broadcast_id)
+        if broadcast and broadcast.sent_by:
+            await bot.send_message(
+                broadcast.sent_by.user_id,
+                f"✅ <b>Broadcast #{broadcast_id} yakunlandi!</b>\n\n"
+                f"📊 Jami: {progress.total}\n"
+                f"✅ Yuborildi: {progress.sent}\n"
+                f"❌ Xato: {progress.failed}"
+            )
+
+    return notify
+
+
+# ==================== REJALASHTIRISH ====================
+
+@sync_to_async
+def get_scheduled_broadcasts(until) -> List[Tuple[int, object, object]]:
+    """(id, scheduled_at, audience_ready_at) - until gacha rejalashtirilganlar"""
+    return list(
+        Broadcast.objects.filter(status=Broadcast.STATUS_SCHEDULED, scheduled_at__lte=until)
+        .order_by('scheduled_at')
+        .values_list('id', 'scheduled_at', 'audience_ready_at')
+    )
+
+
+async def run_scheduled_broadcasts(bot: Bot) -> int:
+    """Yaqinlashayotganlar auditoriyasini tayyorlash, vaqti kelganlarini boshlash"""
+    now = timezone.now()
+    started = 0
+
+    for broadcast_id, scheduled_at, audience_ready_at in await get_scheduled_broadcasts(
+        now + timedelta(seconds=BROADCAST_MATERIALIZE_AHEAD)
+    ):
+        if audience_ready_at is None:
+            await materialize_audience(broadcast_id)
+
+        if scheduled_at <= now and await set_broadcast_status(
+            broadcast_id, Broadcast.STATUS_RUNNING, [Broadcast.STATUS_SCHEDULED]
+        ):
+            start_broadcast(bot, broadcast_id, on_done=_owner_notifier(bot, broadcast_id))
+            started += 1
+            logger.info(f"Rejalashtirilgan broadcast #{broadcast_id} boshlandi")
+
+    return started
+
+
+async def start_broadcast_scheduler(bot: Bot):
+    """Rejalashtirilgan va egasiz qolgan broadcastlar (yetakchi replikada background task)"""
+    logger.info("Broadcast rejalashtiruvchisi ishga tushdi")
+    while True:
+        try:
+            await resume_broadcasts(bot)
+            await run_scheduled_broadcasts(bot)
+        except Exception as e:
+            logger.error(f"Broadcast rejalashtiruvchisida xato: {e}")
+        await asyncio.sleep(BROADCAST_SCHEDULE_INTERVAL)
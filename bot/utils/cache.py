@@ -0,0 +1,247 @@
+"""
+Bot cache qatlami.
+
+settings.BOT_STORAGE ga qarab backend tanlanadi:
+- memory: jarayon ichidagi TTLCache (bitta bot jarayoni uchun)
+- redis: barcha workerlar uchun umumiy cache
+
+Ikkala backend ham bir xil sync interfeysga ega (get/set/add/pop/delete/clear).
+Async kod (middleware, handlerlar) uchun aget/aset/aadd/apop/adelete - redis backendda
+redis.asyncio client ishlatiladi, event loop tarmoq so'rovida bloklanmaydi.
+"""
+import asyncio
+import logging
+import pickle
+import weakref
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Umumiy sync Redis client (lazy)"""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1
+        )
+    return _redis_client
+
+
+def set_redis_client(client):
+    """Redis clientni almashtirish (testlar uchun)"""
+    global _redis_client
+    _redis_client = client
+
+
+# redis.asyncio ulanishlari event loop ga bog'langan - har bir loop uchun alohida client
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis_client():
+    """Joriy event loop uchun async Redis client (lazy)"""
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1
+        )
+        _async_redis_clients[loop] = client
+    return client
+
+
+class MemoryCache:
+    """Jarayon ichidagi TTL cache"""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        self.namespace = namespace
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key, default=None) -> Any:
+        return self._cache.get(key, default)
+
+    def set(self, key, value):
+        self._cache[key] = value
+
+    def add(self, key, value) -> bool:
+        """Kalit yo'q bo'lsagina yozish"""
+        if key in self._cache:
+            return False
+        self._cache[key] = value
+        return True
+
+    def pop(self, key, default=None) -> Any:
+        return self._cache.pop(key, default)
+
+    def delete(self, key):
+        self._cache.pop(key, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __contains__(self, key) -> bool:
+        return key in self._cache
+
+    async def aget(self, key, default=None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    async def aadd(self, key, value) -> bool:
+        return self.add(key, value)
+
+    async def apop(self, key, default=None) -> Any:
+        return self.pop(key, default)
+
+    async def adelete(self, key):
+        self.delete(key)
+
+
+class RedisCache:
+    """
+    Redis cache - barcha workerlar uchun umumiy.
+
+    Redis ishlamay qolsa xato log qilinadi va cache "bo'sh" deb hisoblanadi.
+    """
+
+    def __init__(self, namespace: str, ttl: float, client=None, prefix: Optional[str] = None, async_client=None):
+        self.namespace = namespace
+        self.ttl_ms = max(1, int(ttl * 1000))
+        self.prefix = f"{prefix or settings.BOT_CACHE_PREFIX}:{namespace}:"
+        self._client = client
+        self._async_client = async_client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    @property
+    def async_client(self):
+        return self._async_client or get_async_redis_client()
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key, default=None) -> Any:
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'qishda xato ({self.namespace}): {e}")
+            return default
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key, value):
+        try:
+            self.client.set(self._key(key), pickle.dumps(value), px=self.ttl_ms)
+        except Exception as e:
+            logger.warning(f"Redis cache yozishda xato ({self.namespace}): {e}")
+
+    def add(self, key, value) -> bool:
+        """Kalit yo'q bo'lsagina yozish (SET NX)"""
+        try:
+            return bool(self.client.set(self._key(key), pickle.dumps(value), px=self.ttl_ms, nx=True))
+        except Exception as e:
+            logger.warning(f"Redis cache yozishda xato ({self.namespace}): {e}")
+            return True
+
+    def pop(self, key, default=None) -> Any:
+        try:
+            raw = self.client.getdel(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'qishda xato ({self.namespace}): {e}")
+            return default
+        return default if raw is None else pickle.loads(raw)
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'chirishda xato ({self.namespace}): {e}")
+
+    def clear(self):
+        """Faqat shu namespace kalitlarini o'chirish"""
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}*", count=500))
+            for i in range(0, len(keys), 500):
+                self.client.delete(*keys[i:i + 500])
+        except Exception as e:
+            logger.warning(f"Redis cache tozalashda xato ({self.namespace}): {e}")
+
+    def __contains__(self, key) -> bool:
+        try:
+            return bool(self.client.exists(self._key(key)))
+        except Exception:
+            return False
+
+    async def aget(self, key, default=None) -> Any:
+        try:
+            raw = await self.async_client.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'qishda xato ({self.namespace}): {e}")
+            return default
+        return default if raw is None else pickle.loads(raw)
+
+    async def aset(self, key, value):
+        try:
+            await self.async_client.set(self._key(key), pickle.dumps(value), px=self.ttl_ms)
+        except Exception as e:
+            logger.warning(f"Redis cache yozishda xato ({self.namespace}): {e}")
+
+    async def aadd(self, key, value) -> bool:
+        """Kalit yo'q bo'lsagina yozish (SET NX)"""
+        try:
+            return bool(await self.async_client.set(self._key(key), pickle.dumps(value), px=self.ttl_ms, nx=True))
+        except Exception as e:
+            logger.warning(f"Redis cache yozishda xato ({self.namespace}): {e}")
+            return True
+
+    async def apop(self, key, default=None) -> Any:
+        try:
+            raw = await self.async_client.getdel(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'qishda xato ({self.namespace}): {e}")
+            return default
+        return default if raw is None else pickle.loads(raw)
+
+    async def adelete(self, key):
+        try:
+            await self.async_client.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache o'chirishda xato ({self.namespace}): {e}")
+
+
+def get_cache(namespace: str, ttl: float, maxsize: int = 1000, backend: Optional[str] = None):
+    """
+    Namespace uchun cache yaratish.
+
+    Args:
+        namespace: Kalitlar prefiksi (masalan 'user')
+        ttl: Yashash vaqti (sekund)
+        maxsize: Memory backend uchun maksimal yozuvlar soni
+        backend: 'memory' yoki 'redis' (default - settings.BOT_STORAGE)
+    """
+    backend = backend or settings.BOT_STORAGE
+    if backend == 'redis':
+        return RedisCache(namespace, ttl)
+    return MemoryCache(namespace, ttl, maxsize)
+
+
+def get_fsm_storage():
+    """Aiogram FSM storage - BOT_STORAGE ga qarab"""
+    if settings.BOT_STORAGE == 'redis':
+        from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+        return RedisStorage.from_url(
+            settings.REDIS_URL,
+            key_builder=DefaultKeyBuilder(prefix=f"{settings.BOT_CACHE_PREFIX}:fsm"),
+        )
+
+    from aiogram.fsm.storage.memory import MemoryStorage
+    return MemoryStorage()
@@ -0,0 +1,75 @@
+"""
+Kino caption larini tayyorlash (cached).
+
+Caption kalit bo'yicha saqlanadi: (kod, uslub, updated_at, bot link) - kino o'zgarsa
+updated_at ham o'zgaradi va eski yozuv ishlatilmaydi. Ko'rishlar soni faqat
+CACHE_TTL_CAPTION oralig'ida yangilanadi.
+"""
+from cachetools import TTLCache
+
+from bot.constants import CACHE_TTL_CAPTION, CACHE_MAX_CAPTIONS
+from bot.utils.helpers import format_number
+
+# Caption uslublari
+STYLE_FULL = 'full'  # Kod yuborilganda - batafsil
+STYLE_COMPACT = 'compact'  # Kino ro'yxatidan
+STYLE_SAVED = 'saved'  # Saqlangan kinolardan
+STYLE_RANDOM = 'random'  # Random kino (ko'rishlar sonisiz)
+STYLE_SHORT = 'short'  # Faqat nom va kod
+
+_caption_cache = TTLCache(maxsize=CACHE_MAX_CAPTIONS, ttl=CACHE_TTL_CAPTION)
+
+
+def _details_line(movie) -> str:
+    year_text = f" • 📅 {movie.year}" if movie.year else ""
+    return f"📺 {movie.get_quality_display()} • 🌐 {movie.get_language_display()}{year_text}\n"
+
+
+def _build_caption(movie, style: str, bot_link: str) -> str:
+    if style == STYLE_SHORT:
+        return f"🎬 <b>{movie.display_title}</b>\n\n📝 Kod: <code>{movie.code}</code>"
+
+    if style == STYLE_FULL:
+        desc = f"\n\n📖 {movie.description}" if movie.description else ""
+        year_text = f"📅 Yil: {movie.year}\n" if movie.year else ""
+        return (
+            f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
+            f"📝 Kod: <code>{movie.code}</code>\n"
+            f"{year_text}"
+            f"🌍 Davlat: {movie.get_country_display()}\n"
+            f"📺 Sifat: {movie.get_quality_display()}\n"
+            f"🌐 Til: {movie.get_language_display()}\n"
+            f"👁 Ko'rishlar: {format_number(movie.views)}\n\n"
+            f"🤖 <b>Bot:</b> {bot_link}"
+        )
+
+    header = {
+        STYLE_SAVED: "❤️ <b>Saqlangan kino:</b>\n\n",
+        STYLE_RANDOM: "🎲 <b>Random kino:</b>\n\n",
+    }.get(style, "")
+    desc = f"\n📖 {movie.description}" if movie.description else ""
+    views = "" if style == STYLE_RANDOM else f"👁 {format_number(movie.views)}\n"
+
+    return (
+        f"{header}"
+        f"🎬 <b>{movie.display_title}</b>{desc}\n\n"
+        f"📝 Kod: <code>{movie.code}</code>\n"
+        f"{_details_line(movie)}"
+        f"{views}\n"
+        f"🤖 <b>Bot:</b> {bot_link}"
+    )
+
+
+def render_movie_caption(movie, style: str = STYLE_FULL, bot_link: str = '') -> str:
+    """Kino caption (Movie yoki MovieRecord)"""
+    key = (movie.code, style, movie.updated_at, bot_link)
+    caption = _caption_cache.get(key)
+    if caption is None:
+        caption = _build_caption(movie, style, bot_link)
+        _caption_cache[key] = caption
+    return caption
+
+
+def clear_caption_cache():
+    """Caption cache ni tozalash"""
+    _caption_cache.clear()
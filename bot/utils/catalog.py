@@ -0,0 +1,147 @@
+"""
+Kino katalogi - kod bo'yicha qidirish uchun xotiradagi nusxa.
+
+Kod bo'yicha qidirish botning asosiy yuklamasi, shuning uchun u bazaga tegmaydi:
+- ishga tushganda barcha kinolar yuklanadi
+- Movie.updated_at watermark bo'yicha qo'shimcha yangilanadi (yangi/o'zgargan kinolar)
+- o'chirilgan kinolar invalidatsiya xabari orqali olib tashlanadi
+- ko'rishlar soni kabi update() bilan o'zgaradigan maydonlar davriy to'liq qayta yuklashda yangilanadi
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from asgiref.sync import sync_to_async
+
+from apps.movies.models import Movie
+from bot.constants import CATALOG_REFRESH_INTERVAL, CATALOG_FULL_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_QUALITY_DISPLAY = dict(Movie.QUALITY_CHOICES)
+_LANGUAGE_DISPLAY = dict(Movie.LANGUAGE_CHOICES)
+_COUNTRY_DISPLAY = dict(Movie.COUNTRY_CHOICES)
+
+
+class MovieRecord:
+    """Movie modelining yengil nusxasi (handlerlar ishlatadigan maydonlar)"""
+
+    FIELDS = (
+        'id', 'code', 'title', 'title_uz', 'file_id', 'thumbnail_file_id', 'category_id',
+        'year', 'duration', 'quality', 'language', 'country', 'description',
+        'is_premium', 'views', 'is_active', 'updated_at',
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+
+    def __repr__(self):
+        return f"<MovieRecord [{self.code}] {self.title}>"
+
+    @property
+    def display_title(self):
+        """Ko'rsatiladigan nom"""
+        return self.title_uz if self.title_uz else self.title
+
+    def get_quality_display(self):
+        return _QUALITY_DISPLAY.get(self.quality, self.quality)
+
+    def get_language_display(self):
+        return _LANGUAGE_DISPLAY.get(self.language, self.language)
+
+    def get_country_display(self):
+        return _COUNTRY_DISPLAY.get(self.country, self.country)
+
+
+@sync_to_async
+def _load_rows(updated_since=None) -> list:
+    queryset = Movie.objects.all()
+    if updated_since is not None:
+        # >= - bir xil vaqtli yozuvlar o'tkazib yuborilmasligi uchun (qayta qo'llash xavfsiz)
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return list(queryset.values_list(*MovieRecord.FIELDS))
+
+
+class MovieCatalog:
+    """code -> MovieRecord"""
+
+    def __init__(self):
+        self._movies: Dict[str, MovieRecord] = {}
+        self._codes: Dict[int, str] = {}  # id -> code (kod o'zgarsa eskisini o'chirish uchun)
+        self._watermark = None
+        self._loaded = False
+        self._dirty = False
+        self._last_full_load = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._movies)
+
+    def _apply(self, rows: list):
+        for row in rows:
+            record = MovieRecord(*row)
+            old_code = self._codes.get(record.id)
+            if old_code is not None and old_code != record.code:
+                self._movies.pop(old_code, None)
+            self._codes[record.id] = record.code
+            self._movies[record.code] = record
+            if self._watermark is None or record.updated_at > self._watermark:
+                self._watermark = record.updated_at
+
+    async def load(self, force: bool = True):
+        """To'liq yuklash (force=False - allaqachon yuklangan bo'lsa o'tkazib yuborish)"""
+        async with self._lock:
+            if self._loaded and not force:
+                return
+            rows = await _load_rows()
+            self._movies = {}
+            self._codes = {}
+            self._watermark = None
+            self._apply(rows)
+            self._loaded = True
+            self._dirty = False
+            self._last_full_load = time.monotonic()
+        logger.info(f"Kino katalogi yuklandi: {len(self._movies)} ta")
+
+    async def refresh(self):
+        """Faqat watermark dan keyin o'zgargan kinolarni yuklash"""
+        if not self._loaded:
+            return await self.load(force=False)
+
+        async with self._lock:
+            self._dirty = False
+            self._apply(await _load_rows(self._watermark))
+
+    def invalidate(self, code: str = '', deleted: bool = False):
+        """Kino o'zgardi - keyingi qidiruvda yangilanadi"""
+        if deleted and code:
+            record = self._movies.pop(code, None)
+            if record is not None:
+                self._codes.pop(record.id, None)
+        self._dirty = True
+
+    async def get(self, code: str) -> Optional[MovieRecord]:
+        """Kod bo'yicha kino"""
+        if not self._loaded:
+            await self.load(force=False)
+        elif self._dirty:
+            await self.refresh()
+        return self._movies.get(code)
+
+    async def maintain(self):
+        """Davriy yangilash (background task)"""
+        while True:
+            try:
+                if time.monotonic() - self._last_full_load >= CATALOG_FULL_RELOAD_INTERVAL:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.error(f"Kino katalogini yangilashda xato: {e}")
+            await asyncio.sleep(CATALOG_REFRESH_INTERVAL)
+
+
+catalog = MovieCatalog()
@@ -0,0 +1,154 @@
+"""
+Ko'rishlar hisoblagichlari - write-behind buffer.
+
+Har bir kino yuborilganda alohida UPDATE o'rniga oshirishlar xotirada yig'iladi
+va har COUNTER_FLUSH_INTERVAL sekundda bitta UPDATE ... CASE bilan yoziladi.
+Jarayon kutilmaganda to'xtasa, ko'pi bilan oxirgi interval hisoblari yo'qoladi.
+Har bir ko'rish voqea sifatida ham (MovieView) shu oraliqda bitta bulk INSERT bilan
+yoziladi - kunlik ko'rishlar va trend shu jadvaldan hisoblanadi.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from bot.constants import COUNTER_FLUSH_INTERVAL, COUNTER_FLUSH_THRESHOLD, VIEW_EVENTS_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Bitta model maydoni uchun oshirishlar buferi"""
+
+    def __init__(self, model_path: str, lookup: str, field: str):
+        self.model_path = model_path
+        self.lookup = lookup
+        self.field = field
+        self._pending: Dict[int, int] = defaultdict(int)
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, key: int, amount: int = 1):
+        self._pending[key] += amount
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _get_model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_path)
+
+    def _write(self, pending: Dict[int, int]) -> int:
+        """Bitta UPDATE: field = field + CASE WHEN key IN (...) THEN n ... END"""
+        # Bir xil qiymatli kalitlar bitta WHEN ga birlashtiriladi
+        by_amount = defaultdict(list)
+        for key, amount in pending.items():
+            by_amount[amount].append(key)
+
+        increment = Case(
+            *[When(**{f'{self.lookup}__in': keys}, then=Value(amount)) for amount, keys in by_amount.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        return self._get_model().objects.filter(
+            **{f'{self.lookup}__in': list(pending)}
+        ).update(**{self.field: F(self.field) + increment})
+
+    async def flush(self) -> int:
+        """Yig'ilgan hisoblarni bazaga yozish"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, defaultdict(int)
+            try:
+                return await sync_to_async(self._write)(pending)
+            except Exception as e:
+                # Yo'qotmaslik uchun buferga qaytaramiz - keyingi flushda yoziladi
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+                logger.error(f"Hisoblagichlarni yozishda xato ({self.model_path}.{self.field}): {e}")
+                return 0
+
+
+class EventBuffer:
+    """Voqealar buferi - yig'ilganlari bitta bulk_create bilan yoziladi"""
+
+    def __init__(self, model_path: str, max_pending: int):
+        self.model_path = model_path
+        # Baza uzoq ishlamasa xotira cheksiz o'smasligi uchun - eng eskilari tashlanadi
+        self.max_pending = max_pending
+        self._pending: List[dict] = []
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, **fields):
+        self._pending.append(fields)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _get_model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_path)
+
+    def _write(self, pending: List[dict]) -> int:
+        model = self._get_model()
+        return len(model.objects.bulk_create([model(**fields) for fields in pending], batch_size=1000))
+
+    async def flush(self) -> int:
+        """Yig'ilgan voqealarni bazaga yozish"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, []
+            try:
+                return await sync_to_async(self._write)(pending)
+            except Exception as e:
+                self._pending = (pending + self._pending)[-self.max_pending:]
+                logger.error(f"Voqealarni yozishda xato ({self.model_path}): {e}")
+                return 0
+
+
+movie_views = CounterBuffer('movies.Movie', 'id', 'views')
+user_movies = CounterBuffer('users.User', 'user_id', 'movies_watched')
+view_events = EventBuffer('movies.MovieView', max_pending=VIEW_EVENTS_MAX_PENDING)
+
+_flush_event = asyncio.Event()
+
+
+def record_movie_view(movie_id: int, user_id: Optional[int] = None, source: str = 'code'):
+    """
+    Kino ko'rilishini qayd etish.
+
+    user_id berilsa - userning ko'rganlari ham oshadi; source - MovieView.SOURCE_*.
+    """
+    movie_views.add(movie_id)
+    if user_id:
+        user_movies.add(user_id)
+    view_events.add(movie_id=movie_id, user_id=user_id, source=source, created_at=timezone.now())
+
+    if len(movie_views) + len(user_movies) + len(view_events) >= COUNTER_FLUSH_THRESHOLD:
+        _flush_event.set()
+
+
+async def flush_counters():
+    """Barcha buferlarni yozish"""
+    await movie_views.flush()
+    await user_movies.flush()
+    await view_events.flush()
+
+
+async def start_counter_flusher():
+    """Buferlarni davriy yozish (yoki bufer to'lganda darhol)"""
+    logger.info("Hisoblagich buferi ishga tushdi")
+    while True:
+        try:
+            await asyncio.wait_for(_flush_event.wait(), timeout=COUNTER_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _flush_event.clear()
+        await flush_counters()
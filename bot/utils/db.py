@@ -0,0 +1,26 @@
+"""
+Bot jarayonida DB ulanishlarini boshqarish.
+
+Django eskirgan ulanishlarni faqat HTTP so'rov boshida/oxirida yopadi. Botda
+so'rov sikli yo'q, shuning uchun CONN_MAX_AGE va health check larga rioya qilish
+uchun close_old_connections davriy chaqiriladi (sync_to_async threadida).
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from bot.constants import DB_MAINTENANCE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+async def start_db_maintenance():
+    """Eskirgan yoki uzilgan ulanishlarni davriy yopish"""
+    while True:
+        await asyncio.sleep(DB_MAINTENANCE_INTERVAL)
+        try:
+            await sync_to_async(close_old_connections)()
+        except Exception as e:
+            logger.error(f"DB ulanishlarini tekshirishda xato: {e}")
@@ -0,0 +1,133 @@
+"""
+Muddatlar scheduleri (heap) - premium tugashi va eslatma.
+
+Soatlik so'rov o'rniga har bir muddat o'z vaqtida ishga tushadi. Heap ga faqat
+DEADLINE_HORIZON ichidagi muddatlar yuklanadi (ishga tushishda va har
+DEADLINE_REFRESH_INTERVAL da), to'lov tasdiqlanganda esa darhol qo'shiladi.
+
+Handlerlar har doim bazadagi holatni qayta tekshiradi - eskirgan muddat (masalan,
+premium Django admindan uzaytirilgan) hech narsa qilmaydi.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KIND_PREMIUM_EXPIRY = 'premium_expiry'
+KIND_PREMIUM_REMINDER = 'premium_reminder'
+
+DeadlineHandler = Callable[[List[Hashable]], Awaitable]
+
+
+class DeadlineScheduler:
+    """Eng yaqin muddatgacha uxlaydigan heap; bir vaqtda tushgan kalitlar bitta batch bo'lib beriladi"""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, str, Hashable]] = []
+        # (kind, key) -> joriy muddat; heapdagi boshqa yozuvlar eskirgan deb tashlanadi
+        self._deadlines: Dict[Tuple[str, Hashable], datetime] = {}
+        self._handlers: Dict[str, DeadlineHandler] = {}
+        self._counter = itertools.count()
+        # schedule() sync_to_async threadlaridan ham chaqiriladi
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: DeadlineHandler):
+        self._handlers[kind] = handler
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, kind: str, key: Hashable, when: datetime):
+        """Muddat qo'shish yoki yangilash (istalgan threaddan)"""
+        with self._lock:
+            if self._deadlines.get((kind, key)) == when:
+                return
+            self._deadlines[(kind, key)] = when
+            heapq.heappush(self._heap, (when, next(self._counter), kind, key))
+            earliest = self._heap[0][0] == when
+        if earliest:
+            self._wake()
+
+    def cancel(self, kind: str, key: Hashable):
+        with self._lock:
+            self._deadlines.pop((kind, key), None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        while self._heap:
+            when, _, kind, key = self._heap[0]
+            if self._deadlines.get((kind, key)) == when:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now: datetime = None) -> Dict[str, List[Hashable]]:
+        """Vaqti kelgan kalitlar: {kind: [key, ...]}"""
+        now = now or timezone.now()
+        due = defaultdict(list)
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, kind, key = heapq.heappop(self._heap)
+                if self._deadlines.get((kind, key)) == when:
+                    del self._deadlines[(kind, key)]
+                    due[kind].append(key)
+        return due
+
+    def _wake(self):
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        else:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def fire_due(self):
+        """Vaqti kelgan muddatlar handlerlarini chaqirish"""
+        for kind, keys in self.pop_due().items():
+            handler = self._handlers.get(kind)
+            if handler is None:
+                logger.warning(f"Muddat handleri yo'q: {kind}")
+                continue
+            try:
+                await handler(keys)
+            except Exception as e:
+                logger.error(f"Muddat handleri xatosi ({kind}, {len(keys)} ta): {e}")
+
+    async def run(self, max_sleep: float = 3600):
+        """Eng yaqin muddatgacha uxlash (yangi erta muddat qo'shilsa uyg'onadi)"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+        while True:
+            await self.fire_due()
+
+            next_at = self.next_deadline()
+            timeout = max_sleep
+            if next_at is not None:
+                timeout = min(max_sleep, max(0.0, (next_at - timezone.now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+deadlines = DeadlineScheduler()
@@ -0,0 +1,153 @@
+"""
+Cache invalidatsiya xabarlarini qabul qilish (bot jarayoni).
+
+Xabarlar apps/core/invalidation.py dan keladi: Redis pub/sub yoki
+CacheInvalidation jadvali orqali (har INVALIDATION_POLL_INTERVAL sekundda).
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.invalidation import (
+    decode, get_channel_name, use_redis,
+    KIND_USER, KIND_ADMIN, KIND_SETTINGS, KIND_CHANNELS, KIND_MOVIE, KIND_MOVIE_DELETED,
+    KIND_TEMPLATE,
+)
+from bot.constants import INVALIDATION_POLL_INTERVAL, INVALIDATION_RETENTION
+
+logger = logging.getLogger(__name__)
+
+KNOWN_KINDS = {
+    KIND_USER, KIND_ADMIN, KIND_SETTINGS, KIND_CHANNELS, KIND_MOVIE, KIND_MOVIE_DELETED, KIND_TEMPLATE,
+}
+
+
+def evict_bot_caches(kind: str, key: str = ''):
+    """
+    get_cache() bilan yaratilgan cache lardan tegishli kalitlarni o'chirish.
+
+    memory backend: har bir bot jarayoni o'zi chaqiradi (TTLCache - bloklanmaydi).
+    redis backend: cache umumiy - xabar yuboruvchi bir marta chaqiradi (sync kontekstda).
+    """
+    from bot.middlewares.database import clear_user_cache, clear_admin_cache, clear_settings_cache
+    from bot.middlewares.subscription import clear_channels_cache, clear_subscription_cache
+
+    if kind == KIND_USER:
+        clear_user_cache(int(key) if key else None)
+    elif kind == KIND_ADMIN:
+        clear_admin_cache(int(key) if key else None)
+    elif kind == KIND_SETTINGS:
+        clear_settings_cache()
+    elif kind == KIND_CHANNELS:
+        clear_channels_cache()
+        # Kanallar ro'yxati o'zgardi - obuna natijalari ham eskirgan
+        clear_subscription_cache()
+
+
+async def invalidate_local(kind: str, key: str = ''):
+    """Shu jarayon cache idan tegishli kalitlarni o'chirish"""
+    if kind not in KNOWN_KINDS:
+        logger.warning(f"Noma'lum invalidatsiya turi: {kind}")
+        return
+
+    if not use_redis():
+        evict_bot_caches(kind, key)
+
+    if kind == KIND_SETTINGS:
+        # Django cache (locmem yoki redis) - event loop dan tashqarida
+        from django.core.cache import cache
+        await sync_to_async(cache.delete)('bot_settings')
+    elif kind in (KIND_MOVIE, KIND_MOVIE_DELETED):
+        from bot.utils.catalog import catalog
+        catalog.invalidate(key, deleted=kind == KIND_MOVIE_DELETED)
+    elif kind == KIND_TEMPLATE:
+        from apps.core.models import MessageTemplate
+        MessageTemplate.clear_cache()
+
+
+async def _listen_redis():
+    """Redis pub/sub orqali tinglash"""
+    import redis.asyncio as aioredis
+
+    client = aioredis.Redis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(get_channel_name())
+        async for message in pubsub.listen():
+            if message.get('type') != 'message':
+                continue
+            try:
+                await invalidate_local(*decode(message['data']))
+            except Exception as e:
+                logger.error(f"Invalidatsiya xabarini qayta ishlashda xato: {e}")
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+@sync_to_async
+def get_last_invalidation_id() -> int:
+    from apps.core.models import CacheInvalidation
+    last = CacheInvalidation.objects.order_by('-id').values_list('id', flat=True).first()
+    return last or 0
+
+
+@sync_to_async
+def get_invalidations_after(last_id: int, limit: int = 1000) -> list:
+    from apps.core.models import CacheInvalidation
+    return list(
+        CacheInvalidation.objects.filter(id__gt=last_id)
+        .order_by('id')
+        .values_list('id', 'kind', 'key')[:limit]
+    )
+
+
+@sync_to_async
+def prune_invalidations() -> int:
+    """Eski jurnal yozuvlarini o'chirish"""
+    from apps.core.models import CacheInvalidation
+    cutoff = timezone.now() - timedelta(seconds=INVALIDATION_RETENTION)
+    deleted, _ = CacheInvalidation.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+async def poll_invalidations(last_id: int) -> int:
+    """Yangi jurnal yozuvlarini qo'llash, oxirgi ID ni qaytaradi"""
+    for entry_id, kind, key in await get_invalidations_after(last_id):
+        await invalidate_local(kind, key)
+        last_id = entry_id
+    return last_id
+
+
+async def _listen_db():
+    """CacheInvalidation jadvalini so'rab turish"""
+    last_id = await get_last_invalidation_id()
+    prune_every = max(1, INVALIDATION_RETENTION // INVALIDATION_POLL_INTERVAL // 10)
+    polls = 0
+
+    while True:
+        await asyncio.sleep(INVALIDATION_POLL_INTERVAL)
+        last_id = await poll_invalidations(last_id)
+
+        polls += 1
+        if polls % prune_every == 0:
+            await prune_invalidations()
+
+
+async def start_invalidation_listener():
+    """Invalidatsiya tinglovchisi (xato bo'lsa qayta ulanadi)"""
+    listen = _listen_redis if use_redis() else _listen_db
+    logger.info(f"Cache invalidatsiya tinglovchisi ishga tushdi ({'redis' if use_redis() else 'db'})")
+
+    while True:
+        try:
+            await listen()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Invalidatsiya tinglovchisida xato: {e}")
+            await asyncio.sleep(5)
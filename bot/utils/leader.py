@@ -0,0 +1,171 @@
+"""
+Background job lar uchun yetakchi (leader) tanlash.
+
+Bir nechta bot replikasi ishlaganda scheduler, statistika rollup va broadcast
+rejalashtiruvchisi faqat bitta jarayonda ishlashi kerak - aks holda eslatmalar ikki
+marta yuboriladi va premium o'chirishda poyga bo'ladi.
+
+Lease LEADER_LEASE_TTL sekundga olinadi va har TTL/3 sekundda yangilanadi:
+- redis: SET key holder NX PX ttl, yangilash/bo'shatish - faqat egasi bo'lsa (Lua)
+- db: LeaderLease jadvali - shartli UPDATE (egasi men yoki muddati o'tgan)
+
+Yangilab bo'lmasa (xato yoki boshqa egasi) job lar darhol to'xtatiladi; lease TTL
+o'tgach boshqa replika oladi. Jarayon to'xtaganda lease bo'shatiladi - failover tez.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bot.constants import LEADER_LEASE_TTL
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable]
+
+# Faqat egasi bo'lsa muddatni uzaytirish / o'chirish
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def process_token() -> str:
+    """Shu jarayonni aniqlovchi noyob qiymat (lease / lock egasi)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class RedisLease:
+    """Redis SET NX PX lease"""
+
+    def __init__(self, name: str, holder: str, ttl: float, client=None):
+        self.key = f"{settings.BOT_CACHE_PREFIX}:leader:{name}"
+        self.holder = holder
+        self.ttl_ms = max(1, int(ttl * 1000))
+        self._client = client
+
+    @property
+    def client(self):
+        from bot.utils.cache import get_redis_client
+        return self._client or get_redis_client()
+
+    def acquire(self) -> bool:
+        """Olish yoki (egasi bo'lsa) uzaytirish"""
+        if self.client.set(self.key, self.holder, nx=True, px=self.ttl_ms):
+            return True
+        return bool(self.client.eval(_RENEW_SCRIPT, 1, self.key, self.holder, self.ttl_ms))
+
+    def release(self):
+        self.client.eval(_RELEASE_SCRIPT, 1, self.key, self.holder)
+
+
+class DatabaseLease:
+    """LeaderLease jadvalidagi qator - shartli UPDATE bilan olinadi"""
+
+    def __init__(self, name: str, holder: str, ttl: float):
+        self.name = name
+        self.holder = holder
+        self.ttl = ttl
+
+    def acquire(self) -> bool:
+        from apps.core.models import LeaderLease
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.ttl)
+        updated = LeaderLease.objects.filter(
+            Q(holder=self.holder) | Q(expires_at__lt=now), name=self.name
+        ).update(holder=self.holder, expires_at=expires_at)
+        if updated:
+            return True
+
+        # Qator hali yo'q - birinchi bo'lib yaratgan yetakchi bo'ladi
+        try:
+            with transaction.atomic():
+                LeaderLease.objects.create(name=self.name, holder=self.holder, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            return False
+
+    def release(self):
+        from apps.core.models import LeaderLease
+        LeaderLease.objects.filter(name=self.name, holder=self.holder).delete()
+
+
+class LeaderElection:
+    """Lease egasi bo'lganda job larni ishga tushiradi, yo'qotganda to'xtatadi"""
+
+    def __init__(self, name: str = 'jobs', ttl: float = LEADER_LEASE_TTL, backend: Optional[str] = None, lease=None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = process_token()
+        if lease is None:
+            backend = backend or settings.BOT_STORAGE
+            lease = RedisLease(name, self.holder, ttl) if backend == 'redis' else DatabaseLease(name, self.holder, ttl)
+        self.lease = lease
+        self.is_leader = False
+        self._tasks: List[asyncio.Task] = []
+
+    async def _acquire(self) -> bool:
+        try:
+            return await sync_to_async(self.lease.acquire)()
+        except Exception as e:
+            # Yangilanganini bilmasak - yetakchi emasmiz deb hisoblaymiz
+            logger.error(f"Yetakchi lease ni yangilashda xato ({self.name}): {e}")
+            return False
+
+    async def _stop_jobs(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def step(self, jobs: List[Job]) -> bool:
+        """Bitta yangilash: lease holatiga qarab job larni boshlash/to'xtatish"""
+        leader = await self._acquire()
+        if leader and not self._tasks:
+            logger.info(f"Yetakchi bo'ldik ({self.name}, {self.holder}) - job lar ishga tushdi")
+            self._tasks = [asyncio.create_task(job()) for job in jobs]
+        elif not leader and self._tasks:
+            logger.warning(f"Yetakchilik yo'qotildi ({self.name}) - job lar to'xtatildi")
+            await self._stop_jobs()
+        self.is_leader = leader
+        return leader
+
+    async def run(self, jobs: List[Job]):
+        """Lease ni ushlab turish (background task)"""
+        try:
+            while True:
+                await self.step(jobs)
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            await self._stop_jobs()
+
+    async def release(self):
+        """To'xtashda - boshqa replika TTL kutmasdan oladi"""
+        await self._stop_jobs()
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                await sync_to_async(self.lease.release)()
+            except Exception as e:
+                logger.error(f"Yetakchi lease ni bo'shatishda xato ({self.name}): {e}")
+
+
+leader = LeaderElection()
@@ -0,0 +1,180 @@
+"""
+Kanal a'zoligini tekshirish.
+
+A'zolik avval ChannelMember indeksidan o'qiladi (chat_member updatelari orqali
+yangilanib turadi), faqat noma'lum yoki eskirgan yozuvlar uchun get_chat_member chaqiriladi.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from bot.constants import (
+    SUBSCRIPTION_CHECK_TIMEOUT, SUBSCRIPTION_CHECK_CONCURRENCY, CACHE_TTL_MEMBERSHIP
+)
+
+logger = logging.getLogger(__name__)
+
+# A'zo emas deb hisoblanadigan statuslar
+NOT_MEMBER_STATUSES = {'left', 'kicked'}
+
+
+async def fetch_member_statuses(
+    bot: Bot,
+    user_id: int,
+    channels: List,
+    timeout: float = SUBSCRIPTION_CHECK_TIMEOUT,
+    concurrency: int = SUBSCRIPTION_CHECK_CONCURRENCY,
+) -> Tuple[Dict[int, Optional[str]], bool]:
+    """
+    get_chat_member ni barcha kanallar uchun parallel chaqirish.
+
+    Returns:
+        ({channel_id: status yoki None (API xatosi)}, to'liq natija)
+        Vaqt tugab qolgan kanallar natijaga kirmaydi.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(channel) -> Optional[str]:
+        async with semaphore:
+            try:
+                member = await bot.get_chat_member(channel.channel_id, user_id)
+                return member.status
+            except TelegramBadRequest:
+                # Bot kanalda admin emas yoki kanal topilmadi
+                return None
+            except Exception as e:
+                logger.warning(f"Obunani tekshirishda xato (channel={channel.channel_id}): {e}")
+                return None
+
+    tasks = {asyncio.create_task(fetch(channel)): channel for channel in channels}
+    if not tasks:
+        return {}, True
+
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning(
+            f"Obuna tekshiruvi vaqti tugadi: user_id={user_id}, "
+            f"kanallar={[tasks[t].channel_id for t in pending]}"
+        )
+
+    statuses = {tasks[t].channel_id: t.result() for t in done}
+    return statuses, not pending
+
+
+def _is_not_subscribed(status: Optional[str], strict: bool) -> bool:
+    if status is None:
+        return strict
+    return status in NOT_MEMBER_STATUSES
+
+
+async def check_channels_membership(
+    bot: Bot,
+    user_id: int,
+    channels: Iterable,
+    strict: bool = False,
+    timeout: float = SUBSCRIPTION_CHECK_TIMEOUT,
+    concurrency: int = SUBSCRIPTION_CHECK_CONCURRENCY,
+    use_index: bool = True,
+    recheck_negative: bool = False,
+) -> Tuple[List, bool]:
+    """
+    Obuna bo'lmagan kanallarni aniqlash.
+
+    Args:
+        bot: Bot instance
+        user_id: Telegram user ID
+        channels: Channel obyektlari
+        strict: True bo'lsa, API xatosi va vaqti tugagan kanal "obuna emas" deb hisoblanadi
+        timeout: API tekshiruvi uchun maksimal vaqt (sekund)
+        concurrency: Bir vaqtdagi so'rovlar soni
+        use_index: ChannelMember indeksidan o'qish
+        recheck_negative: Indeksda "obuna emas" bo'lgan kanallarni API orqali qayta tekshirish
+            (foydalanuvchi "Tekshirish" tugmasini bosganda)
+
+    Returns:
+        (obuna bo'lmagan kanallar, to'liq natija) - vaqt tugab qolgan kanallar
+        (strict bo'lmasa) natijaga kirmaydi va ikkinchi qiymat False bo'ladi
+    """
+    channels = [ch for ch in channels if ch.is_checkable]
+    if not channels:
+        return [], True
+
+    indexed = {}
+    if use_index:
+        indexed = await get_indexed_statuses(user_id, [ch.channel_id for ch in channels])
+        if recheck_negative:
+            indexed = {cid: st for cid, st in indexed.items() if st not in NOT_MEMBER_STATUSES}
+
+    to_fetch = [ch for ch in channels if ch.channel_id not in indexed]
+    fetched, complete = await fetch_member_statuses(bot, user_id, to_fetch, timeout, concurrency)
+
+    # API natijalarini indeksga yozish (xatolar yozilmaydi)
+    known = {cid: st for cid, st in fetched.items() if st is not None}
+    if use_index and known:
+        await save_member_statuses(user_id, known)
+
+    statuses = {**fetched, **indexed}
+
+    # Kanallar tartibini saqlash; vaqti tugaganlar xato kabi (None) - strict da obuna emas
+    not_subscribed = [
+        ch for ch in channels
+        if _is_not_subscribed(statuses.get(ch.channel_id), strict)
+    ]
+    return not_subscribed, complete
+
+
+# ==================== INDEKS ====================
+
+@sync_to_async
+def get_indexed_statuses(user_id: int, channel_ids: List[int]) -> Dict[int, str]:
+    """Indeksdan yangi (eskirmagan) yozuvlarni olish"""
+    from apps.channels.models import ChannelMember
+
+    fresh_after = timezone.now() - timedelta(seconds=CACHE_TTL_MEMBERSHIP)
+    return dict(
+        ChannelMember.objects.filter(
+            user_id=user_id,
+            channel_id__in=channel_ids,
+            updated_at__gte=fresh_after,
+        ).values_list('channel_id', 'status')
+    )
+
+
+@sync_to_async
+def save_member_statuses(user_id: int, statuses: Dict[int, str]):
+    """Bitta user uchun bir nechta kanal holatini yozish (upsert)"""
+    from apps.channels.models import ChannelMember
+
+    now = timezone.now()
+    ChannelMember.objects.bulk_create(
+        [
+            ChannelMember(channel_id=channel_id, user_id=user_id, status=status, updated_at=now)
+            for channel_id, status in statuses.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user_id', 'channel_id'],
+        update_fields=['status', 'updated_at'],
+    )
+
+
+async def save_member_status(channel_id: int, user_id: int, status: str):
+    """chat_member updatesidan kelgan holatni yozish"""
+    await save_member_statuses(user_id, {channel_id: status})
+
+
+@sync_to_async
+def clear_channel_index(channel_id: int) -> int:
+    """Kanal indeksini o'chirish (bot admin bo'lmay qolganda updatelar kelmaydi)"""
+    from apps.channels.models import ChannelMember
+
+    deleted, _ = ChannelMember.objects.filter(channel_id=channel_id).delete()
+    return deleted
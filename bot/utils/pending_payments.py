@@ -0,0 +1,112 @@
+"""
+To'lov sessiyalari (tarif tanlangan, chek kutilmoqda).
+
+Sessiya Telegram user_id bo'yicha cache da turadi - kelgan har bir rasm uchun
+bitta O(1) lookup. Cache da bo'lmasa (memory backendda boshqa replika saqlagan yoki
+TTLCache dan siqib chiqarilgan) PendingPaymentSession dan bitta indeksli so'rov
+bilan olinadi va cache qayta to'ldiriladi. Ishga tushganda ham cache bazadan
+to'ldiriladi (redis backendda cache o'zi saqlanib qoladi).
+
+Muddati o'tgan qatorlarni scheduler davriy ravishda o'chiradi.
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from apps.payments.models import PendingPaymentSession
+from apps.users.models import User
+from bot.constants import PENDING_PAYMENT_TIMEOUT, CACHE_MAX_PENDING_PAYMENTS
+from bot.utils.cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+_sessions = get_cache('pending_payment', ttl=PENDING_PAYMENT_TIMEOUT, maxsize=CACHE_MAX_PENDING_PAYMENTS)
+
+
+def _entry(tariff_id: int, amount: int, with_discount: bool, expires_at) -> dict:
+    return {
+        'tariff_id': tariff_id,
+        'amount': amount,
+        'with_discount': with_discount,
+        'expires_at': expires_at,
+    }
+
+
+@sync_to_async
+def save_pending_payment(user_id: int, tariff_id: int, amount: int, with_discount: bool) -> bool:
+    """Sessiyani saqlash (eski sessiya almashtiriladi)"""
+    user_pk = User.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+    if user_pk is None:
+        logger.warning(f"Pending payment saqlashda user topilmadi: {user_id}")
+        return False
+
+    expires_at = timezone.now() + timedelta(seconds=PENDING_PAYMENT_TIMEOUT)
+    with transaction.atomic():
+        PendingPaymentSession.objects.filter(user_id=user_pk).delete()
+        PendingPaymentSession.objects.create(
+            user_id=user_pk,
+            tariff_id=tariff_id,
+            amount=amount,
+            is_discounted=with_discount,
+            message_id=0,
+            expires_at=expires_at
+        )
+    _sessions.set(user_id, _entry(tariff_id, amount, with_discount, expires_at))
+    return True
+
+
+@sync_to_async
+def _load_session(user_id: int) -> Optional[dict]:
+    row = PendingPaymentSession.objects.filter(
+        user__user_id=user_id, expires_at__gt=timezone.now()
+    ).values_list('tariff_id', 'amount', 'is_discounted', 'expires_at').first()
+    return _entry(*row) if row else None
+
+
+async def get_pending_payment(user_id: int) -> Optional[dict]:
+    """Faol sessiya (cache, bo'lmasa bazadan)"""
+    entry = await _sessions.aget(user_id)
+    if entry is None:
+        entry = await _load_session(user_id)
+        if entry is None:
+            return None
+        await _sessions.aset(user_id, entry)
+
+    if entry['expires_at'] > timezone.now():
+        return entry
+    return None
+
+
+@sync_to_async
+def _delete_session_rows(user_id: int):
+    PendingPaymentSession.objects.filter(user__user_id=user_id).delete()
+
+
+async def delete_pending_payment(user_id: int):
+    """Sessiyani yopish (chek qabul qilingach)"""
+    await _sessions.adelete(user_id)
+    await _delete_session_rows(user_id)
+
+
+@sync_to_async
+def load_pending_payments() -> int:
+    """Bazadagi faol sessiyalarni cache ga yuklash (ishga tushishda)"""
+    rows = PendingPaymentSession.objects.filter(expires_at__gt=timezone.now()).values_list(
+        'user__user_id', 'tariff_id', 'amount', 'is_discounted', 'expires_at'
+    )
+    loaded = 0
+    for user_id, tariff_id, amount, with_discount, expires_at in rows:
+        # Cache dagi yangiroq sessiyani bosib ketmaslik
+        if _sessions.add(user_id, _entry(tariff_id, amount, with_discount, expires_at)):
+            loaded += 1
+    return loaded
+
+
+@sync_to_async
+def cleanup_expired_sessions() -> int:
+    """Muddati o'tgan sessiya qatorlarini o'chirish (davriy)"""
+    return PendingPaymentSession.cleanup_expired()
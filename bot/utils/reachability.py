@@ -0,0 +1,84 @@
+"""
+Xabar yetkazib bo'lmaydigan foydalanuvchilar.
+
+Botni bloklagan yoki akkaunti o'chirilgan userga yuborish har doim xato beradi -
+bunday userlar belgilanadi (User.unreachable_reason / unreachable_at) va broadcast,
+premium eslatmalardan chiqarib tashlanadi. User botga yana yozsa belgi tozalanadi
+(DatabaseMiddleware).
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Telegram xato matni -> sabab
+_FORBIDDEN_REASONS = (
+    ('bot was blocked', User.UNREACHABLE_BLOCKED),
+    ('user is deactivated', User.UNREACHABLE_DEACTIVATED),
+    ("bot can't initiate conversation", User.UNREACHABLE_BLOCKED),
+)
+_BAD_REQUEST_REASONS = (
+    ('chat not found', User.UNREACHABLE_NOT_FOUND),
+)
+
+
+def get_unreachable_reason(error: Exception) -> Optional[str]:
+    """Xato userga umuman yetkazib bo'lmasligini bildirsa - sabab, aks holda None"""
+    if isinstance(error, TelegramForbiddenError):
+        reasons = _FORBIDDEN_REASONS
+    elif isinstance(error, TelegramBadRequest):
+        reasons = _BAD_REQUEST_REASONS
+    else:
+        return None
+
+    message = str(error).lower()
+    for pattern, reason in reasons:
+        if pattern in message:
+            return reason
+    return None
+
+
+@sync_to_async
+def _mark_unreachable_db(reasons: Dict[int, str]) -> int:
+    by_reason = defaultdict(list)
+    for user_id, reason in reasons.items():
+        by_reason[reason].append(user_id)
+
+    now = timezone.now()
+    updated = 0
+    for reason, user_ids in by_reason.items():
+        updated += User.objects.filter(user_id__in=user_ids).update(
+            unreachable_reason=reason,
+            unreachable_at=now,
+        )
+    return updated
+
+
+async def mark_unreachable(reasons: Dict[int, str]) -> int:
+    """{user_id: sabab} - userlarni yetkazib bo'lmaydigan deb belgilash"""
+    if not reasons:
+        return 0
+
+    from bot.middlewares.database import aclear_user_cache
+
+    updated = await _mark_unreachable_db(reasons)
+    for user_id in reasons:
+        await aclear_user_cache(user_id)
+    logger.info(f"Yetkazib bo'lmaydigan userlar belgilandi: {updated} ta")
+    return updated
+
+
+@sync_to_async
+def clear_unreachable(user_id: int) -> bool:
+    """User botga yozdi - belgini olib tashlash"""
+    return User.objects.filter(user_id=user_id, unreachable_at__isnull=False).update(
+        unreachable_reason='',
+        unreachable_at=None,
+    ) > 0
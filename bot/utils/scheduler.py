@@ -1,166 +1,322 @@
 """
 Premium obuna tugashi haqida eslatma yuborish uchun scheduler
+
+Har bir premium tugashi va eslatma muddati o'z vaqtida ishga tushadi
+(bot/utils/deadlines.py) - soatlik so'rov yo'q. Tugagan obunalar bitta UPDATE ... RETURNING
+bilan o'chiriladi, xabarlar esa broadcast rate limiteri (BroadcastSender) orqali parallel
+yuboriladi. "Tugashiga oz qoldi" eslatmasi har bir obuna muddati uchun bir marta yuboriladi
+(PremiumReminder jurnali). Muddati o'tgan to'lov sessiyalari har yangilashda tozalanadi.
 """
 import asyncio
 import logging
-from datetime import timedelta
-from typing import Optional
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 from aiogram import Bot
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from asgiref.sync import sync_to_async
 from django.utils import timezone
 
+from bot.constants import (
+    PREMIUM_INVALIDATE_EACH_LIMIT, PREMIUM_REMINDER_BEFORE, DEADLINE_HORIZON, DEADLINE_REFRESH_INTERVAL,
+)
+from bot.utils.deadlines import deadlines, KIND_PREMIUM_EXPIRY, KIND_PREMIUM_REMINDER
+from bot.utils.pending_payments import cleanup_expired_sessions
+
 logger = logging.getLogger(__name__)
 
 
 @sync_to_async
-def get_expiring_premium_users(days: int = 1):
-    """Premium obunasi tugayotgan userlarni olish"""
-    from apps.users.models import User
+def get_expiring_premium_users(days: int = 1, user_ids: Optional[List[int]] = None) -> List[Tuple[int, int, datetime]]:
+    """
+    Premium obunasi tugayotgan va shu muddat uchun eslatma olmagan userlar.
+
+    [(pk, user_id, premium_expires)] qaytaradi - to'liq model obyektlari kerak emas.
+    user_ids berilsa - faqat shu userlar (muddat scheduleridan).
+    """
+    from django.db.models import Exists, OuterRef
+    from apps.users.models import User, PremiumReminder
 
     now = timezone.now()
     target_date = now + timedelta(days=days)
 
-    # 1 kun ichida tugaydigan premium userlar
+    # Shu premium_expires uchun eslatma yuborilganlar qayta olinmaydi (soatlik tekshiruvda takrorlanmaydi)
+    reminded = PremiumReminder.objects.filter(
+        user=OuterRef('pk'),
+        expires_at=OuterRef('premium_expires'),
+        kind=PremiumReminder.KIND_EXPIRING,
+    )
+
     users = User.objects.filter(
         is_premium=True,
         premium_expires__gte=now,
         premium_expires__lte=target_date,
-        is_banned=False
-    ).exclude(
-        # Allaqachon eslatma yuborilganlarni o'tkazib yuborish (keyinchalik qo'shiladi)
+        is_banned=False,
+        unreachable_at__isnull=True
     )
+    if user_ids is not None:
+        users = users.filter(user_id__in=user_ids)
 
-    return list(users)
+    return list(users.exclude(Exists(reminded)).values_list('pk', 'user_id', 'premium_expires'))
 
 
 @sync_to_async
-def get_expired_premium_users():
-    """Premium obunasi tugagan userlarni olish"""
+def record_reminders(users: List[Tuple[int, int, datetime]]) -> int:
+    """Eslatmalarni jurnalga yozish (yuborishdan oldin - xato bo'lsa ham qayta yuborilmaydi)"""
+    from apps.users.models import PremiumReminder
+
+    return len(PremiumReminder.objects.bulk_create(
+        [
+            PremiumReminder(user_id=pk, expires_at=expires, kind=PremiumReminder.KIND_EXPIRING)
+            for pk, _, expires in users
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    ))
+
+
+@sync_to_async
+def prune_reminders() -> int:
+    """Muddati o'tgan obunalar eslatmalari endi kerak emas"""
+    from apps.users.models import PremiumReminder
+
+    deleted, _ = PremiumReminder.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
+
+
+def _supports_update_returning() -> bool:
+    from django.db import connection
+
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _deactivate_returning(now, user_ids: Optional[List[int]] = None) -> List[Tuple[int, bool]]:
+    """UPDATE ... RETURNING - bitta so'rov bilan o'chirish va userlarni olish"""
+    from django.db import connection
     from apps.users.models import User
 
-    now = timezone.now()
+    quote = connection.ops.quote_name
 
-    # Tugagan lekin hali premium=True bo'lganlar
-    users = User.objects.filter(
-        is_premium=True,
-        premium_expires__lt=now
-    )
+    def column(name: str) -> str:
+        return quote(User._meta.get_field(name).column)
+
+    where = f"{column('is_premium')} = %s AND {column('premium_expires')} < %s"
+    params = [False, True, connection.ops.adapt_datetimefield_value(now)]
+    if user_ids is not None:
+        where += f" AND {column('user_id')} IN ({', '.join(['%s'] * len(user_ids))})"
+        params += list(user_ids)
 
-    return list(users)
+    sql = (
+        f"UPDATE {quote(User._meta.db_table)} SET {column('is_premium')} = %s "
+        f"WHERE {where} RETURNING {column('user_id')}, {column('unreachable_at')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # "IS NULL" ni RETURNING ichida emas, shu yerda tekshiramiz (ba'zi SQLite versiyalarida xato)
+        return [(user_id, unreachable_at is None) for user_id, unreachable_at in cursor.fetchall()]
 
 
 @sync_to_async
-def deactivate_expired_premium(user_id: int):
-    """Tugagan premium obunani deaktiv qilish"""
+def deactivate_expired_premium(user_ids: Optional[List[int]] = None) -> List[Tuple[int, bool]]:
+    """
+    Tugagan premium obunalarni bitta set-based UPDATE bilan o'chirish.
+
+    [(user_id, xabar yuborish mumkinmi)] qaytaradi - yetkazib bo'lmaydiganlar ham
+    o'chiriladi, faqat ularga xabar yuborilmaydi. user_ids berilsa - faqat shu userlar.
+    """
+    from django.db import transaction
+    from apps.core.invalidation import publish, KIND_USER
     from apps.users.models import User
 
-    try:
-        user = User.objects.get(user_id=user_id)
-        user.is_premium = False
-        user.save(update_fields=['is_premium'])
-        return True
-    except User.DoesNotExist:
-        return False
+    if user_ids is not None and not user_ids:
+        return []
+
+    now = timezone.now()
+    if _supports_update_returning():
+        rows = _deactivate_returning(now, user_ids)
+    else:
+        with transaction.atomic():
+            expired = User.objects.select_for_update().filter(is_premium=True, premium_expires__lt=now)
+            if user_ids is not None:
+                expired = expired.filter(user_id__in=user_ids)
+            rows = [
+                (user_id, unreachable_at is None)
+                for user_id, unreachable_at in expired.values_list('user_id', 'unreachable_at')
+            ]
+            User.objects.filter(user_id__in=[user_id for user_id, _ in rows]).update(is_premium=False)
+
+    # UPDATE signal yubormaydi - bot jarayonlaridagi user cache ni o'zimiz tozalaymiz
+    if len(rows) > PREMIUM_INVALIDATE_EACH_LIMIT:
+        publish(KIND_USER)
+    else:
+        for user_id, _ in rows:
+            publish(KIND_USER, user_id)
+    return rows
+
+
+def expiry_reminder_text(days_left: int) -> str:
+    """Premium tugashi haqida eslatma matni"""
+    if days_left == 1:
+        return (
+            "⚠️ <b>Premium obunangiz tugamoqda!</b>\n\n"
+            "Sizning Premium obunangiz <b>1 kun</b> ichida tugaydi.\n\n"
+            "💎 Uzaytirish uchun /premium buyrug'ini yuboring yoki "
+            "quyidagi tugmani bosing."
+        )
+    if days_left == 0:
+        return (
+            "⚠️ <b>Premium obunangiz bugun tugaydi!</b>\n\n"
+            "💎 Uzaytirish uchun /premium buyrug'ini yuboring."
+        )
+    return (
+        f"⚠️ <b>Premium obunangiz {days_left} kun ichida tugaydi!</b>\n\n"
+        "💎 Uzaytirish uchun /premium buyrug'ini yuboring."
+    )
 
 
-async def send_premium_expiry_notification(bot: Bot, user_id: int, days_left: int):
-    """Premium tugashi haqida xabar yuborish"""
-    try:
-        if days_left == 1:
-            text = (
-                "⚠️ <b>Premium obunangiz tugamoqda!</b>\n\n"
-                "Sizning Premium obunangiz <b>1 kun</b> ichida tugaydi.\n\n"
-                "💎 Uzaytirish uchun /premium buyrug'ini yuboring yoki "
-                "quyidagi tugmani bosing."
-            )
-        elif days_left == 0:
-            text = (
-                "⚠️ <b>Premium obunangiz bugun tugaydi!</b>\n\n"
-                "💎 Uzaytirish uchun /premium buyrug'ini yuboring."
-            )
-        else:
-            text = (
-                f"⚠️ <b>Premium obunangiz {days_left} kun ichida tugaydi!</b>\n\n"
-                "💎 Uzaytirish uchun /premium buyrug'ini yuboring."
-            )
-
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="💎 Premium uzaytirish", callback_data="premium")]
-        ])
-
-        await bot.send_message(user_id, text, reply_markup=kb)
-        logger.info(f"Premium eslatma yuborildi: user_id={user_id}, days_left={days_left}")
-        return True
+EXPIRED_TEXT = (
+    "❌ <b>Premium obunangiz tugadi!</b>\n\n"
+    "Endi Premium kinolarni ko'ra olmaysiz.\n\n"
+    "💎 Qayta sotib olish uchun /premium buyrug'ini yuboring."
+)
 
-    except Exception as e:
-        logger.error(f"Premium eslatma yuborishda xato: user_id={user_id}, error={e}")
-        return False
 
+async def send_notifications(bot: Bot, user_ids: List[int], text: str, button_text: str) -> Tuple[int, int]:
+    """
+    Bir xil xabarni ko'p userga yuborish - broadcast rate limiteri va worker pool orqali.
 
-async def send_premium_expired_notification(bot: Bot, user_id: int):
-    """Premium tugaganligi haqida xabar yuborish"""
-    try:
-        text = (
-            "❌ <b>Premium obunangiz tugadi!</b>\n\n"
-            "Endi Premium kinolarni ko'ra olmaysiz.\n\n"
-            "💎 Qayta sotib olish uchun /premium buyrug'ini yuboring."
+    Yetkazib bo'lmaydigan userlar belgilanadi. (sent, failed) qaytaradi.
+    """
+    from bot.utils.broadcast import BroadcastSender
+
+    if not user_ids:
+        return 0, 0
+
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=button_text, callback_data="premium")]
+    ])
+    sender = BroadcastSender(bot, 'text', text=text, reply_markup=kb)
+    return await sender.send_batch(user_ids)
+
+
+async def remind_expiring(bot: Bot, user_ids: Optional[List[int]] = None):
+    """1 kun qolgan va hali eslatma olmagan userlar - qolgan kunlar bo'yicha guruhlab yuboriladi"""
+    expiring_users = await get_expiring_premium_users(days=1, user_ids=user_ids)
+    if not expiring_users:
+        return
+    logger.info(f"1 kun qolgan userlar (eslatma olmagan): {len(expiring_users)} ta")
+    await record_reminders(expiring_users)
+
+    now = timezone.now()
+    by_days_left = defaultdict(list)
+    for _, user_id, expires in expiring_users:
+        by_days_left[max(0, (expires - now).days)].append(user_id)
+
+    for days_left, ids in by_days_left.items():
+        sent, failed = await send_notifications(
+            bot, ids, expiry_reminder_text(days_left), "💎 Premium uzaytirish"
         )
+        logger.info(f"Premium eslatma ({days_left} kun): {sent} yuborildi, {failed} xato")
 
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="💎 Premium sotib olish", callback_data="premium")]
-        ])
 
-        await bot.send_message(user_id, text, reply_markup=kb)
-        logger.info(f"Premium tugadi xabari yuborildi: user_id={user_id}")
-        return True
+async def expire_premium(bot: Bot, user_ids: Optional[List[int]] = None):
+    """Tugagan premiumlar - avval bitta UPDATE bilan o'chiriladi, keyin xabar yuboriladi"""
+    expired = await deactivate_expired_premium(user_ids)
+    if not expired:
+        return
+    logger.info(f"Tugagan userlar: {len(expired)} ta")
 
-    except Exception as e:
-        logger.error(f"Premium tugadi xabarini yuborishda xato: user_id={user_id}, error={e}")
-        return False
+    # Yetkazib bo'lmaydiganlarga xabar yuborilmaydi, lekin premium baribir o'chirildi
+    sent, failed = await send_notifications(
+        bot, [user_id for user_id, reachable in expired if reachable], EXPIRED_TEXT, "💎 Premium sotib olish"
+    )
+    logger.info(f"Premium tugadi xabari: {sent} yuborildi, {failed} xato")
 
 
 async def check_premium_expiry(bot: Bot):
-    """Premium obunalarni tekshirish va eslatma yuborish"""
+    """Barcha premium obunalarni tekshirish (ishga tushishda - o'tkazib yuborilganlar uchun)"""
     logger.info("Premium obunalarni tekshirish boshlandi...")
 
-    # 1 kun qolgan userlar
-    expiring_users = await get_expiring_premium_users(days=1)
-    logger.info(f"1 kun qolgan userlar: {len(expiring_users)} ta")
+    await remind_expiring(bot)
+    await expire_premium(bot)
+    await prune_reminders()
+
+    logger.info("Premium tekshirish yakunlandi")
 
-    for user in expiring_users:
-        days_left = max(0, (user.premium_expires - timezone.now()).days)
-        await send_premium_expiry_notification(bot, user.user_id, days_left)
-        await asyncio.sleep(0.1)  # Rate limit uchun
 
-    # Tugagan userlar
-    expired_users = await get_expired_premium_users()
-    logger.info(f"Tugagan userlar: {len(expired_users)} ta")
+# ==================== MUDDATLAR ====================
 
-    for user in expired_users:
-        await send_premium_expired_notification(bot, user.user_id)
-        await deactivate_expired_premium(user.user_id)
-        await asyncio.sleep(0.1)
+def schedule_premium(user_id: int, premium_expires: Optional[datetime]):
+    """Premium tugashi va eslatma muddatlarini heap ga qo'shish (istalgan threaddan)"""
+    if not premium_expires:
+        return
+    deadlines.schedule(KIND_PREMIUM_EXPIRY, user_id, premium_expires)
+    deadlines.schedule(KIND_PREMIUM_REMINDER, user_id, premium_expires - timedelta(seconds=PREMIUM_REMINDER_BEFORE))
+
+
+@sync_to_async
+def load_deadlines(horizon: float = DEADLINE_HORIZON) -> list:
+    """Yaqin premium muddatlari [(user_id, premium_expires)]"""
+    from apps.users.models import User
+
+    until = timezone.now() + timedelta(seconds=horizon)
+    # Eslatma tugashdan PREMIUM_REMINDER_BEFORE oldin - shuncha uzoqroq muddatlar ham kerak
+    return list(
+        User.objects.filter(
+            is_premium=True,
+            premium_expires__lte=until + timedelta(seconds=PREMIUM_REMINDER_BEFORE),
+        ).values_list('user_id', 'premium_expires')
+    )
 
-    logger.info("Premium tekshirish yakunlandi")
 
+async def refresh_deadlines():
+    """Bazadan yaqin muddatlarni yuklash (boshqa jarayonlardagi o'zgarishlar ham shu yerda olinadi)"""
+    premium = await load_deadlines()
+    for user_id, premium_expires in premium:
+        schedule_premium(user_id, premium_expires)
+    logger.info(f"Muddatlar yangilandi: {len(premium)} premium")
 
-async def start_scheduler(bot: Bot, check_interval: int = 3600):
+
+async def start_scheduler(bot: Bot, refresh_interval: int = DEADLINE_REFRESH_INTERVAL):
     """
     Scheduler ni ishga tushirish
 
     Args:
         bot: Bot instance
-        check_interval: Tekshirish oralig'i (sekundda), default 1 soat
+        refresh_interval: Yaqin muddatlarni bazadan qayta yuklash oralig'i (sekundda)
     """
-    logger.info(f"Premium scheduler ishga tushdi. Interval: {check_interval} sekund")
+    deadlines.register(KIND_PREMIUM_EXPIRY, lambda user_ids: expire_premium(bot, user_ids))
+    deadlines.register(KIND_PREMIUM_REMINDER, lambda user_ids: remind_expiring(bot, user_ids))
+    logger.info(f"Premium scheduler ishga tushdi. Yangilash oralig'i: {refresh_interval} sekund")
 
-    while True:
-        try:
-            await check_premium_expiry(bot)
-        except Exception as e:
-            logger.error(f"Scheduler xatosi: {e}")
+    # Bot to'xtab turgan paytda o'tib ketganlar
+    try:
+        await check_premium_expiry(bot)
+    except Exception as e:
+        logger.error(f"Scheduler xatosi: {e}")
 
-        await asyncio.sleep(check_interval)
+    # Yetakchilik yo'qolsa (task bekor qilinadi) heap ham to'xtaydi
+    runner = asyncio.create_task(deadlines.run())
+    try:
+        while True:
+            try:
+                await refresh_deadlines()
+            except Exception as e:
+                logger.error(f"Muddatlarni yuklashda xato: {e}")
+
+            # To'lov sessiyalari cache da o'zi eskiradi - bazadagi qatorlar shu yerda tozalanadi
+            try:
+                deleted = await cleanup_expired_sessions()
+                if deleted:
+                    logger.info(f"Muddati o'tgan to'lov sessiyalari o'chirildi: {deleted}")
+            except Exception as e:
+                logger.error(f"To'lov sessiyalarini tozalashda xato: {e}")
+
+            await asyncio.sleep(refresh_interval)
+    finally:
+        runner.cancel()
@@ -0,0 +1,34 @@
+"""
+Admin statistikasi uchun kunlik rollup ni yangilab turish (background task).
+
+Shu task eski ko'rish voqealarini (MovieView) ham o'chirib boradi.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+
+from apps.core import rollup
+from bot.constants import STATS_ROLLUP_INTERVAL, STATS_ROLLUP_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+async def start_stats_rollup():
+    """Birinchi ishga tushishda tarixni, keyin oxirgi kunlarni davriy hisoblash"""
+    try:
+        days = await sync_to_async(rollup.backfill)()
+        if days:
+            logger.info(f"Statistika rollup to'ldirildi: {days} kun")
+    except Exception as e:
+        logger.error(f"Statistika rollup ni to'ldirishda xato: {e}")
+
+    while True:
+        try:
+            await sync_to_async(rollup.rollup_recent)(STATS_ROLLUP_DAYS)
+            pruned = await sync_to_async(rollup.prune_view_events)()
+            if pruned:
+                logger.info(f"Eski ko'rish voqealari o'chirildi: {pruned} ta")
+        except Exception as e:
+            logger.error(f"Statistika rollup xatosi: {e}")
+        await asyncio.sleep(STATS_ROLLUP_INTERVAL)
@@ -0,0 +1,141 @@
+"""
+Telegram webhook - updatelarni Django/ASGI jarayoni ichida qabul qilish.
+
+Polling o'rniga Telegram updatelarni to'g'ridan-to'g'ri shu endpointga yuboradi,
+ular mavjud `dp` ga uzatiladi. Bir nechta replika load balancer ortida ishlashi mumkin.
+"""
+import asyncio
+import contextvars
+import hmac
+import json
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed
+from django.views.decorators.csrf import csrf_exempt
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN'
+
+# Background tasklar (GC yig'ib olmasligi uchun)
+_background_tasks = set()
+_started = False
+_start_lock = asyncio.Lock()
+
+
+def check_secret(request) -> bool:
+    """Secret token tekshirish"""
+    token = request.META.get(SECRET_HEADER, '')
+    return hmac.compare_digest(token.encode(), settings.BOT_WEBHOOK_SECRET.encode())
+
+
+async def ensure_started():
+    """Dispatcher ni sozlash va startup handlerlarni bir marta ishga tushirish"""
+    global _started
+    if _started:
+        return
+
+    async with _start_lock:
+        if _started:
+            return
+
+        from bot.loader import bot
+        from bot.main import setup_dispatcher
+
+        dispatcher = setup_dispatcher()
+        await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+        _started = True
+
+
+async def shutdown():
+    """Shutdown handlerlar va tugallanmagan updatelar"""
+    global _started
+    if not _started:
+        return
+
+    from bot.loader import bot, dp
+
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+    await dp.emit_shutdown(bot=bot, dispatcher=dp)
+    _started = False
+
+
+async def process_update(data: dict):
+    """Updateni dispatcher ga uzatish"""
+    from aiogram.types import Update
+    from bot.loader import bot, dp
+
+    update = Update.model_validate(data, context={'bot': bot})
+    await dp.feed_update(bot, update)
+
+
+def dispatch_update(data: dict):
+    """
+    Updateni background task sifatida ishlash.
+
+    Telegram javobni kutib qolmasligi uchun darhol 200 qaytariladi.
+    Task bo'sh context bilan yaratiladi - aks holda so'rov tugagach
+    Django ning so'rovga bog'langan thread executori yopiladi va sync_to_async ishlamaydi.
+    """
+    task = asyncio.create_task(process_update(data), context=contextvars.Context())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+@csrf_exempt
+async def telegram_webhook(request):
+    """Telegram webhook endpoint"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    if not check_secret(request):
+        logger.warning("Webhook: noto'g'ri secret token")
+        return HttpResponseForbidden()
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    await ensure_started()
+    dispatch_update(data)
+
+    return HttpResponse("ok", content_type="text/plain")
+
+
+class LifespanApp:
+    """
+    ASGI lifespan o'rami.
+
+    Django ASGI handler lifespan eventlarini qo'llab-quvvatlamaydi,
+    shuning uchun startup/shutdown shu yerda ushlanadi, qolgani Django ga uzatiladi.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await ensure_started()
+                except Exception as e:
+                    logger.exception(f"Webhook startup xatosi: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await shutdown()
+                except Exception as e:
+                    logger.error(f"Webhook shutdown xatosi: {e}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -3,3 +3,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.BOT_WEBHOOK_URL:
+    # Webhook rejimi - bot startup/shutdown ASGI lifespan orqali
+    from bot.webhook import LifespanApp  # noqa: E402
+    application = LifespanApp(application)
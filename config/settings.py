@@ -1,5 +1,6 @@
 import os
 import sys
+import hashlib
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -84,12 +85,22 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Railway provides DATABASE_URL automatically
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Connection pooling
+# DB_CONN_MAX_AGE - doimiy ulanish umri (sekund), 0 - har so'rovdan keyin yopiladi
+# DB_POOL - psycopg3 pool (psycopg[pool] o'rnatilgan bo'lishi kerak), DB_POOL_MAX_SIZE >= bot thread soni
+# DB_PGBOUNCER - pgbouncer (transaction pooling) orqasida ishlash
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('true', '1', 'yes')
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '4'))
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False').lower() in ('true', '1', 'yes')
+
 if DATABASE_URL:
     # Railway PostgreSQL configuration
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=0,  # Railway uchun connection pooling o'chirish
+            conn_max_age=DB_CONN_MAX_AGE,
             conn_health_checks=True,
             ssl_require=True,  # Railway PostgreSQL SSL talab qiladi
         )
@@ -117,11 +128,34 @@ else:
         }
     }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+    if DB_PGBOUNCER:
+        # Transaction pooling da server-side cursorlar ishlamaydi, ulanishni pgbouncer boshqaradi
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    elif DB_POOL:
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            logging.warning("DB_POOL=True, lekin psycopg[pool] o'rnatilmagan - doimiy ulanishlar ishlatiladi")
+        else:
+            # Django pool doimiy ulanishlar bilan birga ishlamaydi
+            DATABASES['default']['CONN_MAX_AGE'] = 0
+            DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': 10,
+            }
+
 # Redis faqat REDIS_URL mavjud bo'lganda ishlatiladi
 REDIS_URL = os.getenv('REDIS_URL')
 USE_REDIS = os.getenv('USE_REDIS', 'False').lower() in ('true', '1', 'yes')
 
-if USE_REDIS and REDIS_URL and not REDIS_URL.startswith('redis://localhost'):
+REDIS_AVAILABLE = bool(USE_REDIS and REDIS_URL and not REDIS_URL.startswith('redis://localhost'))
+
+if REDIS_AVAILABLE:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -137,6 +171,10 @@ else:
         }
     }
 
+# Bot FSM storage va cache backend: 'memory' (bitta jarayon) yoki 'redis' (bir nechta worker)
+BOT_STORAGE = os.getenv('BOT_STORAGE', 'redis' if REDIS_AVAILABLE else 'memory').lower()
+BOT_CACHE_PREFIX = os.getenv('BOT_CACHE_PREFIX', 'kinobot')
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -166,6 +204,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 ADMINS = [int(x) for x in os.getenv('ADMINS', '').split(',') if x.strip()]
 
+# Webhook (bo'sh bo'lsa - polling rejimi)
+# WEBHOOK_URL - tashqi manzil, masalan: https://your-app.railway.app
+WEBHOOK_PATH = '/' + os.getenv('WEBHOOK_PATH', 'telegram/webhook/').strip('/') + '/'
+_webhook_base = os.getenv('WEBHOOK_URL', '').rstrip('/')
+BOT_WEBHOOK_URL = f"{_webhook_base}{WEBHOOK_PATH}" if _webhook_base else ''
+# Secret token: Telegram har bir so'rovda X-Telegram-Bot-Api-Secret-Token headerida yuboradi
+BOT_WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or hashlib.sha256(BOT_TOKEN.encode()).hexdigest()
+
 # Payment settings
 DEFAULT_CARD_NUMBER = os.getenv('DEFAULT_CARD_NUMBER', '8600 0000 0000 0000')
 DEFAULT_CARD_HOLDER = os.getenv('DEFAULT_CARD_HOLDER', 'CARD HOLDER')
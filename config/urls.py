@@ -32,6 +32,10 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 ]
 
+if settings.BOT_WEBHOOK_URL:
+    from bot.webhook import telegram_webhook
+    urlpatterns.append(path(settings.WEBHOOK_PATH.lstrip('/'), telegram_webhook, name='telegram_webhook'))
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
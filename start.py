@@ -15,6 +15,7 @@ import urllib.error
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 PORT = os.getenv('PORT', '8000')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
 
 # Global process references for cleanup
 bot_process = None
@@ -50,6 +51,7 @@ def check_environment():
     print(f"  ADMINS: {admins if admins else '(not set)'}")
     print(f"  DATABASE_URL: {'configured (PostgreSQL)' if db_url else 'using SQLite'}")
     print(f"  PORT: {PORT}")
+    print(f"  MODE: {'webhook (' + WEBHOOK_URL + ')' if WEBHOOK_URL else 'polling'}")
 
 
 def check_database_connection():
@@ -141,10 +143,19 @@ if __name__ == '__main__':
     else:
         print("Skipping migrations due to database connection issues")
 
-    # Start gunicorn FIRST (for health check)
-    print(f"\nStarting Django/Gunicorn on port {PORT}...")
-    gunicorn_process = subprocess.Popen(
-        [
+    if WEBHOOK_URL:
+        # Webhook rejimi - Django va bot bitta ASGI jarayonida
+        print(f"\nStarting Django/Uvicorn (webhook) on port {PORT}...")
+        server_cmd = [
+            sys.executable, '-m', 'uvicorn',
+            'config.asgi:application',
+            '--host', '0.0.0.0',
+            '--port', PORT,
+            '--lifespan', 'on',
+        ]
+    else:
+        print(f"\nStarting Django/Gunicorn on port {PORT}...")
+        server_cmd = [
             sys.executable, '-m', 'gunicorn',
             'config.wsgi:application',
             '--bind', f'0.0.0.0:{PORT}',
@@ -155,7 +166,11 @@ if __name__ == '__main__':
             '--error-logfile', '-',
             '--capture-output',
             '--enable-stdio-inheritance',
-        ],
+        ]
+
+    # Start web server FIRST (for health check)
+    gunicorn_process = subprocess.Popen(
+        server_cmd,
         stdout=sys.stdout,
         stderr=sys.stderr,
     )
@@ -165,14 +180,15 @@ if __name__ == '__main__':
         print("Failed to start gunicorn!")
         sys.exit(1)
 
-    # Start bot
-    print("\nStarting Telegram bot...")
-    bot_process = subprocess.Popen(
-        [sys.executable, '-m', 'bot.main'],
-        cwd=os.path.dirname(os.path.abspath(__file__)),
-        stdout=sys.stdout,
-        stderr=sys.stderr,
-    )
+    # Start bot (webhook rejimida updatelar ASGI server orqali keladi)
+    if not WEBHOOK_URL:
+        print("\nStarting Telegram bot...")
+        bot_process = subprocess.Popen(
+            [sys.executable, '-m', 'bot.main'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=sys.stdout,
+            stderr=sys.stderr,
+        )
 
     print("=" * 50)
     print("All services started!")
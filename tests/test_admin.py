@@ -172,6 +172,25 @@ class TestUserManagement:
         db_user.refresh_from_db()
         assert db_user.is_banned is False
 
+    def test_ban_action_on_filtered_changelist(self, db_user, django_capture_on_commit_callbacks):
+        """Test ban action publishes invalidation even when filtered on is_banned"""
+        from unittest.mock import MagicMock
+        from django.contrib.admin.sites import site
+        from apps.core.models import CacheInvalidation
+        from apps.users.models import User
+        from apps.users.admin import UserAdmin
+
+        user_admin = UserAdmin(User, site)
+        user_admin.message_user = MagicMock()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user_admin.ban_users(MagicMock(), User.objects.filter(pk=db_user.pk, is_banned=False))
+
+        db_user.refresh_from_db()
+        assert db_user.is_banned is True
+        assert list(CacheInvalidation.objects.values_list('kind', 'key')) == [('user', str(db_user.user_id))]
+        assert user_admin.message_user.call_args.args[1].startswith('1 ')
+
     def test_give_premium(self, db_user):
         """Test give premium"""
         db_user.is_premium = True
@@ -226,6 +245,538 @@ class TestBotSettings:
         settings.save()
 
 
+class TestMessageTemplates:
+    """Test compiled message templates"""
+
+    def test_render_without_queries(self, django_assert_num_queries):
+        """Test templates are loaded once and rendered from cache"""
+        from apps.core.models import MessageTemplate
+
+        MessageTemplate.clear_cache()
+        MessageTemplate.init_defaults()
+        MessageTemplate.get_message('welcome', full_name='Ali')
+
+        with django_assert_num_queries(0):
+            text = MessageTemplate.get_message('welcome', full_name='Ali')
+            MessageTemplate.get_message('payment_rejected', reason='Chek xato')
+
+        assert 'Ali' in text
+        assert '{full_name}' not in text
+
+    def test_missing_kwarg_kept(self):
+        """Test placeholders without value stay in text"""
+        from apps.core.models import MessageTemplate
+
+        MessageTemplate.clear_cache()
+        text = MessageTemplate.get_message('payment_instructions', card_number='8600')
+        assert '8600' in text
+        assert '{card_holder}' in text
+
+    def test_save_invalidates_cache(self, django_capture_on_commit_callbacks):
+        """Test edited template is used right after the save commits, not before"""
+        from apps.core.models import MessageTemplate
+
+        MessageTemplate.init_defaults()
+        old_text = MessageTemplate.get_message('welcome', full_name='Ali')
+
+        template = MessageTemplate.objects.get(message_type='welcome')
+        template.content = 'Salom, {full_name}!'
+        with django_capture_on_commit_callbacks(execute=True):
+            template.save()
+            assert MessageTemplate.get_message('welcome', full_name='Ali') == old_text
+
+        assert MessageTemplate.get_message('welcome', full_name='Ali') == 'Salom, Ali!'
+
+    def test_unknown_placeholder_rejected(self):
+        """Test unknown placeholders are rejected on save"""
+        from django.core.exceptions import ValidationError
+        from apps.core.models import MessageTemplate
+
+        template = MessageTemplate(message_type='ban_message', title='Ban', content='Sabab: {reasn}')
+        with pytest.raises(ValidationError):
+            template.save()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDbBenchmark:
+    """Test db_benchmark management command"""
+
+    def test_runs_both_modes(self):
+        """Test benchmark prints before/after rows"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('db_benchmark', ops=20, concurrency=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        assert any(line.startswith('before') for line in lines)
+        assert any(line.startswith('after') for line in lines)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBroadcastEngine:
+    """Test rate-limited broadcast sender"""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_limits_rate(self):
+        """Test bucket spaces acquires by 1/rate after the burst"""
+        import time
+        from bot.utils.broadcast import TokenBucket
+
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+
+        assert time.monotonic() - started >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_charges_full_album(self):
+        """Test an acquire larger than the capacity is charged in full"""
+        import time
+        from bot.utils.broadcast import TokenBucket
+
+        bucket = TokenBucket(rate=100, capacity=5)
+        started = time.monotonic()
+        await bucket.acquire(10)
+
+        # 5 tokens come from the burst, the other 5 take 5/rate
+        assert time.monotonic() - started >= 0.045
+
+    @pytest.mark.asyncio
+    async def test_sends_to_all_users(self, mock_bot):
+        """Test every chat gets the message and failures are counted"""
+        from bot.utils.broadcast import BroadcastSender
+
+        mock_bot.send_message.side_effect = [None, Exception("blocked"), None, None]
+        sender = BroadcastSender(mock_bot, 'text', text='Salom', rate=1000, burst=10, concurrency=3)
+
+        sent, failed = await sender.send_batch([1, 2, 3, 4])
+
+        assert (sent, failed) == (3, 1)
+        assert mock_bot.send_message.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_and_retries(self, mock_bot):
+        """Test flood control pauses the bucket and resends the message"""
+        from aiogram.exceptions import TelegramRetryAfter
+        from aiogram.methods import SendMessage
+        from bot.utils.broadcast import BroadcastSender
+
+        flood = TelegramRetryAfter(method=SendMessage(chat_id=1, text='x'), message='flood', retry_after=0)
+        mock_bot.send_message.side_effect = [flood, None]
+        sender = BroadcastSender(mock_bot, 'text', text='Salom', rate=1000, burst=10, concurrency=1)
+
+        sent, failed = await sender.send_batch([1])
+
+        assert (sent, failed) == (1, 0)
+        assert mock_bot.send_message.await_count == 2
+
+
+    def test_parse_buttons(self):
+        """Test button rows parsed from admin text"""
+        from bot.utils.broadcast import parse_buttons, build_buttons_markup
+
+        buttons = parse_buttons("Kanal - https://t.me/kanal | Sayt - https://site.uz\nBot - tg://resolve?domain=bot")
+
+        assert [[b['text'] for b in row] for row in buttons] == [['Kanal', 'Sayt'], ['Bot']]
+        markup = build_buttons_markup(buttons)
+        assert markup.inline_keyboard[0][1].url == 'https://site.uz'
+
+        with pytest.raises(ValueError):
+            parse_buttons("Kanal https://t.me/kanal")
+
+    @pytest.mark.asyncio
+    async def test_copy_mode_uses_copy_message(self, mock_bot):
+        """Test copy mode copies the source message with buttons, album uses copy_messages"""
+        from bot.utils.broadcast import BroadcastSender
+
+        buttons = [[{'text': 'Kanal', 'url': 'https://t.me/kanal'}]]
+        sender = BroadcastSender(mock_bot, 'copy', source_chat_id=10, source_message_ids=[55], buttons=buttons)
+        await sender.send_one(1)
+
+        args, kwargs = mock_bot.copy_message.await_args
+        assert args == (1, 10, 55)
+        assert kwargs['reply_markup'].inline_keyboard[0][0].text == 'Kanal'
+
+        album = BroadcastSender(mock_bot, 'album', source_chat_id=10, source_message_ids=[55, 56, 57])
+        await album.send_one(1)
+
+        mock_bot.copy_messages.assert_awaited_once_with(1, 10, [55, 56, 57])
+        assert album.cost == 3
+        mock_bot.send_message.assert_not_awaited()
+
+    def test_progress_rate_and_failures(self):
+        """Test progress counts failures by kind and estimates ETA"""
+        from bot.utils.broadcast import BroadcastProgress, FAILURE_FLOOD
+
+        progress = BroadcastProgress(total=10, sent=2)
+        progress._started -= 2
+        progress.record()
+        progress.record('blocked')
+        progress.record(FAILURE_FLOOD)
+        progress.record('blocked')
+
+        assert (progress.sent, progress.failed, progress.done) == (3, 3, 6)
+        assert progress.failures.most_common(1) == [('blocked', 2)]
+        assert progress.rate == pytest.approx(2.0, rel=0.1)
+        assert progress.eta == pytest.approx(2.0, rel=0.1)
+
+    @pytest.mark.asyncio
+    async def test_reporter_edits_only_on_change(self):
+        """Test reporter is time-driven, skips idle ticks and ignores 'not modified'"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from aiogram.exceptions import TelegramBadRequest
+        from aiogram.methods import EditMessageText
+        from bot.utils.broadcast import BroadcastProgress, report_progress
+
+        progress = BroadcastProgress(total=5)
+        not_modified = TelegramBadRequest(method=EditMessageText(text='x'), message='message is not modified')
+        on_progress = AsyncMock(side_effect=[not_modified, None])
+        reporter = asyncio.create_task(report_progress(progress, on_progress, interval=0.01))
+
+        progress.record()
+        await asyncio.sleep(0.035)
+        progress.record()
+        await asyncio.sleep(0.035)
+        reporter.cancel()
+
+        assert on_progress.await_count == 2
+
+
+class TestAlbumThrottling:
+    """Test album parts reach handlers through the throttling middleware"""
+
+    @staticmethod
+    def _update(update_id, message_id, media_group_id=None):
+        from datetime import datetime
+        from aiogram.types import Chat, Message, PhotoSize, Update, User as TgUser
+
+        return Update(update_id=update_id, message=Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=Chat(id=9100, type='private'),
+            from_user=TgUser(id=9100, is_bot=False, first_name='Admin'),
+            photo=[PhotoSize(file_id=f'p{message_id}', file_unique_id=f'u{message_id}', width=1, height=1)],
+            media_group_id=media_group_id,
+        ))
+
+    @pytest.mark.asyncio
+    async def test_album_parts_not_throttled(self):
+        """Test every album part is handled while plain messages stay throttled"""
+        from aiogram import Bot, Dispatcher, Router
+        from bot.middlewares.throttling import ThrottlingMiddleware
+
+        received = []
+        router = Router()
+
+        @router.message()
+        async def collect(message):
+            received.append(message.message_id)
+
+        dp = Dispatcher()
+        dp.message.middleware(ThrottlingMiddleware(rate_limit=60))
+        dp.include_router(router)
+        bot = Bot(token='42:TEST')
+
+        for i in range(1, 4):
+            await dp.feed_update(bot, self._update(i, i, media_group_id='album-1'))
+        await dp.feed_update(bot, self._update(4, 10))
+        await dp.feed_update(bot, self._update(5, 11))
+        await bot.session.close()
+
+        assert received == [1, 2, 3, 10]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBroadcastJobs:
+    """Test durable broadcast jobs"""
+
+    @staticmethod
+    async def _create_users(count):
+        from asgiref.sync import sync_to_async
+        from apps.users.models import User
+
+        for i in range(count):
+            await sync_to_async(User.objects.create)(user_id=5000 + i, full_name=f'User {i}')
+
+    @staticmethod
+    async def _create_broadcast(**kwargs):
+        from asgiref.sync import sync_to_async
+        from apps.core.models import Broadcast
+        from bot.utils.broadcast import LOCK_OWNER
+
+        # Like create_broadcast: an immediate job belongs to this process
+        kwargs.setdefault('lock_owner', LOCK_OWNER)
+        return await sync_to_async(Broadcast.objects.create)(target='all', content_type='text', text='Salom', **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_job_completes_record(self, mock_bot):
+        """Test final counts and status are stored on the Broadcast row"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.broadcast import start_broadcast
+
+        await self._create_users(3)
+        broadcast = await self._create_broadcast()
+
+        await start_broadcast(mock_bot, broadcast.id, rate=1000, burst=10)
+
+        await sync_to_async(broadcast.refresh_from_db)()
+        assert broadcast.status == broadcast.STATUS_COMPLETED
+        assert broadcast.is_completed
+        assert (broadcast.total_users, broadcast.sent_count) == (3, 3)
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_users_before_cursor(self, mock_bot):
+        """Test a resumed job continues after last_user_pk and keeps earlier counts"""
+        from asgiref.sync import sync_to_async
+        from apps.users.models import User
+        from bot.utils.broadcast import resume_broadcasts, _running_tasks
+
+        await self._create_users(4)
+        pks = await sync_to_async(lambda: list(User.objects.order_by('pk').values_list('pk', flat=True)))()
+        broadcast = await self._create_broadcast(total_users=4, sent_count=2, last_user_pk=pks[1])
+
+        assert await resume_broadcasts(mock_bot) == 1
+        await _running_tasks[broadcast.id]
+
+        sent_to = [call.args[0] for call in mock_bot.send_message.await_args_list]
+        assert sent_to == [5002, 5003]
+        await sync_to_async(broadcast.refresh_from_db)()
+        assert broadcast.sent_count == 4
+        assert broadcast.last_user_pk == pks[3]
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_live_lock(self, mock_bot):
+        """Test a job whose lock is still held by another process is not resumed"""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        await self._create_users(2)
+        await self._create_broadcast(locked_until=timezone.now() + timedelta(minutes=5))
+
+        from bot.utils.broadcast import resume_broadcasts
+        assert await resume_broadcasts(mock_bot) == 0
+        mock_bot.send_message.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_lost_lock_stops_before_next_chunk(self, mock_bot):
+        """Test a task whose job was taken over by another replica sends nothing more"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.broadcast import run_broadcast
+
+        await self._create_users(3)
+        broadcast = await self._create_broadcast(sent_count=5, lock_owner='other-replica')
+
+        assert await run_broadcast(mock_bot, broadcast.id, rate=1000, burst=10) is None
+        mock_bot.send_message.assert_not_awaited()
+
+        # The new owner's counters are not overwritten
+        await sync_to_async(broadcast.refresh_from_db)()
+        assert (broadcast.status, broadcast.sent_count) == (broadcast.STATUS_RUNNING, 5)
+
+    @pytest.mark.asyncio
+    async def test_resume_takes_ownership(self, mock_bot):
+        """Test resuming a paused job moves its lock to this process"""
+        from asgiref.sync import sync_to_async
+        from apps.core.models import Broadcast
+        from bot.utils.broadcast import LOCK_OWNER, resume_broadcast, _running_tasks
+
+        await self._create_users(2)
+        broadcast = await self._create_broadcast(status=Broadcast.STATUS_PAUSED, lock_owner='other-replica')
+
+        assert await resume_broadcast(mock_bot, broadcast.id, rate=1000, burst=10)
+        assert await _running_tasks[broadcast.id] == (2, 0)
+
+        await sync_to_async(broadcast.refresh_from_db)()
+        assert broadcast.lock_owner == LOCK_OWNER
+
+    @pytest.mark.asyncio
+    async def test_paused_job_does_not_send(self, mock_bot):
+        """Test pause stops the job before the next chunk and resume finishes it"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.broadcast import pause_broadcast, resume_broadcast, run_broadcast, _running_tasks
+
+        await self._create_users(2)
+        broadcast = await self._create_broadcast()
+
+        assert await pause_broadcast(broadcast.id)
+        assert await run_broadcast(mock_bot, broadcast.id) is None
+        mock_bot.send_message.assert_not_awaited()
+
+        assert await resume_broadcast(mock_bot, broadcast.id, rate=1000, burst=10)
+        assert await _running_tasks[broadcast.id] == (2, 0)
+
+    @pytest.mark.asyncio
+    async def test_recipients_streamed_in_keyset_chunks(self):
+        """Test recipients come as (pk, user_id) chunks in pk order, skipping banned users"""
+        from asgiref.sync import sync_to_async
+        from apps.users.models import User
+        from apps.core.models import Broadcast
+        from bot.utils.broadcast import iter_recipients
+
+        await self._create_users(5)
+        await sync_to_async(User.objects.filter(user_id=5001).update)(is_banned=True)
+
+        chunks = [chunk async for chunk in iter_recipients(Broadcast(target='all'), chunk_size=2)]
+
+        assert [len(chunk) for chunk in chunks] == [2, 2]
+        assert [user_id for chunk in chunks for _, user_id in chunk] == [5000, 5002, 5003, 5004]
+        assert chunks[0][-1][0] < chunks[1][0][0]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_job_cannot_resume(self, mock_bot):
+        """Test cancel is final"""
+        from bot.utils.broadcast import cancel_broadcast, resume_broadcast
+
+        broadcast = await self._create_broadcast()
+
+        assert await cancel_broadcast(broadcast.id)
+        assert not await resume_broadcast(mock_bot, broadcast.id)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduledBroadcasts:
+    """Test segments, materialized audiences and scheduling"""
+
+    def test_segment_filters(self, user_model, db_channel):
+        """Test segment filters narrow the recipient queryset"""
+        from apps.core.models import Broadcast
+        from bot.utils.broadcast import _broadcast_recipients_queryset
+
+        old = timezone.now() - timedelta(days=40)
+        via_channel = user_model.objects.create(user_id=6001, full_name='A', joined_from_channel=db_channel)
+        idle = user_model.objects.create(user_id=6002, full_name='B')
+        user_model.objects.filter(pk=idle.pk).update(last_active=old, free_trial_expires=old)
+
+        def user_ids(segment):
+            qs = _broadcast_recipients_queryset(Broadcast(target='all', segment=segment))
+            return set(qs.values_list('user_id', flat=True))
+
+        assert user_ids({'channel_id': db_channel.id}) == {via_channel.user_id}
+        assert user_ids({'inactive_days': 30}) == {idle.user_id}
+        assert idle.user_id not in user_ids({'trial': True})
+
+    def test_materialize_audience(self, user_model):
+        """Test audience is stored as (user_pk, user_id) rows with the total"""
+        from asgiref.sync import async_to_sync
+        from apps.core.models import Broadcast, BroadcastRecipient
+        from bot.utils.broadcast import materialize_audience
+
+        for i in range(3):
+            user_model.objects.create(user_id=6100 + i, full_name=f'U{i}')
+        broadcast = Broadcast.objects.create(target='all', content_type='text', text='Salom')
+
+        assert async_to_sync(materialize_audience)(broadcast.id) == 3
+
+        broadcast.refresh_from_db()
+        assert broadcast.total_users == 3
+        assert broadcast.audience_ready_at is not None
+        assert sorted(BroadcastRecipient.objects.values_list('user_id', flat=True)) == [6100, 6101, 6102]
+
+    @pytest.mark.asyncio
+    async def test_due_broadcast_started_from_audience(self, mock_bot):
+        """Test the scheduler materializes, starts due jobs and sends only to the stored audience"""
+        from asgiref.sync import sync_to_async
+        from apps.core.models import Broadcast, BroadcastRecipient
+        from apps.users.models import User
+        from bot.utils.broadcast import run_scheduled_broadcasts, _running_tasks
+
+        await sync_to_async(User.objects.create)(user_id=6200, full_name='Early')
+        due = await sync_to_async(Broadcast.objects.create)(
+            target='all', content_type='text', text='Salom',
+            status=Broadcast.STATUS_SCHEDULED, scheduled_at=timezone.now() - timedelta(seconds=1)
+        )
+        later = await sync_to_async(Broadcast.objects.create)(
+            target='all', content_type='text', text='Salom',
+            status=Broadcast.STATUS_SCHEDULED, scheduled_at=timezone.now() + timedelta(days=1)
+        )
+
+        assert await run_scheduled_broadcasts(mock_bot) == 1
+        # Joined after materialization - not in the precomputed audience
+        await sync_to_async(User.objects.create)(user_id=6201, full_name='Late')
+        await _running_tasks[due.id]
+
+        assert [call.args[0] for call in mock_bot.send_message.await_args_list] == [6200]
+        await sync_to_async(due.refresh_from_db)()
+        await sync_to_async(later.refresh_from_db)()
+        assert due.status == Broadcast.STATUS_COMPLETED
+        assert later.status == Broadcast.STATUS_SCHEDULED
+        assert not await sync_to_async(BroadcastRecipient.objects.filter(broadcast=due).exists)()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestUnreachableUsers:
+    """Test dead-recipient detection"""
+
+    def test_reason_from_error(self):
+        """Test only permanent delivery errors are classified"""
+        from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+        from aiogram.methods import SendMessage
+        from apps.users.models import User
+        from bot.utils.reachability import get_unreachable_reason
+
+        method = SendMessage(chat_id=1, text='x')
+        blocked = TelegramForbiddenError(method=method, message='Forbidden: bot was blocked by the user')
+        deactivated = TelegramForbiddenError(method=method, message='Forbidden: user is deactivated')
+        bad = TelegramBadRequest(method=method, message='Bad Request: message is too long')
+
+        assert get_unreachable_reason(blocked) == User.UNREACHABLE_BLOCKED
+        assert get_unreachable_reason(deactivated) == User.UNREACHABLE_DEACTIVATED
+        assert get_unreachable_reason(bad) is None
+        assert get_unreachable_reason(Exception('timeout')) is None
+
+    @pytest.mark.asyncio
+    async def test_blocked_user_marked_and_skipped(self, mock_bot, db_user):
+        """Test a blocked send marks the user and later broadcasts skip them"""
+        from asgiref.sync import sync_to_async
+        from aiogram.exceptions import TelegramForbiddenError
+        from aiogram.methods import SendMessage
+        from apps.core.models import Broadcast
+        from bot.utils.broadcast import BroadcastSender, count_recipients
+
+        mock_bot.send_message.side_effect = TelegramForbiddenError(
+            method=SendMessage(chat_id=db_user.user_id, text='x'), message='Forbidden: bot was blocked by the user'
+        )
+        sender = BroadcastSender(mock_bot, 'text', text='Salom', rate=1000, burst=10)
+
+        assert await sender.send_batch([db_user.user_id]) == (0, 1)
+
+        await sync_to_async(db_user.refresh_from_db)()
+        assert db_user.unreachable_reason == 'blocked'
+        assert db_user.unreachable_at is not None
+        assert await count_recipients(Broadcast(target='all')) == 0
+
+    @pytest.mark.asyncio
+    async def test_inbound_message_clears_mark(self, db_user, mock_message):
+        """Test the database middleware clears the mark when the user writes again"""
+        from unittest.mock import AsyncMock
+        from asgiref.sync import sync_to_async
+        from aiogram.types import Message
+        from django.utils import timezone
+        from apps.users.models import User
+        from bot.middlewares.database import DatabaseMiddleware, clear_user_cache
+
+        await sync_to_async(User.objects.filter(pk=db_user.pk).update)(
+            unreachable_reason='blocked', unreachable_at=timezone.now()
+        )
+        clear_user_cache(db_user.user_id)
+
+        mock_message.__class__ = Message
+        mock_message.from_user.id = db_user.user_id
+        mock_message.text = 'salom'
+        handler = AsyncMock()
+
+        await DatabaseMiddleware()(handler, mock_message, {})
+
+        handler.assert_awaited_once()
+        await sync_to_async(db_user.refresh_from_db)()
+        assert db_user.unreachable_at is None
+        assert db_user.unreachable_reason == ''
+
+
 class TestStatistics:
     """Test statistics"""
 
@@ -252,6 +803,91 @@ class TestStatistics:
         ).count()
         assert count >= 1
 
+    def test_stats_helpers_one_query_per_table(self, db_user, db_premium_user, db_movie,
+                                               django_assert_num_queries):
+        """Test detailed stats aggregate each table once and are cached"""
+        from asgiref.sync import async_to_sync
+        from bot.handlers.admin import _stats_cache, get_detailed_stats, get_premium_stats
+
+        _stats_cache.clear()
+        with django_assert_num_queries(3):
+            stats = async_to_sync(get_detailed_stats)()
+
+        assert stats['total_users'] == 2
+        assert stats['today_users'] == 2
+        assert stats['premium_users'] == 1
+        assert stats['total_movies'] == 1
+
+        with django_assert_num_queries(0):
+            assert async_to_sync(get_detailed_stats)() == stats
+
+        premium = async_to_sync(get_premium_stats)()
+        assert (premium['total_premium'], premium['active_premium']) == (1, 1)
+        _stats_cache.clear()
+
+
+class TestDailyStats:
+    """Test DailyStats rollup"""
+
+    def test_rollup_counts_users_and_payments(self, db_user, db_tariff, payment_model,
+                                               django_capture_on_commit_callbacks):
+        """Test a day is rolled up and approving a payment refreshes its row"""
+        from apps.core.models import DailyStats
+        from apps.core.rollup import rollup_days, local_today
+
+        today = local_today()
+        rollup_days(today)
+        assert DailyStats.objects.get(date=today).new_users >= 1
+
+        payment = payment_model.objects.create(
+            user=db_user, tariff=db_tariff, amount=db_tariff.price, screenshot_file_id='x'
+        )
+        payment.status = 'approved'
+        with django_capture_on_commit_callbacks(execute=True):
+            payment.save()
+
+        row = DailyStats.objects.get(date=today)
+        assert (row.approved_payments, row.income) == (1, 10000)
+
+    def test_views_rolled_up_from_events(self, db_movie):
+        """Test daily views come from view events and survive their pruning"""
+        from apps.core.models import DailyStats
+        from apps.core.rollup import rollup_days, prune_view_events, local_today, VIEW_RETENTION_DAYS
+        from apps.movies.models import MovieView
+
+        now = timezone.now()
+        old = now - timedelta(days=VIEW_RETENTION_DAYS + 1)
+        MovieView.objects.bulk_create(
+            [MovieView(movie=db_movie, created_at=now) for _ in range(3)]
+            + [MovieView(movie=db_movie, created_at=old)]
+        )
+        old_day = timezone.localdate(old)
+        DailyStats.objects.create(date=old_day, views=40)
+
+        rollup_days(old_day, local_today())
+        assert prune_view_events() == 1
+
+        assert DailyStats.objects.get(date=local_today()).views == 3
+        assert DailyStats.objects.get(date=old_day).views == 40
+        assert MovieView.objects.count() == 3
+
+    def test_period_stats_read_rollup(self, django_assert_max_num_queries):
+        """Test period stats come from DailyStats rows"""
+        from asgiref.sync import async_to_sync
+        from apps.core.models import DailyStats
+        from apps.core.rollup import local_today
+        from bot.handlers.admin import get_period_stats
+
+        yesterday = local_today() - timedelta(days=1)
+        DailyStats.objects.create(date=yesterday, new_users=7, approved_payments=2, income=30000)
+
+        with django_assert_max_num_queries(5):
+            stats = async_to_sync(get_period_stats)(7)
+
+        assert stats['new_premium'] == 2
+        assert stats['total_income'] == 30000
+        assert stats['daily_stats'][1]['users'] == 7
+
 
 class TestAdminStates:
     """Test FSM states"""
@@ -268,7 +904,7 @@ class TestAdminStates:
     def test_broadcast_states(self):
         """Test BroadcastState"""
         from bot.states import BroadcastState
-        states = ['target', 'is_ad', 'content', 'confirm']
+        states = ['target', 'is_ad', 'content', 'buttons', 'confirm']
         for state in states:
             assert hasattr(BroadcastState, state)
 
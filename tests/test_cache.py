@@ -0,0 +1,282 @@
+"""
+Cache Backend Tests for KinoBot
+"""
+import pytest
+import fakeredis
+from datetime import timedelta
+from django.utils import timezone
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+class TestMemoryCache:
+    """Test in-process cache backend"""
+
+    def test_get_set_pop(self):
+        """Test basic operations"""
+        from bot.utils.cache import get_cache
+
+        cache = get_cache('test', ttl=60, backend='memory')
+        cache.set(1, [10, 20])
+
+        assert cache.get(1) == [10, 20]
+        assert cache.pop(1) == [10, 20]
+        assert cache.get(1) is None
+
+    def test_add(self):
+        """Test add only writes missing keys"""
+        from bot.utils.cache import get_cache
+
+        cache = get_cache('test', ttl=60, backend='memory')
+
+        assert cache.add('k', 1) is True
+        assert cache.add('k', 2) is False
+        assert cache.get('k') == 1
+
+
+class TestRedisCache:
+    """Test shared Redis cache backend"""
+
+    def test_shared_between_instances(self, redis_client):
+        """Test two workers see the same values"""
+        from bot.utils.cache import RedisCache
+
+        worker_a = RedisCache('user', ttl=60, client=redis_client)
+        worker_b = RedisCache('user', ttl=60, client=redis_client)
+
+        worker_a.set(123, {'is_banned': False})
+        assert worker_b.get(123) == {'is_banned': False}
+
+        worker_b.delete(123)
+        assert worker_a.get(123) is None
+
+    def test_pop_and_add(self, redis_client):
+        """Test pop removes value, add acts as SET NX"""
+        from bot.utils.cache import RedisCache
+
+        cache = RedisCache('pending_subs', ttl=60, client=redis_client)
+        cache.set(1, [5, 6])
+
+        assert cache.pop(1) == [5, 6]
+        assert cache.pop(1) is None
+        assert cache.add(2, True) is True
+        assert cache.add(2, True) is False
+
+    def test_clear_namespace_only(self, redis_client):
+        """Test clear keeps other namespaces"""
+        from bot.utils.cache import RedisCache
+
+        users = RedisCache('user', ttl=60, client=redis_client)
+        admins = RedisCache('admin', ttl=60, client=redis_client)
+        users.set(1, 'a')
+        admins.set(1, True)
+
+        users.clear()
+
+        assert users.get(1) is None
+        assert admins.get(1) is True
+
+    def test_model_instance_roundtrip(self, redis_client, db_premium_user):
+        """Test cached User model survives serialization"""
+        from bot.utils.cache import RedisCache
+
+        cache = RedisCache('user', ttl=60, client=redis_client)
+        cache.set(db_premium_user.user_id, db_premium_user)
+
+        cached = cache.get(db_premium_user.user_id)
+        assert cached.pk == db_premium_user.pk
+        assert cached.is_premium_active is True
+
+    @pytest.mark.asyncio
+    async def test_async_interface(self):
+        """Test awaitable methods share keys with the sync client"""
+        from bot.utils.cache import RedisCache
+
+        server = fakeredis.FakeServer()
+        cache = RedisCache(
+            'throttle', ttl=60,
+            client=fakeredis.FakeRedis(server=server),
+            async_client=fakeredis.FakeAsyncRedis(server=server),
+        )
+
+        assert await cache.aadd(1, True) is True
+        assert await cache.aadd(1, True) is False
+        await cache.aset(2, [5, 6])
+        assert cache.get(2) == [5, 6]
+        assert await cache.apop(2) == [5, 6]
+        await cache.adelete(1)
+        assert await cache.aget(1, 'miss') == 'miss'
+
+    def test_redis_error_is_cache_miss(self):
+        """Test Redis outage does not break handlers"""
+        import redis
+        from unittest.mock import MagicMock
+        from bot.utils.cache import RedisCache
+
+        client = MagicMock()
+        client.get.side_effect = redis.ConnectionError('down')
+        cache = RedisCache('user', ttl=60, client=client)
+
+        assert cache.get(1, 'default') == 'default'
+
+
+class TestInvalidationBus:
+    """Test cross-process cache invalidation"""
+
+    def test_user_save_publishes(self, db_user, django_capture_on_commit_callbacks):
+        """Test User post_save writes invalidation log after commit"""
+        from apps.core.models import CacheInvalidation
+
+        with django_capture_on_commit_callbacks(execute=True):
+            db_user.is_banned = True
+            db_user.save()
+
+        entry = CacheInvalidation.objects.get()
+        assert (entry.kind, entry.key) == ('user', str(db_user.user_id))
+
+    def test_unchanged_user_save_not_published(self, db_user, django_capture_on_commit_callbacks):
+        """Test a save that only bumps last_active writes no invalidation"""
+        from apps.core.models import CacheInvalidation
+        from apps.users.models import User
+
+        user = User.objects.get(pk=db_user.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            user.full_name = db_user.full_name
+            user.save(update_fields=['full_name', 'last_active'])
+        assert not CacheInvalidation.objects.exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_banned = True
+            user.save()
+        assert CacheInvalidation.objects.count() == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_local_user(self):
+        """Test user key is evicted from bot cache"""
+        from bot.middlewares.database import _user_cache
+        from bot.utils.invalidation import invalidate_local
+
+        _user_cache.set(555, 'cached')
+        await invalidate_local('user', '555')
+
+        assert _user_cache.get(555) is None
+
+    @pytest.mark.asyncio
+    async def test_poll_applies_log(self):
+        """Test polling listener applies new log entries"""
+        from asgiref.sync import sync_to_async
+        from apps.core.models import CacheInvalidation
+        from bot.middlewares.database import _settings_cache
+        from bot.utils.invalidation import poll_invalidations
+
+        _settings_cache.set('settings', 'stale')
+        entry = await sync_to_async(CacheInvalidation.objects.create)(kind='settings')
+
+        last_id = await poll_invalidations(entry.id - 1)
+
+        assert last_id == entry.id
+        assert _settings_cache.get('settings') is None
+
+    @pytest.mark.asyncio
+    async def test_redis_mode_evicted_by_publisher(self, redis_client, settings):
+        """Test shared Redis keys are evicted once by the sender, not by each listener"""
+        from unittest.mock import patch
+        from apps.core import invalidation
+        from bot.middlewares import database
+        from bot.utils.cache import RedisCache
+        from bot.utils.invalidation import invalidate_local
+
+        settings.BOT_STORAGE = 'redis'
+        shared = RedisCache('user', ttl=60, client=redis_client)
+        shared.set(555, 'cached')
+
+        with patch.object(database, '_user_cache', shared):
+            await invalidate_local('user', '555')
+            assert shared.get(555) == 'cached'
+
+            with patch.object(invalidation, '_redis_client', redis_client):
+                invalidation.send('user', '555')
+            assert shared.get(555) is None
+
+    def test_redis_publish(self, redis_client, settings):
+        """Test Redis transport publishes to the invalidation channel"""
+        from unittest.mock import patch
+        from apps.core import invalidation
+
+        settings.BOT_STORAGE = 'redis'
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(invalidation.get_channel_name())
+
+        with patch.object(invalidation, '_redis_client', redis_client):
+            invalidation.send('channels')
+
+        # First call may return the subscribe confirmation
+        message = pubsub.get_message(timeout=1) or pubsub.get_message(timeout=1)
+        assert invalidation.decode(message['data']) == ('channels', '')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLeaderElection:
+    """Test background job leader lease"""
+
+    def test_database_lease_single_holder(self):
+        """Test only one holder gets the lease until it expires"""
+        from apps.core.models import LeaderLease
+        from bot.utils.leader import DatabaseLease
+
+        first = DatabaseLease('jobs', 'a', ttl=30)
+        second = DatabaseLease('jobs', 'b', ttl=30)
+
+        assert first.acquire()
+        assert first.acquire()
+        assert not second.acquire()
+
+        LeaderLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        assert second.acquire()
+        assert not first.acquire()
+
+    def test_database_lease_release(self):
+        """Test releasing lets another holder take over at once"""
+        from bot.utils.leader import DatabaseLease
+
+        first = DatabaseLease('jobs', 'a', ttl=30)
+        second = DatabaseLease('jobs', 'b', ttl=30)
+
+        assert first.acquire()
+        first.release()
+        assert second.acquire()
+
+    @pytest.mark.asyncio
+    async def test_jobs_follow_lease(self):
+        """Test jobs start when the lease is won and are cancelled when it is lost"""
+        import asyncio
+        from unittest.mock import MagicMock
+        from bot.utils.leader import LeaderElection
+
+        lease = MagicMock()
+        election = LeaderElection(lease=lease)
+        started = []
+
+        async def job():
+            started.append(1)
+            await asyncio.Event().wait()
+
+        lease.acquire.return_value = True
+        assert await election.step([job])
+        await election.step([job])
+        await asyncio.sleep(0)
+        assert started == [1]
+        task = election._tasks[0]
+
+        lease.acquire.return_value = False
+        assert not await election.step([job])
+        assert task.cancelled()
+
+        lease.acquire.side_effect = RuntimeError('down')
+        assert not await election.step([job])
+        assert not election._tasks
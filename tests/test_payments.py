@@ -187,3 +187,48 @@ class TestPaymentFlow:
         db_premium_user.save()
         db_premium_user.refresh_from_db()
         assert db_premium_user.premium_expires > initial
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPendingPayments:
+    """Test cache-backed pending payment sessions"""
+
+    def test_lookup_hits_cache_then_table(self, db_user, db_tariff, django_assert_num_queries):
+        """Test a cached session costs no query and a cache miss falls back to one lookup"""
+        from asgiref.sync import async_to_sync
+        from bot.utils import pending_payments
+
+        get_pending = async_to_sync(pending_payments.get_pending_payment)
+        assert async_to_sync(pending_payments.save_pending_payment)(db_user.user_id, db_tariff.id, 5000, True)
+
+        with django_assert_num_queries(0):
+            pending = get_pending(db_user.user_id)
+        assert (pending['tariff_id'], pending['amount'], pending['with_discount']) == (db_tariff.id, 5000, True)
+
+        # Session saved by another replica / evicted from the local cache
+        pending_payments._sessions.clear()
+        with django_assert_num_queries(1):
+            assert get_pending(db_user.user_id)['amount'] == 5000
+            assert get_pending(db_user.user_id)['amount'] == 5000
+
+        with django_assert_num_queries(1):
+            assert get_pending(db_user.user_id + 1) is None
+
+        async_to_sync(pending_payments.delete_pending_payment)(db_user.user_id)
+        assert get_pending(db_user.user_id) is None
+
+    @pytest.mark.asyncio
+    async def test_reload_after_restart(self, db_user, db_tariff):
+        """Test sessions are restored from the table and expired rows are swept"""
+        from asgiref.sync import sync_to_async
+        from apps.payments.models import PendingPaymentSession
+        from bot.utils import pending_payments
+
+        await pending_payments.save_pending_payment(db_user.user_id, db_tariff.id, 10000, False)
+        pending_payments._sessions.clear()
+
+        assert await pending_payments.load_pending_payments() == 1
+        assert pending_payments._sessions.get(db_user.user_id)['amount'] == 10000
+
+        await sync_to_async(PendingPaymentSession.objects.update)(expires_at=timezone.now() - timedelta(seconds=1))
+        assert await pending_payments.cleanup_expired_sessions() == 1
@@ -94,6 +94,188 @@ class TestSubscriptionMiddleware:
         assert isinstance(settings.ADMINS, list)
 
 
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentMembershipCheck:
+    """Test parallel channel membership checks"""
+
+    def _channels(self, channel_model, count):
+        return [
+            channel_model(channel_id=-100100 - i, title=f'Channel {i}', channel_type='telegram_channel')
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_not_subscribed_channels(self, mock_bot, channel_model):
+        """Test left/kicked channels are returned in order"""
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership
+
+        channels = self._channels(channel_model, 3)
+        statuses = {-100100: 'member', -100101: 'left', -100102: 'kicked'}
+
+        async def get_chat_member(chat_id, user_id):
+            return MagicMock(status=statuses[chat_id])
+
+        mock_bot.get_chat_member.side_effect = get_chat_member
+        not_subscribed, complete = await check_channels_membership(mock_bot, 1, channels)
+
+        assert complete is True
+        assert [ch.channel_id for ch in not_subscribed] == [-100101, -100102]
+
+    @pytest.mark.asyncio
+    async def test_runs_concurrently(self, mock_bot, channel_model):
+        """Test latency is bounded by the slowest channel, not the sum"""
+        import asyncio
+        import time
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership
+
+        async def get_chat_member(chat_id, user_id):
+            await asyncio.sleep(0.1)
+            return MagicMock(status='member')
+
+        mock_bot.get_chat_member.side_effect = get_chat_member
+        start = time.monotonic()
+        not_subscribed, complete = await check_channels_membership(mock_bot, 1, self._channels(channel_model, 5))
+
+        assert complete is True
+        assert not_subscribed == []
+        assert time.monotonic() - start < 0.4
+
+    @pytest.mark.asyncio
+    async def test_slow_channel_partial_result(self, mock_bot, channel_model):
+        """Test slow channel is skipped after timeout"""
+        import asyncio
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership
+
+        async def get_chat_member(chat_id, user_id):
+            if chat_id == -100100:
+                await asyncio.sleep(5)
+            return MagicMock(status='left')
+
+        mock_bot.get_chat_member.side_effect = get_chat_member
+        not_subscribed, complete = await check_channels_membership(
+            mock_bot, 1, self._channels(channel_model, 2), timeout=0.1
+        )
+
+        assert complete is False
+        assert [ch.channel_id for ch in not_subscribed] == [-100101]
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_slow_channel(self, mock_bot, channel_model):
+        """Test a timed-out channel counts as not subscribed in strict mode"""
+        import asyncio
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership
+
+        async def get_chat_member(chat_id, user_id):
+            if chat_id == -100100:
+                await asyncio.sleep(5)
+            return MagicMock(status='member')
+
+        mock_bot.get_chat_member.side_effect = get_chat_member
+        not_subscribed, complete = await check_channels_membership(
+            mock_bot, 1, self._channels(channel_model, 2), strict=True, use_index=False, timeout=0.1
+        )
+
+        assert complete is False
+        assert [ch.channel_id for ch in not_subscribed] == [-100100]
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_errors(self, mock_bot, channel_model):
+        """Test API errors count as not subscribed only in strict mode"""
+        from aiogram.exceptions import TelegramBadRequest
+        from bot.utils.membership import check_channels_membership
+
+        mock_bot.get_chat_member.side_effect = TelegramBadRequest(method=None, message='chat not found')
+        channels = self._channels(channel_model, 1)
+
+        not_subscribed, _ = await check_channels_membership(mock_bot, 1, channels)
+        assert not_subscribed == []
+
+        not_subscribed, _ = await check_channels_membership(mock_bot, 1, channels, strict=True)
+        assert len(not_subscribed) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestMembershipIndex:
+    """Test ChannelMember index"""
+
+    def _channel(self, channel_model):
+        return channel_model(channel_id=-100200, title='Indexed', channel_type='telegram_channel')
+
+    @pytest.mark.asyncio
+    async def test_api_result_written_to_index(self, mock_bot, channel_model):
+        """Test second check is served from index without API call"""
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership
+
+        mock_bot.get_chat_member.return_value = MagicMock(status='member')
+        channels = [self._channel(channel_model)]
+
+        await check_channels_membership(mock_bot, 1, channels)
+        await check_channels_membership(mock_bot, 1, channels)
+
+        assert mock_bot.get_chat_member.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_chat_member_update(self, mock_bot, channel_model):
+        """Test chat_member update marks user as left"""
+        from unittest.mock import MagicMock
+        from bot.handlers.channel import on_chat_member
+        from bot.utils.membership import check_channels_membership
+
+        event = MagicMock()
+        event.chat.id = -100200
+        event.new_chat_member.user.id = 1
+        event.new_chat_member.user.is_bot = False
+        event.new_chat_member.status = 'left'
+        await on_chat_member(event)
+
+        not_subscribed, _ = await check_channels_membership(mock_bot, 1, [self._channel(channel_model)])
+
+        assert len(not_subscribed) == 1
+        mock_bot.get_chat_member.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_recheck_negative(self, mock_bot, channel_model):
+        """Test negative index entries are rechecked on demand"""
+        from unittest.mock import MagicMock
+        from bot.utils.membership import check_channels_membership, save_member_status
+
+        await save_member_status(-100200, 1, 'left')
+        mock_bot.get_chat_member.return_value = MagicMock(status='member')
+
+        not_subscribed, _ = await check_channels_membership(
+            mock_bot, 1, [self._channel(channel_model)], recheck_negative=True
+        )
+
+        assert not_subscribed == []
+        mock_bot.get_chat_member.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_ignored(self, mock_bot, channel_model):
+        """Test stale index entries fall back to API"""
+        from datetime import timedelta
+        from unittest.mock import MagicMock
+        from asgiref.sync import sync_to_async
+        from apps.channels.models import ChannelMember
+        from bot.constants import CACHE_TTL_MEMBERSHIP
+        from bot.utils.membership import check_channels_membership
+
+        await sync_to_async(ChannelMember.objects.create)(
+            channel_id=-100200, user_id=1, status='left',
+            updated_at=timezone.now() - timedelta(seconds=CACHE_TTL_MEMBERSHIP + 60)
+        )
+        mock_bot.get_chat_member.return_value = MagicMock(status='member')
+
+        not_subscribed, _ = await check_channels_membership(mock_bot, 1, [self._channel(channel_model)])
+
+        assert not_subscribed == []
+        mock_bot.get_chat_member.assert_awaited_once()
+
+
 class TestCacheManagement:
     """Test cache management"""
 
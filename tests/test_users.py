@@ -217,3 +217,310 @@ class TestMovieAccess:
         """Test premium user can access premium movie"""
         assert db_premium_user.is_premium_active is True
         assert db_premium_movie.is_premium is True
+
+
+class TestViewCounters:
+    """Test write-behind view counters"""
+
+    def test_bulk_write(self, db_movie, db_premium_movie, db_user):
+        """Test buffered increments are written in one UPDATE"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from bot.utils.counters import CounterBuffer
+
+        buffer = CounterBuffer('movies.Movie', 'id', 'views')
+        for _ in range(3):
+            buffer.add(db_movie.id)
+        buffer.add(db_premium_movie.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            buffer._write(dict(buffer._pending))
+
+        assert len(queries) == 1
+        db_movie.refresh_from_db()
+        db_premium_movie.refresh_from_db()
+        assert db_movie.views == 3
+        assert db_premium_movie.views == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_counts(self):
+        """Test counts are kept in buffer if DB write fails"""
+        from unittest.mock import patch
+        from bot.utils.counters import CounterBuffer
+
+        buffer = CounterBuffer('movies.Movie', 'id', 'views')
+        buffer.add(1, 2)
+
+        with patch.object(buffer, '_write', side_effect=Exception('db down')):
+            assert await buffer.flush() == 0
+
+        assert buffer._pending == {1: 2}
+
+    def test_record_movie_view(self):
+        """Test movie and user counters and view events are buffered"""
+        from bot.utils.counters import record_movie_view, movie_views, user_movies, view_events
+
+        record_movie_view(10, 20)
+        record_movie_view(10, source='random')
+
+        assert movie_views._pending.pop(10) == 2
+        assert user_movies._pending.pop(20) == 1
+        events, view_events._pending = view_events._pending, []
+        assert [(e['user_id'], e['source']) for e in events] == [(20, 'code'), (None, 'random')]
+
+    @pytest.mark.asyncio
+    async def test_failed_event_flush_is_bounded(self):
+        """Test view events survive a failed write but the buffer stays capped"""
+        from unittest.mock import patch
+        from bot.utils.counters import EventBuffer
+
+        buffer = EventBuffer('movies.MovieView', max_pending=2)
+        for movie_id in (1, 2, 3):
+            buffer.add(movie_id=movie_id)
+
+        with patch.object(buffer, '_write', side_effect=Exception('db down')):
+            assert await buffer.flush() == 0
+
+        assert [e['movie_id'] for e in buffer._pending] == [2, 3]
+
+    def test_trending_ranks_recent_views(self, db_movie, db_premium_movie):
+        """Test trending counts only views inside the window"""
+        from datetime import timedelta
+        from asgiref.sync import async_to_sync
+        from django.utils import timezone
+        from apps.movies.models import MovieView
+        from bot.handlers.user import _get_trending_movies
+
+        now = timezone.now()
+        MovieView.objects.bulk_create(
+            [MovieView(movie=db_movie, created_at=now) for _ in range(2)]
+            + [MovieView(movie=db_premium_movie, created_at=now)]
+            + [MovieView(movie=db_premium_movie, created_at=now - timedelta(days=2)) for _ in range(5)]
+        )
+
+        ranked = async_to_sync(_get_trending_movies)(10)
+
+        assert [(movie.id, count) for movie, count in ranked] == [(db_movie.id, 2), (db_premium_movie.id, 1)]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestMovieCatalog:
+    """Test in-memory movie catalog"""
+
+    @pytest.mark.asyncio
+    async def test_lookup_without_db(self, db_movie):
+        """Test lookups after load do not query the database"""
+        from unittest.mock import patch
+        from bot.utils import catalog as catalog_module
+
+        catalog = catalog_module.MovieCatalog()
+        await catalog.load()
+
+        with patch.object(catalog_module, '_load_rows') as load_rows:
+            movie = await catalog.get('99999')
+            missing = await catalog.get('00000')
+
+        load_rows.assert_not_called()
+        assert movie.id == db_movie.id
+        assert movie.display_title == 'Test Movie'
+        assert movie.get_quality_display() == db_movie.get_quality_display()
+        assert missing is None
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh(self, db_movie, movie_model):
+        """Test changed movies are picked up after invalidation"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.catalog import MovieCatalog
+
+        catalog = MovieCatalog()
+        await catalog.load()
+
+        db_movie.is_active = False
+        await sync_to_async(db_movie.save)(update_fields=['is_active', 'updated_at'])
+        new_movie = await sync_to_async(movie_model.objects.create)(code='99998', title='New', file_id='f')
+
+        catalog.invalidate('99999')
+
+        assert (await catalog.get('99999')).is_active is False
+        assert (await catalog.get('99998')).id == new_movie.id
+
+        await sync_to_async(new_movie.delete)()
+
+    @pytest.mark.asyncio
+    async def test_deleted_movie_removed(self, db_movie):
+        """Test delete invalidation drops the record"""
+        from bot.utils.catalog import MovieCatalog
+
+        from asgiref.sync import sync_to_async
+
+        catalog = MovieCatalog()
+        await catalog.load()
+        await sync_to_async(db_movie.delete)()
+        catalog.invalidate('99999', deleted=True)
+
+        assert await catalog.get('99999') is None
+
+
+class TestCaptionCache:
+    """Test cached movie captions and keyboards"""
+
+    def test_full_caption(self, db_movie):
+        """Test full caption content"""
+        from bot.utils.captions import render_movie_caption, STYLE_FULL
+
+        caption = render_movie_caption(db_movie, STYLE_FULL, 'https://t.me/test_bot')
+
+        assert '<b>Test Movie</b>' in caption
+        assert f'<code>{db_movie.code}</code>' in caption
+        assert db_movie.get_country_display() in caption
+        assert caption.endswith('https://t.me/test_bot')
+
+    def test_cached_until_movie_changes(self, db_movie):
+        """Test caption is reused until updated_at changes"""
+        from bot.utils.captions import render_movie_caption, STYLE_COMPACT
+
+        first = render_movie_caption(db_movie, STYLE_COMPACT, 'link')
+        db_movie.title = 'Renamed'
+        assert render_movie_caption(db_movie, STYLE_COMPACT, 'link') is first
+
+        db_movie.save()
+        assert 'Renamed' in render_movie_caption(db_movie, STYLE_COMPACT, 'link')
+
+    def test_movie_action_kb_cached(self):
+        """Test keyboard is built once per code and state"""
+        from bot.keyboards import movie_action_kb
+
+        assert movie_action_kb('123', True) is movie_action_kb('123', True)
+        assert movie_action_kb('123', True) is not movie_action_kb('123', False)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPremiumExpiry:
+    """Test set-based premium expiry in the scheduler"""
+
+    def _create_users(self, user_model):
+        now = timezone.now()
+        expired = user_model.objects.create(user_id=7001, is_premium=True, premium_expires=now - timedelta(hours=1))
+        unreachable = user_model.objects.create(
+            user_id=7002, is_premium=True, premium_expires=now - timedelta(hours=1),
+            unreachable_reason='blocked', unreachable_at=now,
+        )
+        active = user_model.objects.create(user_id=7003, is_premium=True, premium_expires=now + timedelta(days=5))
+        return expired, unreachable, active
+
+    @pytest.mark.parametrize('returning', [True, False])
+    def test_deactivate_returns_rows(self, user_model, returning):
+        """Test one UPDATE deactivates expired users on both code paths"""
+        from unittest.mock import patch
+        from asgiref.sync import async_to_sync
+        from bot.utils import scheduler
+
+        self._create_users(user_model)
+
+        with patch.object(scheduler, '_supports_update_returning', return_value=returning):
+            rows = async_to_sync(scheduler.deactivate_expired_premium)()
+
+        assert sorted(rows) == [(7001, True), (7002, False)]
+        assert list(user_model.objects.filter(is_premium=True).values_list('user_id', flat=True)) == [7003]
+
+    @pytest.mark.asyncio
+    async def test_check_notifies_only_reachable(self, mock_bot, user_model):
+        """Test expired notifications skip unreachable users"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.scheduler import check_premium_expiry, EXPIRED_TEXT
+
+        await sync_to_async(self._create_users)(user_model)
+
+        await check_premium_expiry(mock_bot)
+
+        mock_bot.send_message.assert_awaited_once()
+        assert mock_bot.send_message.call_args.args[:2] == (7001, EXPIRED_TEXT)
+
+    @pytest.mark.asyncio
+    async def test_expiring_reminder_sent_once_per_expiry(self, mock_bot, user_model):
+        """Test hourly runs remind once, and again only after the premium is extended"""
+        from asgiref.sync import sync_to_async
+        from bot.utils.scheduler import check_premium_expiry
+
+        expires = timezone.now() + timedelta(hours=5)
+        user = await sync_to_async(user_model.objects.create)(user_id=7010, is_premium=True, premium_expires=expires)
+
+        await check_premium_expiry(mock_bot)
+        await check_premium_expiry(mock_bot)
+        assert mock_bot.send_message.await_count == 1
+
+        await sync_to_async(user_model.objects.filter(pk=user.pk).update)(premium_expires=expires + timedelta(hours=1))
+        await check_premium_expiry(mock_bot)
+        assert mock_bot.send_message.await_count == 2
+
+
+class TestDeadlineScheduler:
+    """Test the in-process deadline heap"""
+
+    def test_reschedule_and_cancel(self):
+        """Test only the latest deadline per key fires and cancelled keys never do"""
+        from bot.utils.deadlines import DeadlineScheduler
+
+        scheduler = DeadlineScheduler()
+        now = timezone.now()
+        scheduler.schedule('premium', 1, now + timedelta(hours=1))
+        scheduler.schedule('premium', 1, now - timedelta(seconds=1))
+        scheduler.schedule('premium', 2, now - timedelta(seconds=2))
+        scheduler.schedule('session', 3, now - timedelta(seconds=1))
+        scheduler.schedule('session', 4, now + timedelta(minutes=5))
+        scheduler.cancel('session', 3)
+
+        assert scheduler.pop_due(now) == {'premium': [2, 1]}
+        assert scheduler.next_deadline() == now + timedelta(minutes=5)
+        assert len(scheduler) == 1
+
+    @pytest.mark.asyncio
+    async def test_run_wakes_for_earlier_deadline(self):
+        """Test a deadline added while sleeping fires on time, batched per kind"""
+        import asyncio
+        from bot.utils.deadlines import DeadlineScheduler
+
+        scheduler = DeadlineScheduler()
+        fired = asyncio.Queue()
+
+        async def handler(keys):
+            await fired.put(sorted(keys))
+
+        scheduler.register('premium', handler)
+        task = asyncio.create_task(scheduler.run(max_sleep=60))
+        try:
+            await asyncio.sleep(0.01)
+            when = timezone.now() + timedelta(milliseconds=50)
+            scheduler.schedule('premium', 1, when)
+            scheduler.schedule('premium', 2, when)
+
+            assert await asyncio.wait_for(fired.get(), timeout=2) == [1, 2]
+            assert timezone.now() >= when
+        finally:
+            task.cancel()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_refresh_and_fire_expires_premium(self, mock_bot, user_model):
+        """Test deadlines loaded from the DB deactivate premium"""
+        from unittest.mock import patch
+        from asgiref.sync import sync_to_async
+        from bot.utils import scheduler
+        from bot.utils.deadlines import DeadlineScheduler
+
+        now = timezone.now()
+        user = await sync_to_async(user_model.objects.create)(
+            user_id=7020, is_premium=True, premium_expires=now - timedelta(seconds=1)
+        )
+
+        heap = DeadlineScheduler()
+        heap.register(scheduler.KIND_PREMIUM_EXPIRY, lambda ids: scheduler.expire_premium(mock_bot, ids))
+        heap.register(scheduler.KIND_PREMIUM_REMINDER, lambda ids: scheduler.remind_expiring(mock_bot, ids))
+
+        with patch.object(scheduler, 'deadlines', heap):
+            await scheduler.refresh_deadlines()
+        await heap.fire_due()
+
+        await sync_to_async(user.refresh_from_db)()
+        assert user.is_premium is False
+        mock_bot.send_message.assert_awaited_once()
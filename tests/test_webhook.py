@@ -0,0 +1,66 @@
+"""
+Webhook Tests for KinoBot
+"""
+import json
+import pytest
+from unittest.mock import patch
+from django.test import RequestFactory
+from django.conf import settings
+
+
+class TestTelegramWebhook:
+    """Test webhook endpoint"""
+
+    def _request(self, secret=None, body=None):
+        factory = RequestFactory()
+        headers = {}
+        if secret is not None:
+            headers['HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN'] = secret
+        data = json.dumps(body or {'update_id': 1})
+        return factory.post('/telegram/webhook/', data=data, content_type='application/json', **headers)
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_rejected(self):
+        """Test request without valid secret is rejected"""
+        from bot.webhook import telegram_webhook
+
+        response = await telegram_webhook(self._request(secret='wrong'))
+        assert response.status_code == 403
+
+        response = await telegram_webhook(self._request())
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_get_not_allowed(self):
+        """Test only POST is accepted"""
+        from bot.webhook import telegram_webhook
+
+        response = await telegram_webhook(RequestFactory().get('/telegram/webhook/'))
+        assert response.status_code == 405
+
+    @pytest.mark.asyncio
+    async def test_valid_update_dispatched(self):
+        """Test valid update is passed to dispatcher"""
+        from bot import webhook
+
+        with patch.object(webhook, 'ensure_started') as ensure_started, \
+                patch.object(webhook, 'dispatch_update') as dispatch_update:
+            response = await webhook.telegram_webhook(
+                self._request(secret=settings.BOT_WEBHOOK_SECRET, body={'update_id': 42})
+            )
+
+        assert response.status_code == 200
+        ensure_started.assert_awaited_once()
+        dispatch_update.assert_called_once_with({'update_id': 42})
+
+    @pytest.mark.asyncio
+    async def test_invalid_json(self):
+        """Test malformed body"""
+        from bot.webhook import telegram_webhook
+
+        request = RequestFactory().post(
+            '/telegram/webhook/', data='not json', content_type='application/json',
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=settings.BOT_WEBHOOK_SECRET
+        )
+        response = await telegram_webhook(request)
+        assert response.status_code == 400